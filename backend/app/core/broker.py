@@ -0,0 +1,23 @@
+# backend/app/core/broker.py
+import uuid
+
+from faststream.rabbit import RabbitBroker, RabbitQueue
+
+from app.core.config import settings
+from app.schemas.notification import IssueEvent
+
+broker = RabbitBroker(settings.RABBITMQ_URL)
+
+ISSUE_EVENTS_QUEUE = RabbitQueue("issue-events", durable=True)
+ISSUE_EVENTS_DEAD_QUEUE = RabbitQueue("issue-events-dead", durable=True)  # события, исчерпавшие попытки
+IMAGE_PREVIEWS_QUEUE = RabbitQueue("image-previews", durable=True)
+
+
+async def publish_issue_event(event: IssueEvent) -> None:
+    """Опубликовать событие задачи для конвейера уведомлений (вызывается после commit)"""
+    await broker.publish(event, queue=ISSUE_EVENTS_QUEUE, persist=True)
+
+
+async def publish_preview_request(attachment_id: uuid.UUID) -> None:
+    """Поставить генерацию превью загруженного изображения в очередь"""
+    await broker.publish({"attachment_id": str(attachment_id)}, queue=IMAGE_PREVIEWS_QUEUE, persist=True)
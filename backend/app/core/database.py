@@ -1,22 +1,110 @@
 # backend/app/core/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy import Column, DateTime, func
+from sqlalchemy import DDL, Column, DateTime, event, func
+import re
 import uuid
-from typing import Optional
-from datetime import datetime
+from typing import AsyncGenerator, Dict, Generator, Iterable, List
 
 from app.core.config import settings
 
+# Синхронный движок - для Alembic, скриптов и фоновых задач
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок (asyncpg) - для обработчиков FastAPI
+async_engine = create_async_engine(
+    make_url(settings.ASYNC_DATABASE_URL).update_query_dict(
+        # Кэш подготовленных выражений на уровне адаптера SQLAlchemy
+        {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+    ),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    echo=settings.DB_ECHO,
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        "server_settings": {"application_name": settings.APP_NAME},
+    },
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # объекты остаются доступны после commit без повторной загрузки
+)
+
 Base = declarative_base()
 
 def generate_uuid():
     return str(uuid.uuid4())
 
+# Триггеры по таблицам: при пересоздании таблицы (app/services/partitioning.py)
+# они выполняются повторно, функции триггеров переживают DROP TABLE
+TABLE_TRIGGERS: Dict[str, List[str]] = {}
+_TRIGGER_TABLE = re.compile(r"\s*CREATE TRIGGER \w+ .*?\bON (\w+)", re.S)
+
+def register_ddl(statements: Iterable[str]) -> None:
+    """Функции и триггеры, создаваемые после create_all"""
+    for statement in statements:
+        event.listen(Base.metadata, "after_create", DDL(statement))
+        match = _TRIGGER_TABLE.match(statement)
+        if match:
+            TABLE_TRIGGERS.setdefault(match.group(1), []).append(statement)
+
+def transition_triggers(table: str, prefix: str, function: str, deltas: str) -> List[str]:
+    """
+    Statement-триггеры INSERT/DELETE/UPDATE на table с переходными таблицами.
+
+    function - шаблон CREATE FUNCTION {name}() над запросом {deltas};
+    deltas - запрос изменений с {sign} (+1/-1) и {table} (new_rows/old_rows),
+    для UPDATE старые строки вычитаются, новые прибавляются.
+    """
+    statements = []
+    for event_name, transition, parts in (
+        ("INSERT", "NEW TABLE AS new_rows", [deltas.format(sign=1, table="new_rows")]),
+        ("DELETE", "OLD TABLE AS old_rows", [deltas.format(sign=-1, table="old_rows")]),
+        ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows", [
+            deltas.format(sign=-1, table="old_rows"),
+            deltas.format(sign=1, table="new_rows"),
+        ]),
+    ):
+        name = f"{prefix}_{event_name.lower()}"
+        statements.append(function.format(name=name, deltas=" UNION ALL ".join(parts)))
+        statements.append(
+            f"CREATE TRIGGER trg_{name} AFTER {event_name} ON {table} "
+            f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION {name}();"
+        )
+    return statements
+
+def get_db() -> Generator[Session, None, None]:
+    """Синхронная сессия на запрос"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Асинхронная сессия на запрос (FastAPI dependency)"""
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
+async def dispose_engines() -> None:
+    """Закрыть пулы соединений при остановке приложения"""
+    await async_engine.dispose()
+    engine.dispose()
+
 class TimestampMixin:
     """Mixin для добавления created_at и updated_at"""
     created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
@@ -25,7 +113,7 @@ class TimestampMixin:
 class SoftDeleteMixin:
     """Mixin для мягкого удаления"""
     is_deleted = Column(DateTime(timezone=True), nullable=True, default=None)
-    
+
     @property
     def is_active(self) -> bool:
         return self.is_deleted is None
\ No newline at end of file
@@ -0,0 +1,146 @@
+# backend/app/core/graph.py
+"""
+Граф зависимостей задач проекта в памяти.
+
+Связи нормализуются в два отношения:
+    blocks    - from блокирует to (BLOCKS, IS_BLOCKED_BY в обратную сторону)
+    hierarchy - from родитель to (PARENT, CHILD в обратную сторону)
+Остальные типы связей (DUPLICATES, RELATES_TO) в обход не входят.
+"""
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+BLOCKS = "blocks"
+HIERARCHY = "hierarchy"
+GRAPH_KINDS = (BLOCKS, HIERARCHY)
+
+# link_type (имя enum в БД) -> (отношение, связь в прямом направлении source -> target)
+LINK_RELATIONS = {
+    "BLOCKS": (BLOCKS, True),
+    "IS_BLOCKED_BY": (BLOCKS, False),
+    "PARENT": (HIERARCHY, True),
+    "CHILD": (HIERARCHY, False),
+}
+
+
+def normalize_link(link_type: str, source_id, target_id) -> Optional[Tuple[str, Any, Any]]:
+    """(отношение, from, to) или None для связей вне графа"""
+    relation = LINK_RELATIONS.get(link_type)
+    if relation is None:
+        return None
+    kind, forward = relation
+    return (kind, source_id, target_id) if forward else (kind, target_id, source_id)
+
+
+class ProjectGraph:
+    """Списки смежности и лениво вычисляемое транзитивное замыкание"""
+
+    def __init__(self, edges: Iterable[Tuple[str, uuid.UUID, uuid.UUID]]):
+        self._forward: Dict[str, Dict[uuid.UUID, Set[uuid.UUID]]] = {k: defaultdict(set) for k in GRAPH_KINDS}
+        self._reverse: Dict[str, Dict[uuid.UUID, Set[uuid.UUID]]] = {k: defaultdict(set) for k in GRAPH_KINDS}
+        for kind, from_id, to_id in edges:
+            self._forward[kind][from_id].add(to_id)
+            self._reverse[kind][to_id].add(from_id)
+        self._closure: Dict[Tuple[str, bool, uuid.UUID], FrozenSet[uuid.UUID]] = {}
+        self._lock = threading.Lock()
+
+    def _reach(self, kind: str, forward: bool, start: uuid.UUID) -> FrozenSet[uuid.UUID]:
+        key = (kind, forward, start)
+        cached = self._closure.get(key)
+        if cached is not None:
+            return cached
+        adjacency = (self._forward if forward else self._reverse)[kind]
+        seen: Set[uuid.UUID] = set()
+        stack = list(adjacency.get(start, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.extend(adjacency.get(node, ()))
+        seen.discard(start)
+        result = frozenset(seen)
+        with self._lock:
+            self._closure[key] = result
+        return result
+
+    def descendants(self, kind: str, issue_id: uuid.UUID) -> FrozenSet[uuid.UUID]:
+        return self._reach(kind, True, issue_id)
+
+    def ancestors(self, kind: str, issue_id: uuid.UUID) -> FrozenSet[uuid.UUID]:
+        return self._reach(kind, False, issue_id)
+
+    def children(self, kind: str, issue_id: uuid.UUID) -> List[uuid.UUID]:
+        return list(self._forward[kind].get(issue_id, ()))
+
+
+class GraphCache:
+    """
+    Кэш графов по project_id.
+
+    Внутри процесса сбрасывается после commit изменений связей (события
+    IssueLink, см. mark_graph_changed); TTL ограничивает устаревание,
+    если связи изменил другой воркер.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._entries: Dict[Any, Tuple[ProjectGraph, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, project_id) -> Optional[ProjectGraph]:
+        entry = self._entries.get(project_id)
+        if entry is None:
+            return None
+        graph, expires_at = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._entries.pop(project_id, None)
+            return None
+        return graph
+
+    def put(self, project_id, graph: ProjectGraph) -> ProjectGraph:
+        with self._lock:
+            self._entries[project_id] = (graph, time.monotonic() + self.ttl)
+        return graph
+
+    def invalidate(self, project_id=None) -> None:
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(project_id, None)
+
+
+graph_cache = GraphCache()
+
+
+def mark_graph_changed(session: Optional[Session], project_ids: Iterable) -> None:
+    """
+    Вызывается из ORM-событий связей: граф сбрасывается после commit.
+
+    Сброс при flush не помогает: до commit другой запрос успевает заново
+    закэшировать граф без изменений этой транзакции.
+    """
+    if session is None:
+        for project_id in project_ids:
+            graph_cache.invalidate(project_id)
+        return
+    session.info.setdefault("graph_changes", set()).update(project_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    for project_id in session.info.pop("graph_changes", ()):
+        graph_cache.invalidate(project_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("graph_changes", None)
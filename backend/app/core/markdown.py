@@ -0,0 +1,118 @@
+# backend/app/core/markdown.py
+"""
+Рендеринг Markdown в HTML для description_html / content_html.
+
+HTML в исходном тексте не пропускается (html=False), опасные схемы ссылок
+(javascript:, vbscript:, data: кроме картинок) отбрасывает сам markdown-it,
+поэтому отдельная санитизация результата не нужна.
+
+RENDERER_VERSION увеличивается при любом изменении вывода - строки с
+устаревшей версией перерендериваются фоновой задачей (app/services/rendering.py).
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from markdown_it import MarkdownIt
+from markupsafe import escape
+
+RENDERER_VERSION = 1
+LRU_SIZE = 10000
+
+MENTION_RE = re.compile(r"@([A-Za-z0-9](?:[A-Za-z0-9_.\-]{0,98}[A-Za-z0-9_])?)")
+
+
+def _mention_rule(state, silent: bool) -> bool:
+    pos = state.pos
+    if state.src[pos] != "@":
+        return False
+    if pos > 0 and (state.src[pos - 1].isalnum() or state.src[pos - 1] in "_.-@"):
+        return False  # e-mail и подобное
+    match = MENTION_RE.match(state.src, pos)
+    if match is None or len(match.group(1)) < 3:
+        return False
+    if not silent:
+        token = state.push("mention", "", 0)
+        token.content = match.group(1).lower()
+        state.env.setdefault("mentions", []).append(token.content)
+    state.pos = match.end()
+    return True
+
+
+def _render_mention(self, tokens, idx, options, env) -> str:
+    username = escape(tokens[idx].content)
+    return f'<a class="mention" href="/users/{username}">@{username}</a>'
+
+
+def _build() -> MarkdownIt:
+    md = MarkdownIt("commonmark", {"html": False, "linkify": False, "typographer": False})
+    md.enable(["table", "strikethrough"])
+    md.inline.ruler.before("emphasis", "mention", _mention_rule)
+    md.add_render_rule("mention", _render_mention)
+    return md
+
+
+_md = _build()
+# digest -> (html, упоминания); упоминания None, если HTML пришел из Redis
+_cache: "OrderedDict[str, Tuple[str, Optional[List[str]]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def content_digest(text: str) -> str:
+    """Ключ кэша: версия рендерера + содержимое"""
+    return hashlib.sha256(f"{RENDERER_VERSION}\0{text}".encode()).hexdigest()
+
+
+def render_uncached(text: str) -> Tuple[str, List[str]]:
+    """HTML и упомянутые имена пользователей за один проход парсера"""
+    env: dict = {}
+    html = _md.render(text, env)
+    return html, list(dict.fromkeys(env.get("mentions", ())))
+
+
+def cache_get(digest: str) -> Optional[Tuple[str, Optional[List[str]]]]:
+    with _lock:
+        entry = _cache.get(digest)
+        if entry is not None:
+            _cache.move_to_end(digest)
+        return entry
+
+
+def cache_put(digest: str, html: str, mentions: Optional[List[str]] = None) -> None:
+    with _lock:
+        _cache[digest] = (html, mentions)
+        _cache.move_to_end(digest)
+        while len(_cache) > LRU_SIZE:
+            _cache.popitem(last=False)
+
+
+def render_with_mentions(text: str) -> Tuple[str, List[str]]:
+    """Рендер через LRU процесса; упоминания запоминаются вместе с HTML"""
+    digest = content_digest(text)
+    entry = cache_get(digest)
+    if entry is None or entry[1] is None:
+        entry = render_uncached(text)
+        cache_put(digest, *entry)
+    return entry
+
+
+def render_markdown(text: Optional[str]) -> Optional[str]:
+    """Синхронный рендер с LRU в процессе (используется в ORM-событиях при записи)"""
+    if not text:
+        return None
+    entry = cache_get(content_digest(text))
+    return entry[0] if entry is not None else render_with_mentions(text)[0]
+
+
+def extract_mentions(text: Optional[str]) -> List[str]:
+    """
+    Упомянутые имена в порядке появления, без повторов.
+
+    Берутся из того же разбора, что и HTML: @ внутри кода и e-mail не считаются,
+    а текст, только что отрендеренный при записи, повторно не разбирается.
+    """
+    if not text or "@" not in text:
+        return []
+    return render_with_mentions(text)[1]
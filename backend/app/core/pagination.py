@@ -0,0 +1,126 @@
+# backend/app/core/pagination.py
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.schemas.base import CursorParams, CursorPage
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Упаковать значения ключа сортировки последней строки в непрозрачный курсор"""
+    payload = []
+    for value in values:
+        if isinstance(value, datetime):
+            payload.append({"t": "dt", "v": value.isoformat()})
+        elif isinstance(value, uuid.UUID):
+            payload.append({"t": "uuid", "v": str(value)})
+        else:
+            payload.append({"t": "raw", "v": value})
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = []
+        for item in payload:
+            if item["t"] == "dt":
+                values.append(datetime.fromisoformat(item["v"]))
+            elif item["t"] == "uuid":
+                values.append(uuid.UUID(item["v"]))
+            else:
+                values.append(item["v"])
+        return values
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+class _Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) <stmt> как обычный исполняемый запрос.
+
+    Параметры stmt остаются bind-параметрами драйвера (с обработкой типов),
+    а не подставляются в текст SQL литералами.
+    """
+    inherit_cache = False
+
+    def __init__(self, stmt: Select):
+        self.stmt = stmt
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+async def estimate_count(session: AsyncSession, stmt: Select) -> int:
+    """Оценка числа строк по плану запроса (без выполнения COUNT(*))"""
+    result = await session.execute(_Explain(stmt))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def paginate_keyset(
+    session: AsyncSession,
+    stmt: Select,
+    order_columns: Sequence[Any],
+    params: CursorParams,
+    descending: bool = True,
+) -> CursorPage:
+    """
+    Keyset-пагинация: WHERE (col1, col2) < (:v1, :v2) ORDER BY col1, col2 LIMIT n+1.
+
+    order_columns - столбцы сортировки, последний должен быть уникальным (обычно id).
+    Первый столбец дополнительно ограничивается отдельным предикатом, чтобы
+    индексы вида (project_id, created_at DESC) использовались как условие поиска,
+    а не как фильтр - глубокие страницы стоят столько же, сколько первая.
+    """
+    base_stmt = stmt
+
+    if params.cursor:
+        values = decode_cursor(params.cursor)
+        if len(values) != len(order_columns):
+            raise ValueError('Invalid cursor')
+        lead_column, lead_value = order_columns[0], values[0]
+        if descending:
+            stmt = stmt.where(lead_column <= lead_value, tuple_(*order_columns) < tuple_(*values))
+        else:
+            stmt = stmt.where(lead_column >= lead_value, tuple_(*order_columns) > tuple_(*values))
+
+    ordering = [c.desc() if descending else c.asc() for c in order_columns]
+    stmt = stmt.order_by(*ordering).limit(params.limit + 1)
+
+    rows = (await session.execute(stmt)).scalars().all()
+    has_more = len(rows) > params.limit
+    items = list(rows[:params.limit])
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in order_columns])
+
+    total: Optional[int] = None
+    if params.total == "exact":
+        count_stmt = select(func.count()).select_from(base_stmt.order_by(None).subquery())
+        total = (await session.execute(count_stmt)).scalar_one()
+    elif params.total == "estimate":
+        total = await estimate_count(session, base_stmt.order_by(None))
+
+    return CursorPage(
+        items=items,
+        next_cursor=next_cursor,
+        has_more=has_more,
+        total=total,
+        total_is_estimate=params.total == "estimate",
+    )
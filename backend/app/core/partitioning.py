@@ -0,0 +1,152 @@
+# backend/app/core/partitioning.py
+import uuid
+from datetime import date
+from typing import List
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+DEFAULT_PARTITION = "issues_default"
+
+
+def issues_partition_by() -> str:
+    """
+    Стратегия партиционирования issues (ISSUES_PARTITIONING):
+    list - отдельная партиция на каждый проект + партиция по умолчанию,
+    hash - фиксированное число партиций для множества мелких проектов.
+    """
+    if settings.ISSUES_PARTITIONING == "hash":
+        return "HASH (project_id)"
+    if settings.ISSUES_PARTITIONING == "list":
+        return "LIST (project_id)"
+    raise ValueError(f'Unknown ISSUES_PARTITIONING: {settings.ISSUES_PARTITIONING}')
+
+
+def issues_initial_partitions_ddl() -> List[str]:
+    """Партиции, создаваемые вместе с таблицей issues"""
+    if settings.ISSUES_PARTITIONING == "hash":
+        modulus = settings.ISSUES_HASH_PARTITIONS
+        return [
+            f"CREATE TABLE IF NOT EXISTS issues_h{i} PARTITION OF issues "
+            f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {i})"
+            for i in range(modulus)
+        ]
+    return [f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF issues DEFAULT"]
+
+
+def uses_project_partitions() -> bool:
+    return settings.ISSUES_PARTITIONING == "list"
+
+
+def project_partition_name(project_id) -> str:
+    return f"issues_p_{uuid.UUID(str(project_id)).hex}"
+
+
+def create_project_partition(connection, project_id) -> None:
+    """
+    Партиция задач нового проекта (только для LIST).
+
+    Таблица создается отдельно и подключается через ATTACH PARTITION: на самой issues
+    это SHARE UPDATE EXCLUSIVE вместо ACCESS EXCLUSIVE у CREATE ... PARTITION OF.
+    CHECK-ограничение позволяет Postgres не сканировать новую таблицу при подключении.
+
+    Но ATTACH берет ACCESS EXCLUSIVE на issues_default (и сканирует ее: нет ли там
+    строк проекта), а копирование внешнего ключа - SHARE ROW EXCLUSIVE на projects.
+    Блокировки держатся до commit, поэтому вне обслуживания вызывать только
+    в отдельной короткой транзакции (см. _create_project_partition в app/models/project.py).
+    """
+    if not uses_project_partitions():
+        return
+    project_id = uuid.UUID(str(project_id))
+    name = project_partition_name(project_id)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} "
+        f"(LIKE issues INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+    ))
+    connection.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_project CHECK (project_id = '{project_id}')"
+    ))
+    connection.execute(text(f"ALTER TABLE issues ATTACH PARTITION {name} FOR VALUES IN ('{project_id}')"))
+
+
+def drop_project_partition(connection, project_id) -> None:
+    """
+    Удалить пустую партицию удаленного проекта.
+
+    Внешние ключи на issues (issue_links, attachments, ...) заводят зависимости
+    и на каждую партицию, поэтому DROP подключенной партиции невозможен -
+    сначала DETACH (строк проекта к этому моменту нет, каскад их уже удалил).
+    """
+    if not uses_project_partitions():
+        return
+    name = project_partition_name(project_id)
+    attached = connection.execute(text(
+        "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:name) AND inhparent = 'issues'::regclass"
+    ), {"name": name}).scalar()
+    if attached:
+        connection.execute(text(f"ALTER TABLE issues DETACH PARTITION {name}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+
+# Помесячные RANGE-партиции (issue_history, activities)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def existing_partitions(connection, table: str) -> List[str]:
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+    ), {"table": table})
+    return [r[0] for r in rows]
+
+
+def _create_month_partitions(connection, table: str, months: List[date]) -> List[str]:
+    existing = set(existing_partitions(connection, table))
+    created = []
+    for month in months:
+        name = month_partition_name(table, month)
+        if name in existing:
+            continue
+        connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+        ))
+        created.append(name)
+    return created
+
+
+def ensure_monthly_partitions(connection, table: str, months_ahead: int, months_back: int = 0) -> List[str]:
+    """
+    Создать недостающие партиции от текущего месяца - months_back до + months_ahead.
+
+    Вызывается при создании таблицы и периодически (см. app/services/retention.py);
+    lock_timeout не дает очереди блокировок на родительской таблице вырасти,
+    если ее держит долгий запрос, - партиция будет создана при следующем запуске.
+    """
+    current = date.today().replace(day=1)
+    months = [add_months(current, offset) for offset in range(-months_back, months_ahead + 1)]
+    return _create_month_partitions(connection, table, months)
+
+
+def ensure_range_partitions(connection, table: str, start: date, end: date) -> List[str]:
+    """
+    Партиции для всех месяцев с start по end включительно.
+
+    Нужны при записи задним числом (импорт истории): партиции по умолчанию
+    нет, и строка без партиции своего месяца не вставится.
+    """
+    month, last = start.replace(day=1), end.replace(day=1)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return _create_month_partitions(connection, table, months)
@@ -0,0 +1,206 @@
+# backend/app/core/permissions.py
+"""
+Скомпилированные права пользователя в проекте.
+
+User.role, ProjectMember.role и ProjectMember.permissions (JSON) сводятся
+в одну битовую маску на пару (user, project). Маска кэшируется в процессе
+(PermissionCache) и в Redis (hash perm:u:<user_id>, поле - project_id);
+загрузка и сброс - app/services/permissions.py.
+
+Изменения участников, ролей и владельца проекта отмечаются ORM-событиями
+в session.info и после commit сбрасывают Redis и кэши всех процессов.
+"""
+import asyncio
+import enum
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Mapping, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.redis import get_redis
+
+INVALIDATION_CHANNEL = "perm:invalidate"
+GENERATION_KEY = "perm:gen"  # растет при каждом сбросе: маски, скомпилированные до него, в Redis не пишутся
+
+
+class Permission(enum.IntFlag):
+    VIEW = 1
+    CREATE = 2
+    EDIT = 4  # чужие задачи и комментарии; свои - при наличии CREATE
+    DELETE = 8  # чужие; свои - при наличии CREATE
+    MANAGE_MEMBERS = 16
+    MANAGE_PROJECT = 32
+
+
+ALL_PERMISSIONS = int(
+    Permission.VIEW | Permission.CREATE | Permission.EDIT | Permission.DELETE
+    | Permission.MANAGE_MEMBERS | Permission.MANAGE_PROJECT
+)
+
+# ключ ProjectMember.permissions -> бит; значения по умолчанию - как у колонки
+MEMBER_FLAGS = {
+    "can_create": (Permission.CREATE, True),
+    "can_edit": (Permission.EDIT, True),
+    "can_delete": (Permission.DELETE, False),
+    "can_manage_members": (Permission.MANAGE_MEMBERS, False),
+}
+
+# имена ролей (как в БД) -> верхняя граница прав участника
+GLOBAL_ADMIN_ROLES = frozenset({"SUPER_ADMIN", "ADMIN"})
+ROLE_CAPS = {
+    "PROJECT_ADMIN": ALL_PERMISSIONS,
+    "VIEWER": int(Permission.VIEW),
+}
+
+
+def compile_permissions(
+    user_role: Optional[str],
+    member_role: Optional[str],
+    member_permissions: Optional[Mapping[str, Any]],
+    is_member: bool,
+    is_owner: bool = False,
+    is_public: bool = False,
+) -> int:
+    """Маска прав пользователя в проекте"""
+    if user_role in GLOBAL_ADMIN_ROLES or is_owner:
+        return ALL_PERMISSIONS
+    if not is_member:
+        return int(Permission.VIEW) if is_public else 0
+    if member_role == "PROJECT_ADMIN":
+        return ALL_PERMISSIONS
+    if isinstance(member_permissions, str):
+        member_permissions = json.loads(member_permissions)
+    flags = member_permissions or {}
+    mask = Permission.VIEW
+    for key, (flag, default) in MEMBER_FLAGS.items():
+        if flags.get(key, default):
+            mask |= flag
+    return int(mask) & ROLE_CAPS.get(member_role, ALL_PERMISSIONS)
+
+
+def allows(mask: int, permission: Permission, own: bool = False) -> bool:
+    """Проверка маски; для своих объектов EDIT/DELETE дает право создания"""
+    if mask & permission == permission:
+        return True
+    return own and permission in (Permission.EDIT, Permission.DELETE) and bool(mask & Permission.CREATE)
+
+
+class PermissionCache:
+    """
+    Маски по (user_id, project_id) в процессе.
+
+    Сбрасывается после commit изменений участников (и сообщением из Redis
+    в других процессах); TTL ограничивает устаревание, если сообщение потеряно.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[Any, Any], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, project_id) -> Optional[int]:
+        entry = self._entries.get((user_id, project_id))
+        if entry is None:
+            return None
+        mask, expires_at = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._entries.pop((user_id, project_id), None)
+            return None
+        return mask
+
+    def put(self, user_id, project_id, mask: int) -> int:
+        with self._lock:
+            self._entries[(user_id, project_id)] = (mask, time.monotonic() + self.ttl)
+        return mask
+
+    def invalidate(self, user_ids: Iterable = (), project_ids: Iterable = ()) -> None:
+        user_ids, project_ids = set(user_ids), set(project_ids)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in user_ids or k[1] in project_ids]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+permission_cache = PermissionCache()
+
+
+def user_key(user_id) -> str:
+    return f"perm:u:{user_id}"
+
+
+def project_key(project_id) -> str:
+    """Множество пользователей, у которых в Redis есть маска для проекта"""
+    return f"perm:p:{project_id}"
+
+
+async def publish_invalidation(user_ids: Iterable = (), project_ids: Iterable = ()) -> None:
+    """Удалить маски из Redis и сбросить кэши всех процессов"""
+    users = {str(u) for u in user_ids}
+    projects = {str(p) for p in project_ids}
+    redis = get_redis()
+    if projects:
+        pipe = redis.pipeline(transaction=False)
+        for project_id in projects:
+            pipe.smembers(project_key(project_id))
+        for members in await pipe.execute():
+            users |= set(members)
+    pipe = redis.pipeline(transaction=True)
+    for user_id in users:
+        pipe.delete(user_key(user_id))
+    for project_id in projects:
+        pipe.delete(project_key(project_id))
+    pipe.incr(GENERATION_KEY)
+    pipe.publish(INVALIDATION_CHANNEL, json.dumps({"users": sorted(users), "projects": sorted(projects)}))
+    await pipe.execute()
+
+
+def mark_changed(session: Optional[Session], user_ids: Iterable = (), project_ids: Iterable = ()) -> None:
+    """Вызывается из ORM-событий: сбросить кэш процесса сразу, остальное - после commit"""
+    user_ids = [u for u in user_ids if u is not None]
+    project_ids = [p for p in project_ids if p is not None]
+    permission_cache.invalidate(user_ids, project_ids)
+    if session is None:
+        return
+    users, projects = session.info.setdefault("permission_changes", (set(), set()))
+    users.update(user_ids)
+    projects.update(project_ids)
+
+
+def _log_failure(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error("Permission cache invalidation failed")
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    changes = session.info.pop("permission_changes", None)
+    if not changes:
+        return
+    users, projects = changes
+    permission_cache.invalidate(users, projects)  # чтения внутри транзакции могли закэшировать старое
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # синхронный код без event loop (скрипты): Redis догонит по TTL
+        logger.warning("Permission changes committed outside event loop, Redis cache expires by TTL")
+        return
+    loop.create_task(publish_invalidation(users, projects)).add_done_callback(_log_failure)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("permission_changes", None)
+
+
+def parse_invalidation(payload: str) -> Tuple[Set[uuid.UUID], Set[uuid.UUID]]:
+    message = json.loads(payload)
+    return {uuid.UUID(u) for u in message.get("users", ())}, {uuid.UUID(p) for p in message.get("projects", ())}
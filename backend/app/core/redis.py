@@ -0,0 +1,23 @@
+# backend/app/core/redis.py
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Общий на процесс клиент Redis (пул соединений внутри клиента)"""
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True, health_check_interval=30)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,48 @@
+# backend/app/core/storage.py
+"""
+Клиент S3/MinIO.
+
+boto3 синхронный: вызовы из async-кода выполняются через asyncio.to_thread.
+Клиент потокобезопасен и создается один раз на процесс.
+"""
+import asyncio
+import functools
+from typing import Any, AsyncIterator
+
+import boto3
+from botocore.config import Config
+
+from app.core.config import settings
+
+STREAM_CHUNK = 1024 * 1024
+
+
+@functools.lru_cache(maxsize=1)
+def get_s3():
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.AWS_ENDPOINT_URL,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION,
+        config=Config(max_pool_connections=50, retries={"max_attempts": 3, "mode": "standard"}),
+    )
+
+
+async def s3_call(method: str, **kwargs) -> Any:
+    """Вызвать метод клиента S3 в пуле потоков"""
+    return await asyncio.to_thread(getattr(get_s3(), method), **kwargs)
+
+
+async def iter_object(bucket: str, key: str, chunk_size: int = STREAM_CHUNK) -> AsyncIterator[bytes]:
+    """Потоковое чтение объекта без загрузки целиком в память"""
+    response = await s3_call("get_object", Bucket=bucket, Key=key)
+    body = response["Body"]
+    try:
+        while True:
+            chunk = await asyncio.to_thread(body.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        body.close()
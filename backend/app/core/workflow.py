@@ -0,0 +1,84 @@
+# backend/app/core/workflow.py
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """Неизменяемое представление workflow проекта из Project.settings['workflow']"""
+    statuses: FrozenSet[str]
+    transitions: Mapping[str, FrozenSet[str]]
+    initial: Optional[str]
+    final: FrozenSet[str]
+
+    def is_valid(self, status: str) -> bool:
+        # Пустой список статусов - workflow не настроен, допускаем любой статус
+        return not self.statuses or status in self.statuses
+
+    def can_transition(self, from_status: Optional[str], to_status: str) -> bool:
+        if not self.is_valid(to_status):
+            return False
+        if from_status is None or from_status == to_status or not self.transitions:
+            return True
+        return to_status in self.transitions.get(from_status, frozenset())
+
+
+def compile_workflow(settings: Optional[Dict[str, Any]]) -> CompiledWorkflow:
+    workflow = (settings or {}).get('workflow', {}) or {}
+    statuses = workflow.get('statuses', []) or []
+    transitions = {}
+    for transition in workflow.get('transitions', []) or []:
+        targets = transition.get('to', [])
+        if isinstance(targets, str):
+            targets = [targets]
+        transitions.setdefault(transition['from'], set()).update(targets)
+    return CompiledWorkflow(
+        statuses=frozenset(s['id'] for s in statuses),
+        transitions=MappingProxyType({k: frozenset(v) for k, v in transitions.items()}),
+        initial=next((s['id'] for s in statuses if s.get('is_initial')), None),
+        final=frozenset(s['id'] for s in statuses if s.get('is_final')),
+    )
+
+
+class WorkflowCache:
+    """
+    Кэш скомпилированных workflow по project_id.
+
+    Внутри процесса сбрасывается событием обновления Project.settings;
+    TTL ограничивает устаревание, если настройки изменил другой воркер.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._entries: Dict[Any, Tuple[CompiledWorkflow, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, project_id) -> Optional[CompiledWorkflow]:
+        entry = self._entries.get(project_id)
+        if entry is None:
+            return None
+        workflow, expires_at = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._entries.pop(project_id, None)
+            return None
+        return workflow
+
+    def put(self, project_id, settings: Optional[Dict[str, Any]]) -> CompiledWorkflow:
+        workflow = compile_workflow(settings)
+        with self._lock:
+            self._entries[project_id] = (workflow, time.monotonic() + self.ttl)
+        return workflow
+
+    def invalidate(self, project_id=None) -> None:
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(project_id, None)
+
+
+workflow_cache = WorkflowCache()
@@ -0,0 +1,60 @@
+# backend/app/models/analytics.py
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, ForeignKeyConstraint, Index, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+
+from app.core.database import Base
+
+class IssueCycleStat(Base):
+    """
+    Длительности по задаче, восстановленные из issue_history (changed_field = 'status').
+
+    lead_seconds - от создания до закрытия, cycle_seconds - от первой смены
+    статуса (начала работы) до закрытия; у открытых задач NULL.
+    time_in_status - {status: секунд}, для текущего статуса - до computed_at.
+    """
+    __tablename__ = "issue_cycle_stats"
+    
+    issue_id = Column(UUID(as_uuid=True), primary_key=True)
+    project_id = Column(UUID(as_uuid=True), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    closed_at = Column(DateTime(timezone=True))
+    lead_seconds = Column(Integer)
+    cycle_seconds = Column(Integer)
+    time_in_status = Column(JSONB, nullable=False, default={})
+    computed_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    
+    __table_args__ = (
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
+        Index('idx_issue_cycle_stats_project', project_id),
+    )
+    
+    def __repr__(self):
+        return f"<IssueCycleStat(issue_id={self.issue_id}, lead={self.lead_seconds}, cycle={self.cycle_seconds})>"
+
+
+class IssueFlowSummary(Base):
+    """
+    Готовые массивы для графиков эффективности и воронки: (project_id, dimension, bucket).
+
+    dimension: all (bucket = ''), type, priority. Перцентили и гистограммы
+    lead/cycle time - в часах по закрытым задачам, границы корзин и уровни
+    перцентилей - HISTOGRAM_HOURS и PERCENTILES в app/services/analytics.py.
+    funnel - {status: сколько задач когда-либо было в статусе}.
+    """
+    __tablename__ = "issue_flow_summaries"
+    
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    bucket = Column(String(50), primary_key=True, default="")
+    issues = Column(Integer, nullable=False, default=0)
+    closed = Column(Integer, nullable=False, default=0)
+    lead_percentiles = Column(ARRAY(Float), nullable=False, default=[])
+    cycle_percentiles = Column(ARRAY(Float), nullable=False, default=[])
+    lead_histogram = Column(ARRAY(Integer), nullable=False, default=[])
+    cycle_histogram = Column(ARRAY(Integer), nullable=False, default=[])
+    status_median_hours = Column(JSONB, nullable=False, default={})
+    funnel = Column(JSONB, nullable=False, default={})
+    computed_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    
+    def __repr__(self):
+        return f"<IssueFlowSummary(project_id={self.project_id}, {self.dimension}:{self.bucket}, issues={self.issues})>"
@@ -1,10 +1,11 @@
 # backend/app/models/attachment.py
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum, CheckConstraint, BigInteger
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, ForeignKeyConstraint, Enum, CheckConstraint, BigInteger, Index, DateTime, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship, validates
 import enum
 
-from app.core.database import Base, generate_uuid
+from app.core.config import settings
+from app.core.database import Base, TimestampMixin, generate_uuid, register_ddl, transition_triggers
 
 class FileType(str, enum.Enum):
     IMAGE = "image"
@@ -22,9 +23,10 @@ class Attachment(Base):
     mime_type = Column(String(100), nullable=False)
     file_type = Column(Enum(FileType), nullable=False)
     size_bytes = Column(BigInteger, nullable=False)
-    storage_path = Column(String(500), unique=True, nullable=False)
+    storage_path = Column(String(500), nullable=False)  # путь blob, общий для одинаковых файлов
     storage_bucket = Column(String(100), default="attachments")
-    issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"))
+    sha256 = Column(String(64), ForeignKey("attachment_blobs.sha256", ondelete="RESTRICT"))
+    issue_id = Column(UUID(as_uuid=True))
     comment_id = Column(UUID(as_uuid=True), ForeignKey("comments.id", ondelete="CASCADE"))
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     uploaded_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -32,7 +34,8 @@ class Attachment(Base):
     created_at = Column(DateTime(timezone=True), default=func.now())
     
     # Relationships
-    issue = relationship("Issue", back_populates="attachments")
+    blob = relationship("AttachmentBlob")
+    issue = relationship("Issue", back_populates="attachments", overlaps="project")
     comment = relationship("Comment", back_populates="attachments")
     project = relationship("Project")
     uploader = relationship("User", foreign_keys=[uploaded_by])
@@ -44,14 +47,16 @@ class Attachment(Base):
             name="check_attachment_reference"
         ),
         CheckConstraint("size_bytes > 0", name="check_positive_size"),
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
         Index('idx_attachments_issue', issue_id),
         Index('idx_attachments_comment', comment_id),
         Index('idx_attachments_project', project_id),
+        Index('idx_attachments_sha256', sha256),
     )
     
     @validates('size_bytes')
     def validate_size(self, key, size):
-        max_size = 50 * 1024 * 1024  # 50MB
+        max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
         if size > max_size:
             raise ValueError(f'File size exceeds maximum of {max_size} bytes')
         return size
@@ -60,6 +65,28 @@ class Attachment(Base):
         return f"<Attachment(id={self.id}, filename='{self.filename}', size={self.size_bytes})>"
 
 
+class AttachmentBlob(Base):
+    """Содержимое файла, адресуемое по sha256; ref_count поддерживается триггерами на attachments"""
+    __tablename__ = "attachment_blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    storage_bucket = Column(String(100), nullable=False)
+    storage_path = Column(String(500), unique=True, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    unreferenced_since = Column(DateTime(timezone=True))  # для GC с отсрочкой
+    created_at = Column(DateTime(timezone=True), default=func.now())
+    
+    __table_args__ = (
+        CheckConstraint("ref_count >= 0", name="check_blob_ref_count"),
+        Index('idx_attachment_blobs_unreferenced', unreferenced_since, postgresql_where=ref_count == 0),
+    )
+    
+    def __repr__(self):
+        return f"<AttachmentBlob(sha256='{self.sha256[:12]}', refs={self.ref_count})>"
+
+
 class ImagePreview(Base):
     __tablename__ = "image_previews"
     
@@ -78,4 +105,71 @@ class ImagePreview(Base):
     )
     
     def __repr__(self):
-        return f"<ImagePreview(attachment_id={self.attachment_id}, {self.width}x{self.height})>"
\ No newline at end of file
+        return f"<ImagePreview(attachment_id={self.attachment_id}, {self.width}x{self.height})>"
+
+
+class UploadStatus(str, enum.Enum):
+    ACTIVE = "active"
+    COMPLETED = "completed"
+    ABORTED = "aborted"
+
+class UploadSession(Base, TimestampMixin):
+    """Возобновляемая загрузка: S3 multipart upload и уже принятые части"""
+    __tablename__ = "upload_sessions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    issue_id = Column(UUID(as_uuid=True))
+    comment_id = Column(UUID(as_uuid=True), ForeignKey("comments.id", ondelete="CASCADE"))
+    uploaded_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    original_name = Column(String(255), nullable=False)
+    description = Column(Text)
+    storage_path = Column(String(500), unique=True, nullable=False)
+    storage_bucket = Column(String(100), nullable=False)
+    s3_upload_id = Column(String(1024), nullable=False)
+    status = Column(Enum(UploadStatus), nullable=False, default=UploadStatus.ACTIVE)
+    mime_type = Column(String(100))  # определяется по первому чанку
+    expected_size = Column(BigInteger)
+    bytes_received = Column(BigInteger, nullable=False, default=0)  # только подтвержденные S3 части
+    parts = Column(JSONB, nullable=False, default=list)  # [{"PartNumber": n, "ETag": "..."}]
+    sha256 = Column(String(64))
+    attachment_id = Column(UUID(as_uuid=True), ForeignKey("attachments.id", ondelete="SET NULL"))
+    
+    __table_args__ = (
+        CheckConstraint(
+            "(issue_id IS NOT NULL AND comment_id IS NULL) OR (issue_id IS NULL AND comment_id IS NOT NULL)",
+            name="check_upload_reference"
+        ),
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
+        Index('idx_upload_sessions_status_updated', status, 'updated_at'),
+    )
+    
+    def __repr__(self):
+        return f"<UploadSession(id={self.id}, status={self.status}, received={self.bytes_received})>"
+
+
+
+# Счетчик ссылок обновляется одним UPDATE на оператор: массовое удаление
+# вложений задачи не дает отдельного обновления на каждую строку
+_BLOB_REF_DELTAS = "SELECT r.sha256, {sign} AS delta FROM {table} r WHERE r.sha256 IS NOT NULL"
+
+_APPLY_BLOB_REF_DELTAS = """
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+BEGIN
+    UPDATE attachment_blobs b
+    SET ref_count = b.ref_count + d.delta,
+        unreferenced_since = CASE WHEN b.ref_count + d.delta = 0 THEN now() END
+    FROM (
+        SELECT sha256, sum(delta) AS delta
+        FROM ({deltas}) x
+        GROUP BY sha256
+        HAVING sum(delta) <> 0
+    ) d
+    WHERE b.sha256 = d.sha256;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+BLOB_REFS_DDL = transition_triggers("attachments", "attachment_blob_refs", _APPLY_BLOB_REF_DELTAS, _BLOB_REF_DELTAS)
+register_ddl(BLOB_REFS_DDL)
@@ -1,52 +1,78 @@
 # backend/app/models/comment.py
-from sqlalchemy import Column, Text, Boolean, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, SmallInteger, Text, Boolean, ForeignKey, ForeignKeyConstraint, Index, Computed, DateTime, func, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
 from sqlalchemy.orm import relationship
+from sqlalchemy import event
 
+from app.core.config import settings
 from app.core.database import Base, TimestampMixin, generate_uuid
+from app.core.markdown import RENDERER_VERSION, render_markdown
+from app.core.partitioning import ensure_monthly_partitions
 
 class Comment(Base, TimestampMixin):
     __tablename__ = "comments"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-    issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"), nullable=False)
+    issue_id = Column(UUID(as_uuid=True), nullable=False)
+    project_id = Column(UUID(as_uuid=True), nullable=False)  # часть ключа issues (партиционирование)
     author_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="RESTRICT"), nullable=False)
     content = Column(Text, nullable=False)
     content_html = Column(Text)
+    html_version = Column(SmallInteger)  # версия рендерера content_html
     is_internal = Column(Boolean, default=False)
     
+    # Полнотекстовый поиск (вес C - ниже, чем у заголовка и описания задачи)
+    search_vector = Column(
+        TSVECTOR,
+        Computed("setweight(to_tsvector('russian', coalesce(content, '')), 'C')", persisted=True)
+    )
+    
     # Relationships
     issue = relationship("Issue", back_populates="comments")
     author = relationship("User", back_populates="comments")
     attachments = relationship("Attachment", back_populates="comment", cascade="all, delete-orphan")
     
     __table_args__ = (
-        Index('idx_comments_issue_created', issue_id, created_at.desc()),
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
+        Index('idx_comments_issue_created', issue_id, text("created_at DESC")),
+        Index('idx_comments_search', search_vector, postgresql_using='gin'),
     )
     
     def __repr__(self):
         return f"<Comment(id={self.id}, issue_id={self.issue_id}, author_id={self.author_id})>"
 
 
+@event.listens_for(Comment.content, "set")
+def _render_content(target, value, oldvalue, initiator):
+    # HTML строится при записи, чтение никогда не рендерит
+    target.content_html = render_markdown(value)
+    target.html_version = RENDERER_VERSION
+
+
 class IssueHistory(Base):
     __tablename__ = "issue_history"
     
+    # created_at входит в первичный ключ: таблица партиционирована по месяцам
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-    issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"), nullable=False)
+    issue_id = Column(UUID(as_uuid=True), nullable=False)
+    project_id = Column(UUID(as_uuid=True), nullable=False)
     changed_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     changed_field = Column(String(100), nullable=False)
     old_value = Column(Text)
     new_value = Column(Text)
     change_data = Column(JSONB)
-    created_at = Column(DateTime(timezone=True), default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, default=func.now())
     
     # Relationships
     issue = relationship("Issue", back_populates="history")
     changer = relationship("User", foreign_keys=[changed_by])
     
     __table_args__ = (
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
         Index('idx_issue_history_issue_created', issue_id, created_at.desc()),
         Index('idx_issue_history_field', changed_field),
+        Index('idx_issue_history_project_created', project_id, created_at),
+        {'postgresql_partition_by': 'RANGE (created_at)'}
     )
     
     def __repr__(self):
@@ -58,22 +84,30 @@ class Activity(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
-    issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"))
+    issue_id = Column(UUID(as_uuid=True))
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     activity_type = Column(String(50), nullable=False)
     data = Column(JSONB, default={})
-    created_at = Column(DateTime(timezone=True), default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, default=func.now())
     
     # Relationships
     project = relationship("Project", back_populates="activities")
-    issue = relationship("Issue")
+    issue = relationship("Issue", overlaps="project,activities")
     user = relationship("User")
     
     __table_args__ = (
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
         Index('idx_activities_project_created', project_id, created_at.desc()),
         Index('idx_activities_issue', issue_id),
         Index('idx_activities_type', activity_type),
+        {'postgresql_partition_by': 'RANGE (created_at)'}
     )
     
     def __repr__(self):
-        return f"<Activity(type='{self.activity_type}', project_id={self.project_id})>"
\ No newline at end of file
+        return f"<Activity(type='{self.activity_type}', project_id={self.project_id})>"
+
+
+@event.listens_for(IssueHistory.__table__, "after_create")
+@event.listens_for(Activity.__table__, "after_create")
+def _create_month_partitions(target, connection, **kw):
+    ensure_monthly_partitions(connection, target.name, settings.PARTITIONS_AHEAD_MONTHS)
\ No newline at end of file
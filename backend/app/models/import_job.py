@@ -0,0 +1,36 @@
+# backend/app/models/import_job.py
+from sqlalchemy import Column, String, Integer, ForeignKey, Enum, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
+import enum
+
+from app.core.database import Base, TimestampMixin, generate_uuid
+
+class ImportStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ImportJob(Base, TimestampMixin):
+    """Задача массового импорта; records_done фиксируется в одной транзакции с батчем"""
+    __tablename__ = "import_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    source_name = Column(String(500), nullable=False)
+    source_format = Column(String(10), nullable=False)  # csv, ndjson
+    status = Column(Enum(ImportStatus), nullable=False, default=ImportStatus.PENDING)
+    records_done = Column(Integer, nullable=False, default=0)
+    issues_imported = Column(Integer, nullable=False, default=0)
+    records_failed = Column(Integer, nullable=False, default=0)
+    errors = Column(JSONB, default=list)  # последние ошибки валидации: [{"record": n, "error": "..."}]
+    finished_at = Column(DateTime(timezone=True))
+
+    # Relationships
+    project = relationship("Project")
+    creator = relationship("User", foreign_keys=[created_by])
+
+    def __repr__(self):
+        return f"<ImportJob(id={self.id}, status={self.status}, done={self.records_done})>"
@@ -1,12 +1,17 @@
 # backend/app/models/issue.py
-from sqlalchemy import Column, String, Integer, Boolean, Text, ForeignKey, Enum, CheckConstraint, Index, Computed
-from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy import Column, String, Integer, SmallInteger, Boolean, Text, ForeignKey, ForeignKeyConstraint, Enum, CheckConstraint, Index, Computed, DateTime, DDL, func, event, text
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import object_session, relationship, validates
 from sqlalchemy.sql import expression
 import enum
 from datetime import datetime
 
-from app.core.database import Base, TimestampMixin, generate_uuid
+from app.core.database import Base, TimestampMixin, generate_uuid, register_ddl
+from app.core.markdown import RENDERER_VERSION, render_markdown
+from app.core.partitioning import issues_partition_by, issues_initial_partitions_ddl
+from app.core.graph import mark_graph_changed
+from app.core.workflow import workflow_cache
+from app.models.project import issue_key_sequence_name
 
 class IssueType(str, enum.Enum):
     BUG = "bug"
@@ -20,6 +25,9 @@ class IssuePriority(str, enum.Enum):
     MEDIUM = "medium"
     LOW = "low"
 
+# Статусы, в которых задача считается закрытой (колонка is_closed)
+CLOSED_STATUSES = ('closed', 'resolved')
+
 class IssueLinkType(str, enum.Enum):
     BLOCKS = "blocks"
     IS_BLOCKED_BY = "is_blocked_by"
@@ -32,12 +40,15 @@ class IssueLinkType(str, enum.Enum):
 class Issue(Base, TimestampMixin):
     __tablename__ = "issues"
     
+    # Составной первичный ключ: у партиционированной таблицы ключ партиционирования
+    # должен входить во все уникальные ограничения
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
     key = Column(String(50), nullable=False)
     title = Column(String(500), nullable=False)
     description = Column(Text)
     description_html = Column(Text)
+    html_version = Column(SmallInteger)  # версия рендерера description_html
     type = Column(Enum(IssueType), default=IssueType.BUG)
     status = Column(String(50), nullable=False, default="open")
     priority = Column(Enum(IssuePriority), default=IssuePriority.MEDIUM)
@@ -54,32 +65,42 @@ class Issue(Base, TimestampMixin):
         Boolean,
         Computed(
             expression.case(
-                (status.in_(['closed', 'resolved']), True),
+                (status.in_(CLOSED_STATUSES), True),
                 else_=False
             ),
             persisted=True
         )
     )
     
+    # Полнотекстовый поиск: заголовок (вес A) + описание (вес B)
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), 'B')",
+            persisted=True
+        )
+    )
+    
     # Relationships
     project = relationship("Project", back_populates="issues")
     assignee = relationship("User", back_populates="assigned_issues", foreign_keys=[assignee_id])
     reporter = relationship("User", back_populates="reported_issues", foreign_keys=[reporter_id])
     comments = relationship("Comment", back_populates="issue", cascade="all, delete-orphan")
     tags = relationship("IssueTag", back_populates="issue", cascade="all, delete-orphan")
-    attachments = relationship("Attachment", back_populates="issue", cascade="all, delete-orphan")
+    attachments = relationship("Attachment", back_populates="issue", cascade="all, delete-orphan", overlaps="project")
     history = relationship("IssueHistory", back_populates="issue", cascade="all, delete-orphan")
     
     # Links (both directions)
     outgoing_links = relationship(
         "IssueLink",
-        foreign_keys="IssueLink.source_issue_id",
+        foreign_keys="[IssueLink.source_issue_id, IssueLink.source_project_id]",
         back_populates="source_issue",
         cascade="all, delete-orphan"
     )
     incoming_links = relationship(
         "IssueLink",
-        foreign_keys="IssueLink.target_issue_id",
+        foreign_keys="[IssueLink.target_issue_id, IssueLink.target_project_id]",
         back_populates="target_issue",
         cascade="all, delete-orphan"
     )
@@ -87,41 +108,88 @@ class Issue(Base, TimestampMixin):
     __table_args__ = (
         Index('idx_issues_project_status', project_id, status, postgresql_where=expression.text("is_closed = false")),
         Index('idx_issues_assignee', assignee_id, postgresql_where=expression.text("assignee_id IS NOT NULL")),
-        Index('idx_issues_project_created', project_id, created_at.desc()),
+        Index('idx_issues_project_created', project_id, expression.text("created_at DESC")),
+        Index('idx_issues_project_closed', project_id, closed_at, postgresql_where=expression.text("closed_at IS NOT NULL")),
         Index('idx_issues_due_date', due_date, postgresql_where=expression.text("due_date IS NOT NULL")),
+        Index('idx_issues_search', search_vector, postgresql_using='gin'),
+        Index('uq_issues_project_key', project_id, key, unique=True),
         CheckConstraint("estimate_hours IS NULL OR estimate_hours >= 0", name="check_estimate_hours"),
         CheckConstraint("spent_hours >= 0", name="check_spent_hours"),
-        {'postgresql_partition_by': 'LIST (project_id)'}  # Для больших проектов можно партиционировать
+        {'postgresql_partition_by': issues_partition_by()}  # см. app/core/partitioning.py
     )
     
     @validates('status')
     def validate_status(self, key, status):
-        if self.project and self.project.settings:
-            valid_statuses = [s['id'] for s in self.project.settings.get('workflow', {}).get('statuses', [])]
-            if valid_statuses and status not in valid_statuses:
-                raise ValueError(f'Invalid status. Valid statuses: {valid_statuses}')
+        workflow = self._get_workflow()
+        if workflow is not None:
+            if not workflow.is_valid(status):
+                raise ValueError(f'Invalid status. Valid statuses: {sorted(workflow.statuses)}')
+            if not workflow.can_transition(self.status, status):
+                raise ValueError(f"Transition '{self.status}' -> '{status}' is not allowed")
         return status
     
+    def _get_workflow(self):
+        """Скомпилированный workflow проекта; Project загружается только при промахе кэша"""
+        project_id = self.project_id
+        if project_id is not None:
+            workflow = workflow_cache.get(project_id)
+            if workflow is not None:
+                return workflow
+        project = self.__dict__.get('project') if project_id is None else self.project
+        if project is None:
+            return None
+        return workflow_cache.put(project.id or project_id, project.settings)
+    
     def __repr__(self):
         return f"<Issue(id={self.id}, key='{self.key}', title='{self.title[:30]}...')>"
 
 
+for _statement in issues_initial_partitions_ddl():
+    event.listen(Issue.__table__, "after_create", DDL(_statement))
+
+
+@event.listens_for(Issue, "before_insert")
+def _assign_issue_key(mapper, connection, target):
+    # nextval не берет блокировок - параллельные создания задач не ждут друг друга
+    if target.key is None:
+        project_key, number = connection.execute(
+            text(f"SELECT key, nextval('{issue_key_sequence_name(target.project_id)}') FROM projects WHERE id = :id"),
+            {"id": target.project_id},
+        ).one()
+        target.key = f"{project_key}-{number}"
+
+
+@event.listens_for(Issue.description, "set")
+def _render_description(target, value, oldvalue, initiator):
+    # HTML строится при записи, чтение никогда не рендерит
+    target.description_html = render_markdown(value)
+    target.html_version = RENDERER_VERSION
+
+
 class IssueLink(Base):
     __tablename__ = "issue_links"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-    source_issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"), nullable=False)
-    target_issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"), nullable=False)
+    source_issue_id = Column(UUID(as_uuid=True), nullable=False)
+    source_project_id = Column(UUID(as_uuid=True), nullable=False)
+    target_issue_id = Column(UUID(as_uuid=True), nullable=False)
+    target_project_id = Column(UUID(as_uuid=True), nullable=False)
     link_type = Column(Enum(IssueLinkType), nullable=False)
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), default=func.now())
     
     # Relationships
-    source_issue = relationship("Issue", foreign_keys=[source_issue_id], back_populates="outgoing_links")
-    target_issue = relationship("Issue", foreign_keys=[target_issue_id], back_populates="incoming_links")
+    source_issue = relationship("Issue", foreign_keys=[source_issue_id, source_project_id], back_populates="outgoing_links")
+    target_issue = relationship("Issue", foreign_keys=[target_issue_id, target_project_id], back_populates="incoming_links")
     creator = relationship("User", foreign_keys=[created_by])
     
     __table_args__ = (
+        ForeignKeyConstraint(
+            [source_issue_id, source_project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"
+        ),
+        ForeignKeyConstraint(
+            [target_issue_id, target_project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"
+        ),
         Index('idx_issue_links_source', source_issue_id),
         Index('idx_issue_links_target', target_issue_id),
         Index('idx_issue_links_type', link_type),
@@ -132,6 +200,14 @@ class IssueLink(Base):
         return f"<IssueLink(source={self.source_issue_id}, target={self.target_issue_id}, type={self.link_type})>"
 
 
+@event.listens_for(IssueLink, "after_insert")
+@event.listens_for(IssueLink, "after_update")
+@event.listens_for(IssueLink, "after_delete")
+def _invalidate_graph(mapper, connection, target):
+    # Кэшированный граф проекта сбрасывается после commit любого изменения связей
+    mark_graph_changed(object_session(target), [target.source_project_id, target.target_project_id])
+
+
 class Tag(Base):
     __tablename__ = "tags"
     
@@ -157,8 +233,9 @@ class Tag(Base):
 class IssueTag(Base):
     __tablename__ = "issue_tags"
     
-    issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"), primary_key=True)
+    issue_id = Column(UUID(as_uuid=True), primary_key=True)
     tag_id = Column(UUID(as_uuid=True), ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(UUID(as_uuid=True), nullable=False)
     added_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     added_at = Column(DateTime(timezone=True), default=func.now())
     
@@ -167,5 +244,180 @@ class IssueTag(Base):
     tag = relationship("Tag", back_populates="issues")
     adder = relationship("User", foreign_keys=[added_by])
     
+    __table_args__ = (
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
+    )
+    
     def __repr__(self):
-        return f"<IssueTag(issue_id={self.issue_id}, tag_id={self.tag_id})>"
\ No newline at end of file
+        return f"<IssueTag(issue_id={self.issue_id}, tag_id={self.tag_id})>"
+
+class IssueRollup(Base):
+    """
+    Суммы по поддереву задачи в иерархии PARENT/CHILD.
+
+    self_* - копия собственных значений задачи (нужна, когда строка issues
+    уже удалена, а связь удаляется каскадом), desc_* - суммы по всем потомкам.
+    Строки есть только у задач, участвующих в иерархии; поддерживаются триггерами.
+    """
+    __tablename__ = "issue_rollups"
+    
+    issue_id = Column(UUID(as_uuid=True), primary_key=True)
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    self_estimate = Column(Integer, nullable=False, default=0)
+    self_spent = Column(Integer, nullable=False, default=0)
+    self_remaining = Column(Integer, nullable=False, default=0)
+    self_open = Column(Integer, nullable=False, default=0)
+    desc_estimate = Column(Integer, nullable=False, default=0)
+    desc_spent = Column(Integer, nullable=False, default=0)
+    desc_remaining = Column(Integer, nullable=False, default=0)
+    open_descendants = Column(Integer, nullable=False, default=0)
+    
+    @property
+    def total_estimate(self) -> int:
+        return self.self_estimate + self.desc_estimate
+    
+    @property
+    def total_spent(self) -> int:
+        return self.self_spent + self.desc_spent
+    
+    @property
+    def total_remaining(self) -> int:
+        return self.self_remaining + self.desc_remaining
+    
+    def __repr__(self):
+        return f"<IssueRollup(issue_id={self.issue_id}, estimate={self.total_estimate}, open={self.open_descendants})>"
+
+
+# Триггеры накопительных сумм: изменение часов/статуса задачи или связи
+# родитель-потомок применяется ко всей цепочке предков одним UPDATE
+HIERARCHY_EDGES_SQL = """
+edges AS NOT MATERIALIZED (
+    SELECT source_issue_id AS parent_id, target_issue_id AS child_id FROM issue_links WHERE link_type = 'PARENT'
+    UNION ALL
+    SELECT target_issue_id, source_issue_id FROM issue_links WHERE link_type = 'CHILD'
+)"""
+
+_NEW_HIERARCHY_LINKS = """
+SELECT CASE WHEN l.link_type = 'PARENT' THEN l.source_issue_id ELSE l.target_issue_id END AS parent_id,
+       CASE WHEN l.link_type = 'PARENT' THEN l.target_issue_id ELSE l.source_issue_id END AS child_id,
+       CASE WHEN l.link_type = 'PARENT' THEN l.target_project_id ELSE l.source_project_id END AS child_project,
+       CASE WHEN l.link_type = 'PARENT' THEN l.source_project_id ELSE l.target_project_id END AS parent_project
+FROM {table} l WHERE l.link_type IN ('PARENT', 'CHILD')"""
+
+REMAINING_SQL = "greatest(coalesce({t}.estimate_hours, 0) - coalesce({t}.spent_hours, 0), 0)"
+
+# {deltas}: (issue_id, est, spent, rem, open_cnt); {anchor}: с какой вершины начинать подъем
+_PROPAGATE = """
+    WITH RECURSIVE {edges},
+    d AS ({deltas}),
+    up(ancestor_id, est, spent, rem, open_cnt) AS (
+        {anchor}
+        UNION ALL
+        SELECT e.parent_id, up.est, up.spent, up.rem, up.open_cnt
+        FROM up JOIN edges e ON e.child_id = up.ancestor_id
+    )
+    UPDATE issue_rollups r
+    SET desc_estimate = r.desc_estimate + s.est,
+        desc_spent = r.desc_spent + s.spent,
+        desc_remaining = r.desc_remaining + s.rem,
+        open_descendants = r.open_descendants + s.open_cnt
+    FROM (
+        SELECT ancestor_id, sum(est) AS est, sum(spent) AS spent, sum(rem) AS rem, sum(open_cnt) AS open_cnt
+        FROM up GROUP BY ancestor_id
+    ) s
+    WHERE r.issue_id = s.ancestor_id;"""
+
+_FROM_PARENTS = "SELECT e.parent_id, d.est, d.spent, d.rem, d.open_cnt FROM d JOIN edges e ON e.child_id = d.issue_id"
+_FROM_SELF = "SELECT d.issue_id, d.est, d.spent, d.rem, d.open_cnt FROM d"
+
+_ISSUE_DELTAS = f"""
+        SELECT * FROM (
+            SELECT n.id AS issue_id,
+                   coalesce(n.estimate_hours, 0) - coalesce(o.estimate_hours, 0) AS est,
+                   coalesce(n.spent_hours, 0) - coalesce(o.spent_hours, 0) AS spent,
+                   {REMAINING_SQL.format(t="n")} - {REMAINING_SQL.format(t="o")} AS rem,
+                   (NOT n.is_closed)::int - (NOT o.is_closed)::int AS open_cnt
+            FROM new_rows n JOIN old_rows o ON o.id = n.id AND o.project_id = n.project_id
+        ) c
+        WHERE est <> 0 OR spent <> 0 OR rem <> 0 OR open_cnt <> 0"""
+
+_LINK_DELTAS = """
+        SELECT l.parent_id AS issue_id,
+               {sign} * sum(r.self_estimate + r.desc_estimate) AS est,
+               {sign} * sum(r.self_spent + r.desc_spent) AS spent,
+               {sign} * sum(r.self_remaining + r.desc_remaining) AS rem,
+               {sign} * sum(r.self_open + r.open_descendants) AS open_cnt
+        FROM ({links}) l JOIN issue_rollups r ON r.issue_id = l.child_id
+        GROUP BY l.parent_id"""
+
+ISSUE_ROLLUPS_DDL = [
+    f"""
+CREATE OR REPLACE FUNCTION issue_rollups_issue_update() RETURNS trigger AS $$
+BEGIN
+    WITH d AS ({_ISSUE_DELTAS})
+    UPDATE issue_rollups r
+    SET self_estimate = r.self_estimate + d.est,
+        self_spent = r.self_spent + d.spent,
+        self_remaining = r.self_remaining + d.rem,
+        self_open = r.self_open + d.open_cnt
+    FROM d WHERE r.issue_id = d.issue_id;
+    {_PROPAGATE.format(edges=HIERARCHY_EDGES_SQL, deltas=_ISSUE_DELTAS, anchor=_FROM_PARENTS)}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    """
+CREATE OR REPLACE FUNCTION issue_rollups_issue_delete() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM issue_rollups r USING old_rows o WHERE r.issue_id = o.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    f"""
+CREATE OR REPLACE FUNCTION issue_rollups_link_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO issue_rollups (issue_id, project_id, self_estimate, self_spent, self_remaining, self_open,
+                               desc_estimate, desc_spent, desc_remaining, open_descendants)
+    SELECT i.id, i.project_id, coalesce(i.estimate_hours, 0), coalesce(i.spent_hours, 0),
+           {REMAINING_SQL.format(t="i")}, (NOT i.is_closed)::int, 0, 0, 0, 0
+    FROM issues i
+    JOIN (
+        SELECT parent_id AS id, parent_project AS project_id FROM ({_NEW_HIERARCHY_LINKS.format(table="new_rows")}) a
+        UNION
+        SELECT child_id, child_project FROM ({_NEW_HIERARCHY_LINKS.format(table="new_rows")}) b
+    ) x ON i.id = x.id AND i.project_id = x.project_id
+    ORDER BY i.id
+    ON CONFLICT (issue_id) DO NOTHING;
+    {_PROPAGATE.format(
+        edges=HIERARCHY_EDGES_SQL,
+        deltas=_LINK_DELTAS.format(sign=1, links=_NEW_HIERARCHY_LINKS.format(table="new_rows")),
+        anchor=_FROM_SELF,
+    )}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    f"""
+CREATE OR REPLACE FUNCTION issue_rollups_link_delete() RETURNS trigger AS $$
+BEGIN
+    {_PROPAGATE.format(
+        edges=HIERARCHY_EDGES_SQL,
+        deltas=_LINK_DELTAS.format(sign=-1, links=_NEW_HIERARCHY_LINKS.format(table="old_rows")),
+        anchor=_FROM_SELF,
+    )}
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    "CREATE TRIGGER trg_issue_rollups_issue_update AFTER UPDATE ON issues "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION issue_rollups_issue_update();",
+    "CREATE TRIGGER trg_issue_rollups_issue_delete AFTER DELETE ON issues "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION issue_rollups_issue_delete();",
+    "CREATE TRIGGER trg_issue_rollups_link_insert AFTER INSERT ON issue_links "
+    "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION issue_rollups_link_insert();",
+    "CREATE TRIGGER trg_issue_rollups_link_delete AFTER DELETE ON issue_links "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION issue_rollups_link_delete();",
+]
+
+register_ddl(ISSUE_ROLLUPS_DDL)
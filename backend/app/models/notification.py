@@ -1,10 +1,10 @@
 # backend/app/models/notification.py
-from sqlalchemy import Column, String, ForeignKey, Enum, DateTime
+from sqlalchemy import Column, String, Text, Boolean, Integer, ForeignKey, ForeignKeyConstraint, Enum, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import enum
 
-from app.core.database import Base, generate_uuid
+from app.core.database import Base, generate_uuid, register_ddl, transition_triggers
 
 class NotificationType(str, enum.Enum):
     ISSUE_ASSIGNED = "issue_assigned"
@@ -27,7 +27,7 @@ class Notification(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     type = Column(Enum(NotificationType), nullable=False)
     status = Column(Enum(NotificationStatus), default=NotificationStatus.UNREAD)
-    issue_id = Column(UUID(as_uuid=True), ForeignKey("issues.id", ondelete="CASCADE"))
+    issue_id = Column(UUID(as_uuid=True))
     comment_id = Column(UUID(as_uuid=True), ForeignKey("comments.id", ondelete="CASCADE"))
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"))
     title = Column(String(255), nullable=False)
@@ -38,13 +38,14 @@ class Notification(Base):
     read_at = Column(DateTime(timezone=True))
     
     # Relationships
-    user = relationship("User", back_populates="notifications")
-    issue = relationship("Issue")
+    user = relationship("User", back_populates="notifications", foreign_keys=[user_id])
+    issue = relationship("Issue", overlaps="project")
     comment = relationship("Comment")
     project = relationship("Project")
     sender = relationship("User", foreign_keys=[sender_id])
     
     __table_args__ = (
+        ForeignKeyConstraint([issue_id, project_id], ["issues.id", "issues.project_id"], ondelete="CASCADE"),
         Index('idx_notifications_user_status', user_id, status, created_at.desc()),
         Index('idx_notifications_type', type),
     )
@@ -80,4 +81,38 @@ class NotificationSetting(Base):
     )
     
     def __repr__(self):
-        return f"<NotificationSetting(user_id={self.user_id}, project_id={self.project_id})>"
\ No newline at end of file
+        return f"<NotificationSetting(user_id={self.user_id}, project_id={self.project_id})>"
+
+
+class NotificationCounter(Base):
+    """Число непрочитанных уведомлений пользователя; поддерживается триггерами на notifications"""
+    __tablename__ = "notification_counters"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<NotificationCounter(user_id={self.user_id}, unread={self.unread})>"
+
+
+# Триггеры уровня оператора: "прочитать все" на 10k строк дает одно обновление счетчика
+_UNREAD_DELTAS = "SELECT r.user_id, {sign} AS delta FROM {table} r WHERE r.status = 'UNREAD'"
+
+_APPLY_UNREAD_DELTAS = """
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO notification_counters (user_id, unread)
+    SELECT user_id, sum(delta)
+    FROM ({deltas}) d
+    GROUP BY user_id
+    HAVING sum(delta) <> 0
+    ORDER BY user_id
+    ON CONFLICT (user_id)
+    DO UPDATE SET unread = notification_counters.unread + EXCLUDED.unread;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+NOTIFICATION_COUNTERS_DDL = transition_triggers("notifications", "notification_counters", _APPLY_UNREAD_DELTAS, _UNREAD_DELTAS)
+register_ddl(NOTIFICATION_COUNTERS_DDL)
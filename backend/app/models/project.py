@@ -1,11 +1,16 @@
 # backend/app/models/project.py
-from sqlalchemy import Column, String, Boolean, Text, ForeignKey, JSON, CheckConstraint
+from sqlalchemy import Column, String, Boolean, Text, ForeignKey, JSON, CheckConstraint, Enum, DateTime, Integer, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, validates
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy import event
 import json
+import uuid
 
-from app.core.database import Base, TimestampMixin, generate_uuid
+from app.core.database import Base, TimestampMixin, generate_uuid, register_ddl, transition_triggers
+from app.core.partitioning import create_project_partition, drop_project_partition, uses_project_partitions
+from app.core.permissions import mark_changed
+from app.core.workflow import workflow_cache
 from app.models.user import UserRole
 
 class Project(Base, TimestampMixin):
@@ -68,6 +73,79 @@ class Project(Base, TimestampMixin):
         return f"<Project(id={self.id}, key='{self.key}', name='{self.name}')>"
 
 
+def issue_key_sequence_name(project_id) -> str:
+    """Последовательность номеров задач проекта (BF-1, BF-2, ...)"""
+    return f"issue_key_seq_{uuid.UUID(str(project_id)).hex}"
+
+
+@event.listens_for(Project, "before_insert")
+def _create_project_partition(mapper, connection, target):
+    # Партиция подключается отдельной короткой транзакцией до INSERT проекта:
+    # в транзакции создания проекта блокировки ATTACH (issues_default, projects)
+    # держались бы до ее commit и выстраивали в очередь создание других проектов
+    # и запись в партицию по умолчанию. При откате остается пустая партиция
+    # с неиспользуемым id - она ничему не мешает.
+    if not uses_project_partitions():
+        return
+    if target.id is None:
+        target.id = generate_uuid()
+    with connection.engine.begin() as partition_connection:
+        partition_connection.execute(text("SET LOCAL lock_timeout = '5s'"))
+        create_project_partition(partition_connection, target.id)
+
+
+@event.listens_for(Project, "after_insert")
+def _create_project_storage(mapper, connection, target):
+    connection.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {issue_key_sequence_name(target.id)}"))
+
+
+@event.listens_for(Project, "after_delete")
+def _drop_project_storage(mapper, connection, target):
+    connection.execute(text(f"DROP SEQUENCE IF EXISTS {issue_key_sequence_name(target.id)}"))
+    drop_project_partition(connection, target.id)
+
+
+@event.listens_for(Project, "after_update")
+def _invalidate_workflow(mapper, connection, target):
+    # Скомпилированный workflow сбрасывается при изменении настроек проекта
+    if sa_inspect(target).attrs.settings.history.has_changes():
+        workflow_cache.invalidate(target.id)
+
+
+def _mark_key_changed(target, keys) -> None:
+    # Ключ проекта освободился - после commit он сбрасывается из кэша
+    # ключ -> id (app/services/issue_keys.py)
+    session = sa_inspect(target).session
+    if session is not None:
+        session.info.setdefault("project_key_changes", set()).update(keys)
+
+
+@event.listens_for(Project, "after_update")
+def _project_key_renamed(mapper, connection, target):
+    history = sa_inspect(target).attrs.key.history
+    if history.has_changes():
+        _mark_key_changed(target, [*history.deleted, *history.added])
+
+
+@event.listens_for(Project, "after_delete")
+def _project_key_released(mapper, connection, target):
+    _mark_key_changed(target, [target.key])
+
+
+@event.listens_for(Project, "after_update")
+def _invalidate_project_permissions(mapper, connection, target):
+    # Владелец и публичность входят в скомпилированные права всех пользователей проекта
+    state = sa_inspect(target)
+    if state.attrs.owner_id.history.has_changes() or state.attrs.is_public.history.has_changes():
+        mark_changed(state.session, project_ids=[target.id])
+
+
+@event.listens_for(Project, "after_delete")
+def _drop_project_permissions(mapper, connection, target):
+    # state.deleted в after_delete еще False - удаление обрабатывается отдельно
+    mark_changed(sa_inspect(target).session, project_ids=[target.id])
+
+
 class ProjectMember(Base):
     __tablename__ = "project_members"
     
@@ -86,7 +164,7 @@ class ProjectMember(Base):
     
     # Relationships
     project = relationship("Project", back_populates="members")
-    user = relationship("User", back_populates="project_memberships")
+    user = relationship("User", back_populates="project_memberships", foreign_keys=[user_id])
     inviter = relationship("User", foreign_keys=[invited_by])
     
     __table_args__ = (
@@ -101,6 +179,37 @@ class ProjectMember(Base):
         return f"<ProjectMember(project_id={self.project_id}, user_id={self.user_id}, role={self.role})>"
 
 
+@event.listens_for(ProjectMember, "after_insert")
+@event.listens_for(ProjectMember, "after_update")
+@event.listens_for(ProjectMember, "after_delete")
+def _invalidate_member_permissions(mapper, connection, target):
+    # Права участника перекомпилируются после commit (роль, permissions, состав)
+    state = sa_inspect(target)
+    user_ids = {target.user_id, *state.attrs.user_id.history.deleted}
+    mark_changed(state.session, user_ids=user_ids)
+
+
+def _mark_membership_changed(target, user_ids) -> None:
+    # Состав проектов пользователя изменился - после commit его realtime-соединения
+    # переподписываются (публикация - app/services/realtime.py)
+    session = sa_inspect(target).session
+    if session is not None:
+        session.info.setdefault("membership_changes", set()).update(user_ids)
+
+
+@event.listens_for(ProjectMember, "after_insert")
+@event.listens_for(ProjectMember, "after_delete")
+def _member_added_or_removed(mapper, connection, target):
+    _mark_membership_changed(target, [target.user_id])
+
+
+@event.listens_for(ProjectMember, "after_update")
+def _member_moved(mapper, connection, target):
+    state = sa_inspect(target)
+    if state.attrs.user_id.history.has_changes() or state.attrs.project_id.history.has_changes():
+        _mark_membership_changed(target, [target.user_id, *state.attrs.user_id.history.deleted])
+
+
 class ProjectInvitation(Base):
     __tablename__ = "project_invitations"
     
@@ -119,4 +228,65 @@ class ProjectInvitation(Base):
     inviter = relationship("User", foreign_keys=[invited_by])
     
     def __repr__(self):
-        return f"<ProjectInvitation(project_id={self.project_id}, email='{self.email}')>"
\ No newline at end of file
+        return f"<ProjectInvitation(project_id={self.project_id}, email='{self.email}')>"
+
+
+class ProjectCounter(Base):
+    """
+    Счетчики проекта: (dimension, bucket) -> value.
+
+    dimension: total, open, members (bucket = ''), status, type, priority.
+    Поддерживаются триггерами на issues/project_members, см. PROJECT_COUNTERS_DDL.
+    """
+    __tablename__ = "project_counters"
+    
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    bucket = Column(String(50), primary_key=True, default="")
+    value = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ProjectCounter(project_id={self.project_id}, {self.dimension}:{self.bucket}={self.value})>"
+
+
+# Триггеры уровня оператора с transition tables: один INSERT ... ON CONFLICT
+# на весь оператор (в том числе COPY и массовые UPDATE), а не на каждую строку.
+_ISSUE_DELTAS = """
+    SELECT r.project_id, v.dimension, v.bucket, {sign} * v.delta AS delta
+    FROM {table} r
+    CROSS JOIN LATERAL (VALUES
+        ('total', '', 1),
+        ('open', '', CASE WHEN r.is_closed THEN 0 ELSE 1 END),
+        ('status', r.status::text, 1),
+        ('type', coalesce(r.type::text, ''), 1),
+        ('priority', coalesce(r.priority::text, ''), 1)
+    ) AS v(dimension, bucket, delta)
+"""
+
+_MEMBER_DELTAS = """
+    SELECT r.project_id, 'members' AS dimension, '' AS bucket, {sign} AS delta
+    FROM {table} r
+"""
+
+_APPLY_DELTAS = """
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO project_counters (project_id, dimension, bucket, value)
+    SELECT project_id, dimension, bucket, sum(delta)
+    FROM ({deltas}) d
+    GROUP BY project_id, dimension, bucket
+    HAVING sum(delta) <> 0
+    ORDER BY project_id, dimension, bucket
+    ON CONFLICT (project_id, dimension, bucket)
+    DO UPDATE SET value = project_counters.value + EXCLUDED.value;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+ISSUE_COUNTERS_DDL = transition_triggers("issues", "project_counters_issues", _APPLY_DELTAS, _ISSUE_DELTAS)
+MEMBER_COUNTERS_DDL = transition_triggers("project_members", "project_counters_members", _APPLY_DELTAS, _MEMBER_DELTAS)
+PROJECT_COUNTERS_DDL = ISSUE_COUNTERS_DDL + MEMBER_COUNTERS_DDL
+
+register_ddl(PROJECT_COUNTERS_DDL)
@@ -0,0 +1,115 @@
+# backend/app/models/report.py
+from sqlalchemy import Column, String, Integer, Date, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.config import settings
+from app.core.database import Base, register_ddl
+
+class IssueDailyStat(Base):
+    """
+    Дневные агрегаты отчетов: (project_id, day, dimension, bucket).
+
+    dimension total (bucket = ''), type, priority, assignee - created/closed за день;
+    dimension status - net: сколько задач вошло в статус за день минус вышедших,
+    число задач в статусе на дату - сумма net по всем дням до нее.
+    Дни до отметки stats_watermarks 'issue_daily_stats' строит периодическая задача
+    (app/services/reports.py), после нее в таблице только поправки на удаление задач
+    (см. ISSUE_DAILY_STATS_DDL).
+    """
+    __tablename__ = "issue_daily_stats"
+    
+    project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    bucket = Column(String(50), primary_key=True, default="")
+    created = Column(Integer, nullable=False, default=0)
+    closed = Column(Integer, nullable=False, default=0)
+    net = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<IssueDailyStat(project_id={self.project_id}, day={self.day}, {self.dimension}:{self.bucket})>"
+
+
+class StatsWatermark(Base):
+    """Последний полностью агрегированный день для каждой периодической агрегации"""
+    __tablename__ = "stats_watermarks"
+    
+    name = Column(String(50), primary_key=True)
+    day = Column(Date)  # NULL - агрегация еще не запускалась
+    
+    def __repr__(self):
+        return f"<StatsWatermark(name='{self.name}', day={self.day})>"
+
+
+# Удаление задачи не оставляет следа в issue_history, поэтому выход из статуса
+# записывается триггерами в текущий день - только для задач, созданных не позже
+# отметки агрегации: более поздние есть лишь в сырых данных и исчезают вместе
+# с задачей. Поправка снимается со статуса на день отметки (его хранят агрегаты),
+# а смены статуса после отметки удаляются вместе с задачей:
+# - каскад в БД удаляет историю после задачи, поэтому триггер на issues строковый
+#   BEFORE DELETE и сам находит статус на день отметки по истории;
+# - ORM удаляет историю до задачи - триггер на issue_history переносит поправку
+#   с текущего статуса на статус на день отметки (+new_value -old_value каждой смены).
+# При каскадном удалении проекта строки не пишутся: его агрегаты удаляются каскадом.
+_TODAY = f"(now() AT TIME ZONE '{settings.REPORTS_TIMEZONE}')::date"
+_AFTER_WATERMARK = f"((watermark + 1)::timestamp AT TIME ZONE '{settings.REPORTS_TIMEZONE}')"
+
+ISSUE_DAILY_STATS_DDL = [
+    f"""
+CREATE OR REPLACE FUNCTION issue_daily_stats_issue_delete() RETURNS trigger AS $$
+DECLARE
+    watermark date;
+    watermark_status text;
+BEGIN
+    SELECT w.day INTO watermark FROM stats_watermarks w WHERE w.name = 'issue_daily_stats';
+    IF watermark IS NULL
+       OR (OLD.created_at AT TIME ZONE '{settings.REPORTS_TIMEZONE}')::date > watermark
+       OR NOT EXISTS (SELECT 1 FROM projects p WHERE p.id = OLD.project_id) THEN
+        RETURN OLD;
+    END IF;
+    SELECT h.old_value INTO watermark_status
+    FROM issue_history h
+    WHERE h.issue_id = OLD.id AND h.changed_field = 'status' AND h.created_at >= {_AFTER_WATERMARK}
+    ORDER BY h.created_at
+    LIMIT 1;
+    INSERT INTO issue_daily_stats (project_id, day, dimension, bucket, created, closed, net)
+    VALUES (OLD.project_id, {_TODAY}, 'status', coalesce(watermark_status, OLD.status), 0, 0, -1)
+    ON CONFLICT (project_id, day, dimension, bucket)
+    DO UPDATE SET net = issue_daily_stats.net + EXCLUDED.net;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    f"""
+CREATE OR REPLACE FUNCTION issue_daily_stats_history_delete() RETURNS trigger AS $$
+DECLARE
+    watermark date;
+BEGIN
+    SELECT w.day INTO watermark FROM stats_watermarks w WHERE w.name = 'issue_daily_stats';
+    IF watermark IS NULL THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO issue_daily_stats (project_id, day, dimension, bucket, created, closed, net)
+    SELECT o.project_id, {_TODAY}, 'status', s.bucket, 0, 0, sum(s.net)
+    FROM old_rows o
+    JOIN issues i ON i.id = o.issue_id AND i.project_id = o.project_id
+    CROSS JOIN LATERAL (VALUES (o.old_value, -1), (o.new_value, 1)) AS s(bucket, net)
+    WHERE o.changed_field = 'status' AND s.bucket IS NOT NULL
+      AND o.created_at >= {_AFTER_WATERMARK}
+      AND (i.created_at AT TIME ZONE '{settings.REPORTS_TIMEZONE}')::date <= watermark
+    GROUP BY o.project_id, s.bucket
+    HAVING sum(s.net) <> 0
+    ORDER BY o.project_id, s.bucket
+    ON CONFLICT (project_id, day, dimension, bucket)
+    DO UPDATE SET net = issue_daily_stats.net + EXCLUDED.net;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+""",
+    "CREATE TRIGGER trg_issue_daily_stats_issue_delete BEFORE DELETE ON issues "
+    "FOR EACH ROW EXECUTE FUNCTION issue_daily_stats_issue_delete();",
+    "CREATE TRIGGER trg_issue_daily_stats_history_delete AFTER DELETE ON issue_history "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION issue_daily_stats_history_delete();",
+]
+
+register_ddl(ISSUE_DAILY_STATS_DDL)
@@ -1,11 +1,14 @@
 # backend/app/models/user.py
-from sqlalchemy import Column, String, Boolean, Enum, Text, ForeignKey, Integer, JSON
+from sqlalchemy import Column, String, Boolean, Enum, Text, ForeignKey, Integer, JSON, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, validates
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy import event
 import enum
 import re
 
 from app.core.database import Base, TimestampMixin, generate_uuid
+from app.core.permissions import mark_changed
 
 class UserRole(str, enum.Enum):
     SUPER_ADMIN = "super_admin"
@@ -34,8 +37,8 @@ class User(Base, TimestampMixin):
     assigned_issues = relationship("Issue", back_populates="assignee", foreign_keys="Issue.assignee_id")
     reported_issues = relationship("Issue", back_populates="reporter", foreign_keys="Issue.reporter_id")
     comments = relationship("Comment", back_populates="author")
-    project_memberships = relationship("ProjectMember", back_populates="user", cascade="all, delete-orphan")
-    notifications = relationship("Notification", back_populates="user", cascade="all, delete-orphan")
+    project_memberships = relationship("ProjectMember", back_populates="user", foreign_keys="ProjectMember.user_id", cascade="all, delete-orphan")
+    notifications = relationship("Notification", back_populates="user", foreign_keys="Notification.user_id", cascade="all, delete-orphan")
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
     
     @validates('email')
@@ -48,6 +51,36 @@ class User(Base, TimestampMixin):
         return f"<User(id={self.id}, username='{self.username}', email='{self.email}')>"
 
 
+@event.listens_for(User, "after_update")
+def _invalidate_user_permissions(mapper, connection, target):
+    # Глобальная роль (ADMIN, SUPER_ADMIN) входит в права во всех проектах
+    state = sa_inspect(target)
+    if state.attrs.role.history.has_changes():
+        mark_changed(state.session, user_ids=[target.id])
+
+
+def _mark_username_changed(target, usernames) -> None:
+    # Освободившееся имя сбрасывается после commit из кэша упоминаний (app/services/mentions.py)
+    session = sa_inspect(target).session
+    if session is not None:
+        session.info.setdefault("username_changes", set()).update(usernames)
+
+
+@event.listens_for(User, "after_update")
+def _username_changed(mapper, connection, target):
+    state = sa_inspect(target)
+    history = state.attrs.username.history
+    if history.has_changes():
+        _mark_username_changed(target, [*history.deleted, *history.added])
+    elif state.attrs.is_active.history.has_changes():
+        _mark_username_changed(target, [target.username])
+
+
+@event.listens_for(User, "after_delete")
+def _username_released(mapper, connection, target):
+    _mark_username_changed(target, [target.username])
+
+
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
     
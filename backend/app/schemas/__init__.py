@@ -11,6 +11,7 @@ from app.schemas.search import *
 __all__ = [
     # Base
     "BaseSchema", "IDSchema", "TimestampSchema", "PaginationParams", "PaginatedResponse",
+    "CursorParams", "CursorPage",
     
     # User
     "UserRole", "UserCreate", "UserUpdate", "UserLogin", "UserChangePassword",
@@ -24,6 +25,7 @@ __all__ = [
     # Issue
     "IssueType", "IssuePriority", "IssueLinkType",
     "IssueCreate", "IssueUpdate", "IssueFilter", "IssueLinkCreate",
+    "IssueImportRecord", "IssueImportComment", "IssueImportHistory",
     "IssueBase", "Issue", "IssueWithStats", "IssueHistory", "IssueSearchResult",
     "TagBase",
     
@@ -32,12 +34,13 @@ __all__ = [
     "Activity",
     
     # Attachment
-    "FileType", "AttachmentCreate", "AttachmentBase", "Attachment", "ImagePreview",
+    "FileType", "AttachmentCreate", "UploadSessionCreate", "AttachmentBase", "Attachment",
+    "UploadSession", "ImagePreview",
     
     # Notification
     "NotificationType", "NotificationStatus", "Notification", "NotificationSettings", 
-    "NotificationUpdate",
+    "NotificationUpdate", "NotificationBulkUpdate", "UnreadCount", "IssueEvent",
     
     # Search
-    "SearchQuery", "SearchResponse", "ReportQuery", "ReportResponse",
+    "SearchQuery", "SearchResponse", "ReportQuery", "ReportResponse", "FlowSummary", "CumulativeFlow",
 ]
\ No newline at end of file
@@ -1,14 +1,15 @@
 # backend/app/schemas/attachment.py
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional
 from datetime import datetime
 import uuid
 from enum import StrEnum
 
+from app.core.config import settings
 from app.schemas.base import BaseSchema
 from app.schemas.user import UserBase
 
-class FileType(str, StrEnum):
+class FileType(StrEnum):
     IMAGE = "image"
     DOCUMENT = "document"
     ARCHIVE = "archive"
@@ -25,11 +26,25 @@ class AttachmentCreate(BaseSchema):
     
     @field_validator('size_bytes')
     def validate_size(cls, v):
-        max_size = 50 * 1024 * 1024  # 50MB
+        max_size = settings.MAX_FILE_SIZE_MB * 1024 * 1024
         if v > max_size:
             raise ValueError(f'File size exceeds maximum of {max_size} bytes')
         return v
 
+class UploadSessionCreate(BaseSchema):
+    original_name: str
+    issue_id: Optional[uuid.UUID] = None
+    comment_id: Optional[uuid.UUID] = None
+    size_bytes: Optional[int] = None  # если известен заранее - проверяется до начала загрузки
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-f]{64}$")  # если blob уже есть - вложение создается без загрузки
+    description: Optional[str] = None
+    
+    @field_validator('size_bytes')
+    def validate_size(cls, v):
+        if v is not None and v > settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise ValueError(f'File size exceeds maximum of {settings.MAX_FILE_SIZE_MB} MB')
+        return v
+
 # Output schemas
 class AttachmentBase(BaseSchema):
     id: uuid.UUID
@@ -38,6 +53,7 @@ class AttachmentBase(BaseSchema):
     mime_type: str
     file_type: FileType
     size_bytes: int
+    sha256: Optional[str] = None
     description: Optional[str] = None
 
 class Attachment(AttachmentBase):
@@ -56,6 +72,16 @@ class Attachment(AttachmentBase):
     comment_id: Optional[uuid.UUID] = None
     project_id: uuid.UUID
 
+class UploadSession(BaseSchema):
+    """Состояние загрузки: клиент продолжает отправку с offset = bytes_received"""
+    id: uuid.UUID
+    status: str
+    original_name: str
+    bytes_received: int
+    part_size: int
+    mime_type: Optional[str] = None
+    attachment_id: Optional[uuid.UUID] = None
+
 class ImagePreview(BaseSchema):
     id: uuid.UUID
     width: int
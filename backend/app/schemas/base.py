@@ -31,4 +31,29 @@ class PaginatedResponse(BaseSchema):
     total: int
     page: int
     per_page: int
-    total_pages: int
\ No newline at end of file
+    total_pages: int
+
+class CursorParams(BaseSchema):
+    """Параметры keyset-пагинации (курсор непрозрачен для клиента)"""
+    cursor: Optional[str] = None
+    limit: int = 50
+    total: str = "none"  # none, estimate, exact
+    
+    @field_validator('limit')
+    def validate_limit(cls, v):
+        if v < 1 or v > 100:
+            raise ValueError('limit must be between 1 and 100')
+        return v
+    
+    @field_validator('total')
+    def validate_total(cls, v):
+        if v not in ("none", "estimate", "exact"):
+            raise ValueError('total must be one of: none, estimate, exact')
+        return v
+
+class CursorPage(BaseSchema):
+    items: list[Any]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total: Optional[int] = None
+    total_is_estimate: bool = False
\ No newline at end of file
@@ -1,6 +1,6 @@
 # backend/app/schemas/comment.py
-from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 import uuid
 
@@ -9,19 +9,19 @@ from app.schemas.base import BaseSchema, TimestampSchema
 from app.schemas.user import UserBase
 from app.schemas.project import ProjectBase
 
-class IssueType(str, StrEnum):
+class IssueType(StrEnum):
     BUG = "bug"
     FEATURE = "feature"
     TASK = "task"
     IMPROVEMENT = "improvement"
 
-class IssuePriority(str, StrEnum):
+class IssuePriority(StrEnum):
     CRITICAL = "critical"
     HIGH = "high"
     MEDIUM = "medium"
     LOW = "low"
 
-class IssueLinkType(str, StrEnum):
+class IssueLinkType(StrEnum):
     BLOCKS = "blocks"
     IS_BLOCKED_BY = "is_blocked_by"
     DUPLICATES = "duplicates"
@@ -56,6 +56,36 @@ class IssueCreate(BaseSchema):
             raise ValueError('Estimate hours cannot be negative')
         return v
 
+class IssueImportComment(BaseSchema):
+    author_id: uuid.UUID
+    content: str
+    is_internal: bool = False
+    created_at: Optional[datetime] = None
+
+class IssueImportHistory(BaseSchema):
+    changed_by: uuid.UUID
+    changed_field: str
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+class IssueImportRecord(IssueCreate):
+    """Запись массового импорта: IssueCreate + поля, переносимые из старого трекера"""
+    status: Optional[str] = None
+    reporter_id: Optional[uuid.UUID] = None
+    spent_hours: int = 0
+    created_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+    comments: List[IssueImportComment] = []
+    history: List[IssueImportHistory] = []
+    
+    @field_validator('tags', mode='before')
+    def split_tags(cls, v):
+        # В CSV теги приходят строкой через запятую
+        if isinstance(v, str):
+            return [t.strip() for t in v.split(',') if t.strip()]
+        return v
+
 class IssueUpdate(BaseSchema):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -148,6 +178,7 @@ class IssueWithStats(Issue):
     time_estimate: Optional[int] = None  # в часах
     time_spent: int = 0
     time_remaining: Optional[int] = None
+    open_children: int = 0  # незакрытые задачи в поддереве (для эпиков)
     overdue: bool = False
     days_open: Optional[int] = None
 
@@ -1,6 +1,6 @@
 # backend/app/schemas/notification.py
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 import uuid
 from enum import StrEnum
@@ -10,7 +10,7 @@ from app.schemas.user import UserBase
 from app.schemas.issue import IssueBase
 from app.schemas.project import ProjectBase
 
-class NotificationType(str, StrEnum):
+class NotificationType(StrEnum):
     ISSUE_ASSIGNED = "issue_assigned"
     ISSUE_MENTIONED = "issue_mentioned"
     COMMENT_ADDED = "comment_added"
@@ -19,7 +19,7 @@ class NotificationType(str, StrEnum):
     PROJECT_INVITATION = "project_invitation"
     ISSUE_CREATED = "issue_created"
 
-class NotificationStatus(str, StrEnum):
+class NotificationStatus(StrEnum):
     UNREAD = "unread"
     READ = "read"
     ARCHIVED = "archived"
@@ -45,4 +45,25 @@ class NotificationSettings(BaseSchema):
     settings: Dict[str, Dict[str, bool]]
 
 class NotificationUpdate(BaseSchema):
-    status: Optional[NotificationStatus] = None
\ No newline at end of file
+    status: Optional[NotificationStatus] = None
+
+class NotificationBulkUpdate(BaseSchema):
+    """Массовое изменение статуса: по списку id или всех уведомлений старше before"""
+    status: NotificationStatus
+    ids: Optional[List[uuid.UUID]] = None
+    before: Optional[datetime] = None
+
+class UnreadCount(BaseSchema):
+    unread: int
+
+# Events
+class IssueEvent(BaseSchema):
+    """Событие задачи в очереди уведомлений"""
+    type: NotificationType
+    issue_id: uuid.UUID
+    project_id: uuid.UUID
+    actor_id: uuid.UUID
+    comment_id: Optional[uuid.UUID] = None
+    recipients: List[uuid.UUID] = []  # явные адресаты (например, упомянутые), кроме автора/исполнителя
+    data: Dict[str, Any] = {}
+    occurred_at: datetime
\ No newline at end of file
@@ -31,6 +31,7 @@ class ReportQuery(BaseSchema):
     end_date: Optional[datetime] = None
     project_id: Optional[str] = None
     group_by: str = "day"  # day, week, month, status, type, priority, assignee
+    metric: str = "created"  # created, closed, open; для status - число задач в статусе на end_date
 
 class ReportDataPoint(BaseSchema):
     label: str
@@ -41,4 +42,22 @@ class ReportResponse(BaseSchema):
     type: str
     title: str
     data: List[ReportDataPoint]
-    total: int
\ No newline at end of file
+    total: int
+
+class FlowSummary(BaseSchema):
+    dimension: str  # all, type, priority
+    bucket: str
+    issues: int
+    closed: int
+    percentiles: List[int]  # уровни для lead_time/cycle_time
+    lead_time: List[Optional[float]]  # часы
+    cycle_time: List[Optional[float]]
+    histogram_hours: List[int]  # нижние границы корзин, последняя открыта
+    lead_histogram: List[int]
+    cycle_histogram: List[int]
+    status_median_hours: Dict[str, float] = {}
+    funnel: Dict[str, int] = {}
+
+class CumulativeFlow(BaseSchema):
+    days: List[str]
+    series: Dict[str, List[int]]  # статус -> число задач на конец каждого дня
@@ -7,7 +7,7 @@ from enum import StrEnum
 
 from app.schemas.base import BaseSchema, TimestampSchema
 
-class UserRole(str, StrEnum):
+class UserRole(StrEnum):
     SUPER_ADMIN = "super_admin"
     ADMIN = "admin"
     PROJECT_ADMIN = "project_admin"
@@ -0,0 +1,325 @@
+# backend/app/services/analytics.py
+"""
+Аналитика потока задач: time-in-status, lead time, cycle time, воронка багов.
+
+Интервалы статусов восстанавливаются из issue_history одним запросом
+(lead() по истории задачи) и сохраняются по задаче в issue_cycle_stats.
+Перцентили, гистограммы и воронка считаются векторно (NumPy) сразу для
+всех групп проекта и сохраняются в issue_flow_summaries - графики читают
+готовые массивы.
+"""
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.analytics import IssueCycleStat, IssueFlowSummary
+from app.models.issue import Issue
+from app.models.report import StatsWatermark
+from app.schemas.search import CumulativeFlow, FlowSummary
+from app.services.reports import load_daily_stats
+
+WATERMARK = "issue_cycle_stats"
+PERCENTILES = (50, 75, 85, 95)
+HISTOGRAM_HOURS = (0, 1, 4, 8, 24, 48, 72, 168, 336, 720, 2160)  # последняя корзина открыта справа
+DIMENSIONS = ("all", "type", "priority")
+
+# Вход в статус: начальный при создании (old_value первой смены или текущий статус)
+# и new_value каждой смены; выход - вход в следующий статус, для текущего - now()
+_REFRESH = """
+WITH touched AS (
+    SELECT DISTINCT issue_id AS id, project_id FROM issue_history
+    WHERE changed_field = 'status' {since_h} {scope_h}
+    UNION
+    SELECT id, project_id FROM issues WHERE true {since_i} {scope_i}
+),
+entries AS (
+    SELECT i.id AS issue_id, i.project_id, i.created_at, i.closed_at AS issue_closed_at, i.is_closed,
+           e.status, e.entered_at
+    FROM touched t
+    JOIN issues i ON i.id = t.id AND i.project_id = t.project_id
+    CROSS JOIN LATERAL (
+        SELECT coalesce((
+            SELECT h.old_value FROM issue_history h
+            WHERE h.issue_id = i.id AND h.changed_field = 'status'
+            ORDER BY h.created_at LIMIT 1
+        ), i.status) AS status, i.created_at AS entered_at
+        UNION ALL
+        SELECT h.new_value, h.created_at FROM issue_history h
+        WHERE h.issue_id = i.id AND h.changed_field = 'status' AND h.new_value IS NOT NULL
+    ) e
+),
+intervals AS (
+    SELECT issue_id, project_id, created_at, issue_closed_at, is_closed, status, entered_at,
+           row_number() OVER w AS n,
+           lead(entered_at) OVER w AS left_at
+    FROM entries
+    WINDOW w AS (PARTITION BY issue_id ORDER BY entered_at)
+),
+per_status AS (
+    SELECT issue_id, jsonb_object_agg(status, seconds) AS time_in_status
+    FROM (
+        SELECT issue_id, status, sum(extract(epoch FROM coalesce(left_at, now()) - entered_at))::bigint AS seconds
+        FROM intervals GROUP BY issue_id, status
+    ) s
+    GROUP BY issue_id
+),
+per_issue AS (
+    SELECT issue_id, project_id, min(created_at) AS created_at,
+           min(entered_at) FILTER (WHERE n > 1) AS started_at,
+           CASE WHEN bool_or(is_closed) THEN coalesce(
+               max(issue_closed_at), max(entered_at) FILTER (WHERE left_at IS NULL)
+           ) END AS closed_at
+    FROM intervals GROUP BY issue_id, project_id
+)
+INSERT INTO issue_cycle_stats (issue_id, project_id, started_at, closed_at, lead_seconds, cycle_seconds,
+                               time_in_status, computed_at)
+SELECT p.issue_id, p.project_id, p.started_at, p.closed_at,
+       extract(epoch FROM p.closed_at - p.created_at)::int,
+       extract(epoch FROM p.closed_at - coalesce(p.started_at, p.closed_at))::int,
+       s.time_in_status, now()
+FROM per_issue p JOIN per_status s ON s.issue_id = p.issue_id
+ORDER BY p.issue_id
+ON CONFLICT (issue_id) DO UPDATE SET
+    started_at = EXCLUDED.started_at, closed_at = EXCLUDED.closed_at,
+    lead_seconds = EXCLUDED.lead_seconds, cycle_seconds = EXCLUDED.cycle_seconds,
+    time_in_status = EXCLUDED.time_in_status, computed_at = EXCLUDED.computed_at
+RETURNING project_id
+"""
+
+
+async def refresh_cycle_stats(
+    session: AsyncSession, since: Optional[datetime] = None, project_id: Optional[uuid.UUID] = None
+) -> Set[uuid.UUID]:
+    """
+    Пересчитать длительности задач, созданных или сменивших статус после since
+    (None - всех). Возвращает затронутые проекты; commit делает вызывающий.
+    """
+    stmt = _REFRESH.format(
+        since_h="AND created_at >= :since" if since is not None else "",
+        since_i="AND created_at >= :since" if since is not None else "",
+        scope_h="AND project_id = :project_id" if project_id is not None else "",
+        scope_i="AND project_id = :project_id" if project_id is not None else "",
+    )
+    params = {}
+    if since is not None:
+        params["since"] = since
+    if project_id is not None:
+        params["project_id"] = project_id
+    return set((await session.execute(text(stmt), params)).scalars().all())
+
+
+def group_percentiles(codes: np.ndarray, values: np.ndarray, n_groups: int, q: Iterable[float]) -> np.ndarray:
+    """
+    Перцентили values по группам codes без цикла по группам: (n_groups, len(q)).
+
+    Значения сортируются один раз по (группа, значение), позиции перцентилей
+    внутри каждой группы вычисляются массивно; интерполяция линейная,
+    как у np.percentile. NaN пропускаются; у пустых групп результат NaN.
+    """
+    q = np.asarray(list(q), dtype=float) / 100.0
+    result = np.full((n_groups, q.size), np.nan)
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    if values.size == 0:
+        return result
+    ordered = values[np.lexsort((values, codes))]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    position = (counts[present, None] - 1) * q[None, :]
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    weight = position - lower
+    base = starts[present, None]
+    result[present] = ordered[base + lower] * (1 - weight) + ordered[base + upper] * weight
+    return result
+
+
+def group_histograms(codes: np.ndarray, values: np.ndarray, n_groups: int, edges: np.ndarray) -> np.ndarray:
+    """Гистограммы по группам одним bincount: (n_groups, len(edges)), последняя корзина открыта"""
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    n_bins = edges.size
+    bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, n_bins - 1)
+    return np.bincount(codes * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+
+def _hours(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+async def _load_issue_stats(session: AsyncSession, project_ids: List[uuid.UUID]):
+    rows = await session.execute(
+        select(
+            IssueCycleStat.project_id, Issue.type, Issue.priority,
+            IssueCycleStat.lead_seconds, IssueCycleStat.cycle_seconds, IssueCycleStat.time_in_status,
+        )
+        .join(Issue, (Issue.id == IssueCycleStat.issue_id) & (Issue.project_id == IssueCycleStat.project_id))
+        .where(IssueCycleStat.project_id.in_(project_ids))
+    )
+    return rows.all()
+
+
+def _summaries(rows) -> List[Dict]:
+    """Строки issue_flow_summaries для всех групп (project, dimension, bucket)"""
+    n = len(rows)
+    if not n:
+        return []
+    lead = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=float) / 3600.0
+    cycle = np.array([np.nan if r[4] is None else r[4] for r in rows], dtype=float) / 3600.0
+
+    statuses = sorted({status for r in rows for status in r[5]})
+    status_index = {status: i for i, status in enumerate(statuses)}
+    in_status = np.full((n, len(statuses)), np.nan)  # часы; NaN - в статусе не была
+    for i, r in enumerate(rows):
+        for status, seconds in r[5].items():
+            in_status[i, status_index[status]] = seconds / 3600.0
+    visited = ~np.isnan(in_status)
+    closed = ~np.isnan(lead)
+    # медиана времени в статусе - только по завершенным задачам
+    in_status_closed = np.where(closed[:, None], in_status, np.nan)
+
+    keys = []
+    for r in rows:
+        project = str(r[0])
+        keys.append((
+            (project, "all", ""),
+            (project, "type", r[1].name if r[1] is not None else ""),
+            (project, "priority", r[2].name if r[2] is not None else ""),
+        ))
+    groups = sorted({key for row_keys in keys for key in row_keys})
+    group_index = {key: i for i, key in enumerate(groups)}
+    # каждая задача входит в одну группу каждого измерения - массивы повторяются по измерениям
+    codes = np.array([group_index[k] for dim in range(len(DIMENSIONS)) for k in (row_keys[dim] for row_keys in keys)])
+    lead_all, cycle_all = np.tile(lead, len(DIMENSIONS)), np.tile(cycle, len(DIMENSIONS))
+    n_groups = len(groups)
+
+    edges = np.asarray(HISTOGRAM_HOURS, dtype=float)
+    lead_p = group_percentiles(codes, lead_all, n_groups, PERCENTILES)
+    cycle_p = group_percentiles(codes, cycle_all, n_groups, PERCENTILES)
+    lead_h = group_histograms(codes, lead_all, n_groups, edges)
+    cycle_h = group_histograms(codes, cycle_all, n_groups, edges)
+    issues = np.bincount(codes, minlength=n_groups)
+    closed_count = np.bincount(codes, weights=np.tile(closed, len(DIMENSIONS)), minlength=n_groups)
+
+    funnel = np.zeros((n_groups, len(statuses)), dtype=np.int64)
+    np.add.at(funnel, codes, np.tile(visited, (len(DIMENSIONS), 1)).astype(np.int64))
+    medians = np.full((n_groups, len(statuses)), np.nan)
+    status_rows = np.tile(in_status_closed, (len(DIMENSIONS), 1))
+    for j in range(len(statuses)):
+        medians[:, j] = group_percentiles(codes, status_rows[:, j], n_groups, (50,))[:, 0]
+
+    result = []
+    for g, (project, dimension, bucket) in enumerate(groups):
+        order = np.argsort(-funnel[g], kind="stable")
+        result.append({
+            "project_id": uuid.UUID(project),
+            "dimension": dimension,
+            "bucket": bucket,
+            "issues": int(issues[g]),
+            "closed": int(closed_count[g]),
+            "lead_percentiles": _hours(lead_p[g]),
+            "cycle_percentiles": _hours(cycle_p[g]),
+            "lead_histogram": lead_h[g].tolist(),
+            "cycle_histogram": cycle_h[g].tolist(),
+            "status_median_hours": {
+                statuses[j]: round(float(medians[g, j]), 2) for j in range(len(statuses)) if not np.isnan(medians[g, j])
+            },
+            "funnel": {statuses[j]: int(funnel[g, j]) for j in order if funnel[g, j]},
+        })
+    return result
+
+
+async def summarize_projects(session: AsyncSession, project_ids: Iterable[uuid.UUID]) -> int:
+    """Пересчитать issue_flow_summaries проектов; возвращает число строк"""
+    project_ids = list(set(project_ids))
+    if not project_ids:
+        return 0
+    summaries = _summaries(await _load_issue_stats(session, project_ids))
+    await session.execute(delete(IssueFlowSummary).where(IssueFlowSummary.project_id.in_(project_ids)))
+    if summaries:
+        await session.execute(insert(IssueFlowSummary), summaries)
+    await session.commit()
+    return len(summaries)
+
+
+async def run_flow_analytics() -> Dict[str, int]:
+    """
+    Периодическая задача: пересчитать задачи, менявшиеся с прошлого запуска,
+    и сводки их проектов.
+
+    Отметка - день начала прошлого запуска: изменения этого дня пересчитываются
+    повторно, пересчет идемпотентен. Первый запуск обрабатывает всю историю.
+    """
+    started = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(StatsWatermark).values(name=WATERMARK, day=None).on_conflict_do_nothing())
+        watermark = await session.scalar(
+            select(StatsWatermark.day).where(StatsWatermark.name == WATERMARK).with_for_update()
+        )
+        since = datetime.combine(watermark, time.min, tzinfo=timezone.utc) if watermark is not None else None
+        project_ids = await refresh_cycle_stats(session, since)
+        await session.execute(
+            update(StatsWatermark).where(StatsWatermark.name == WATERMARK).values(day=started.date())
+        )
+        await session.commit()
+        rows = await summarize_projects(session, project_ids)
+    logger.info(f"Flow analytics: {len(project_ids)} projects refreshed, {rows} summaries")
+    return {"projects": len(project_ids), "summaries": rows}
+
+
+async def get_flow_summaries(session: AsyncSession, project_id: uuid.UUID, dimension: str = "all") -> List[FlowSummary]:
+    """Готовые сводки проекта: dimension=type, bucket=BUG - воронка багов"""
+    rows = await session.execute(
+        select(IssueFlowSummary)
+        .where(IssueFlowSummary.project_id == project_id, IssueFlowSummary.dimension == dimension)
+        .order_by(IssueFlowSummary.bucket)
+    )
+    return [
+        FlowSummary(
+            dimension=row.dimension,
+            bucket=row.bucket,
+            issues=row.issues,
+            closed=row.closed,
+            percentiles=list(PERCENTILES),
+            lead_time=row.lead_percentiles,
+            cycle_time=row.cycle_percentiles,
+            histogram_hours=list(HISTOGRAM_HOURS),
+            lead_histogram=row.lead_histogram,
+            cycle_histogram=row.cycle_histogram,
+            status_median_hours=row.status_median_hours,
+            funnel=row.funnel,
+        )
+        for row in rows.scalars().all()
+    ]
+
+
+async def cumulative_flow(session: AsyncSession, project_id: uuid.UUID, start_day: date, end_day: date) -> CumulativeFlow:
+    """
+    Накопительная диаграмма потока: число задач в каждом статусе на конец дня.
+
+    Строится из дневных агрегатов отчетов (net по статусам) накопительной
+    суммой по матрице дни x статусы.
+    """
+    rows = await load_daily_stats(session, project_id, ["status"], None, end_day)
+    statuses = sorted({r[2] for r in rows})
+    n_days = (end_day - start_day).days + 1
+    days = [(start_day + timedelta(days=i)).isoformat() for i in range(n_days)]
+    if not statuses:
+        return CumulativeFlow(days=days, series={})
+    status_index = {status: i for i, status in enumerate(statuses)}
+    # строка 0 - все изменения до начала периода
+    deltas = np.zeros((n_days + 1, len(statuses)), dtype=np.int64)
+    offsets = np.array([max((r[0] - start_day).days + 1, 0) for r in rows])
+    np.add.at(deltas, (offsets, [status_index[r[2]] for r in rows]), [r[5] for r in rows])
+    flow = np.cumsum(deltas, axis=0)[1:]
+    return CumulativeFlow(
+        days=days, series={status: flow[:, i].tolist() for i, status in enumerate(statuses) if flow[:, i].any()}
+    )
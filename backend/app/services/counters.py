@@ -0,0 +1,131 @@
+# backend/app/services/counters.py
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import String, cast, delete, func, literal, select, text, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.issue import Issue, IssuePriority, IssueType
+from app.models.project import ProjectCounter, ProjectMember
+from app.schemas.project import ProjectStats
+from app.services.issue_query import enum_label
+
+
+async def load_counters(session: AsyncSession, project_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, Dict[str, Dict[str, int]]]:
+    """Счетчики нескольких проектов одним запросом: {project_id: {dimension: {bucket: value}}}"""
+    project_ids = list(project_ids)
+    counters: Dict[uuid.UUID, Dict[str, Dict[str, int]]] = {pid: defaultdict(dict) for pid in project_ids}
+    if not project_ids:
+        return counters
+    rows = await session.execute(
+        select(ProjectCounter.project_id, ProjectCounter.dimension, ProjectCounter.bucket, ProjectCounter.value)
+        .where(ProjectCounter.project_id.in_(project_ids))
+    )
+    for project_id, dimension, bucket, value in rows:
+        if value:
+            counters[project_id][dimension][bucket] = value
+    return counters
+
+
+async def project_list_counts(session: AsyncSession, project_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, Dict[str, int]]:
+    """members_count / issues_count / open_issues_count для списка проектов"""
+    counters = await load_counters(session, project_ids)
+    return {
+        pid: {
+            "members_count": c["members"].get("", 0),
+            "issues_count": c["total"].get("", 0),
+            "open_issues_count": c["open"].get("", 0),
+        }
+        for pid, c in counters.items()
+    }
+
+
+async def get_project_stats(session: AsyncSession, project_id: uuid.UUID) -> ProjectStats:
+    c = (await load_counters(session, [project_id]))[project_id]
+    total = c["total"].get("", 0)
+    open_issues = c["open"].get("", 0)
+    return ProjectStats(
+        total_issues=total,
+        open_issues=open_issues,
+        closed_issues=total - open_issues,
+        by_type={enum_label(IssueType, k): v for k, v in c["type"].items()},
+        by_priority={enum_label(IssuePriority, k): v for k, v in c["priority"].items()},
+        by_status=dict(c["status"]),
+    )
+
+
+def _expected_counters(project_ids: Optional[List[uuid.UUID]]):
+    """Счетчики, посчитанные заново по issues/project_members"""
+    def scoped(stmt, column):
+        return stmt.where(column.in_(project_ids)) if project_ids is not None else stmt
+
+    issue_dimensions = [
+        (literal("total"), literal("")),
+        (literal("status"), Issue.status),
+        (literal("type"), func.coalesce(cast(Issue.type, String), "")),
+        (literal("priority"), func.coalesce(cast(Issue.priority, String), "")),
+    ]
+    parts = [
+        scoped(
+            select(Issue.project_id, dimension.label("dimension"), bucket.label("bucket"), func.count().label("value"))
+            .group_by(Issue.project_id, bucket),
+            Issue.project_id,
+        )
+        for dimension, bucket in issue_dimensions
+    ]
+    parts.append(scoped(
+        select(Issue.project_id, literal("open"), literal(""), func.count())
+        .where(Issue.is_closed.is_(False))
+        .group_by(Issue.project_id),
+        Issue.project_id,
+    ))
+    parts.append(scoped(
+        select(ProjectMember.project_id, literal("members"), literal(""), func.count())
+        .group_by(ProjectMember.project_id),
+        ProjectMember.project_id,
+    ))
+    return union_all(*parts)
+
+
+async def reconcile_counters(session: AsyncSession, project_ids: Optional[List[uuid.UUID]] = None) -> int:
+    """
+    Исправить расхождения счетчиков с фактическими данными.
+
+    Возвращает количество исправленных бакетов. Запускается периодически
+    (или после ручных правок в БД). На время сверки триггеры пишущих транзакций
+    ждут блокировку project_counters, поэтому сверка не теряет параллельные изменения.
+    """
+    await session.execute(text("LOCK TABLE project_counters IN SHARE ROW EXCLUSIVE MODE"))
+    expected = {
+        (r[0], r[1], r[2]): r[3]
+        for r in (await session.execute(_expected_counters(project_ids))).all()
+    }
+
+    actual_stmt = select(ProjectCounter.project_id, ProjectCounter.dimension, ProjectCounter.bucket, ProjectCounter.value)
+    if project_ids is not None:
+        actual_stmt = actual_stmt.where(ProjectCounter.project_id.in_(project_ids))
+    actual = {(r[0], r[1], r[2]): r[3] for r in (await session.execute(actual_stmt)).all()}
+
+    fixes = [
+        {"project_id": key[0], "dimension": key[1], "bucket": key[2], "value": value}
+        for key, value in expected.items()
+        if actual.get(key) != value
+    ]
+    stale = [key for key, value in actual.items() if key not in expected and value != 0]
+
+    if fixes:
+        stmt = insert(ProjectCounter).values(fixes)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[ProjectCounter.project_id, ProjectCounter.dimension, ProjectCounter.bucket],
+            set_={"value": stmt.excluded.value},
+        ))
+    if stale:
+        await session.execute(
+            delete(ProjectCounter).where(
+                tuple_(ProjectCounter.project_id, ProjectCounter.dimension, ProjectCounter.bucket).in_(stale)
+            )
+        )
+    await session.commit()
+    return len(fixes) + len(stale)
@@ -0,0 +1,232 @@
+# backend/app/services/dependencies.py
+"""
+Граф зависимостей задач: транзитивные обходы, критический путь блокеров,
+проверка циклов при создании связи.
+
+Обходы - рекурсивные CTE: один запрос на любой глубине вместо запроса на
+каждый шаг ленивой загрузки. CTE ребер NOT MATERIALIZED, поэтому условие
+соединения проталкивается в обе ветви и идет по idx_issue_links_source /
+idx_issue_links_target.
+"""
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.graph import BLOCKS, HIERARCHY, ProjectGraph, graph_cache, normalize_link
+from app.models.issue import IssueLink, IssueLinkType
+
+# отношение -> (тип связи source->target в прямом направлении, в обратном)
+_LINK_TYPES = {
+    BLOCKS: (IssueLinkType.BLOCKS.name, IssueLinkType.IS_BLOCKED_BY.name),
+    HIERARCHY: (IssueLinkType.PARENT.name, IssueLinkType.CHILD.name),
+}
+
+_EDGES = """
+edges AS NOT MATERIALIZED (
+    SELECT source_issue_id AS from_id, source_project_id AS from_project,
+           target_issue_id AS to_id, target_project_id AS to_project
+    FROM issue_links WHERE link_type = :forward
+    UNION ALL
+    SELECT target_issue_id, target_project_id, source_issue_id, source_project_id
+    FROM issue_links WHERE link_type = :backward
+)
+"""
+
+_WALK = """
+WITH RECURSIVE {edges},
+walk(id) AS (
+    SELECT e.{dst} FROM edges e WHERE e.{src} = ANY(:start_ids)
+    UNION  -- UNION, а не UNION ALL: повторно встреченные вершины отбрасываются, обход конечен
+    SELECT e.{dst} FROM walk w JOIN edges e ON e.{src} = w.id
+)
+SELECT id FROM walk
+"""
+
+_REACHES = """
+WITH RECURSIVE {edges},
+walk(id) AS (
+    SELECT CAST(:start AS uuid)
+    UNION
+    SELECT e.to_id FROM walk w JOIN edges e ON e.from_id = w.id
+)
+SELECT 1 FROM walk WHERE id = :goal LIMIT 1
+"""
+
+# Открытые блокеры задачи на любой глубине (каждый один раз, в отличие от
+# перебора путей) с оставшимися часами и задачами, которые они блокируют
+_REMAINING = "greatest(coalesce(i.estimate_hours, 0) - coalesce(i.spent_hours, 0), 0)"
+_OPEN_BLOCKERS = f"""
+WITH RECURSIVE {{edges}},
+blockers(id, project_id) AS (
+    SELECT e.from_id, e.from_project FROM edges e WHERE e.to_id = :issue_id
+    UNION
+    SELECT e.from_id, e.from_project
+    FROM blockers b
+    JOIN issues i ON i.id = b.id AND i.project_id = b.project_id AND NOT i.is_closed
+    JOIN edges e ON e.to_id = b.id
+)
+SELECT b.id, {_REMAINING} AS hours, ARRAY(SELECT e.to_id FROM edges e WHERE e.from_id = b.id) AS blocks
+FROM blockers b JOIN issues i ON i.id = b.id AND i.project_id = b.project_id
+WHERE NOT i.is_closed AND b.id <> :issue_id
+"""
+
+
+class LinkCycleError(ValueError):
+    """Связь замкнула бы цикл блокировок или иерархии"""
+
+
+def _params(kind: str, **params):
+    forward, backward = _LINK_TYPES[kind]
+    return {"forward": forward, "backward": backward, **params}
+
+
+async def _walk(session: AsyncSession, kind: str, issue_ids: Iterable[uuid.UUID], forward: bool) -> Set[uuid.UUID]:
+    src, dst = ("from_id", "to_id") if forward else ("to_id", "from_id")
+    stmt = text(_WALK.format(edges=_EDGES, src=src, dst=dst))
+    rows = await session.execute(stmt, _params(kind, start_ids=list(issue_ids)))
+    return set(rows.scalars().all())
+
+
+async def descendants(session: AsyncSession, issue_id: uuid.UUID, kind: str = HIERARCHY) -> Set[uuid.UUID]:
+    """Все задачи ниже по связям: подзадачи эпика (hierarchy) или все, что задача блокирует (blocks)"""
+    return await _walk(session, kind, [issue_id], forward=True) - {issue_id}
+
+
+async def ancestors(session: AsyncSession, issue_id: uuid.UUID, kind: str = HIERARCHY) -> Set[uuid.UUID]:
+    """Все задачи выше по связям: родители до корня (hierarchy) или все блокеры (blocks)"""
+    return await _walk(session, kind, [issue_id], forward=False) - {issue_id}
+
+
+async def ancestors_direct(session: AsyncSession, issue_id: uuid.UUID) -> Set[uuid.UUID]:
+    """Непосредственные родители задачи в иерархии"""
+    stmt = text(f"WITH {_EDGES} SELECT from_id FROM edges WHERE to_id = :issue_id")
+    return set((await session.execute(stmt, _params(HIERARCHY, issue_id=issue_id))).scalars().all())
+
+
+def _heaviest_chain(
+    issue_id: uuid.UUID, hours: Dict[uuid.UUID, int], blocked_by: Dict[uuid.UUID, List[uuid.UUID]]
+) -> Tuple[List[uuid.UUID], int]:
+    """
+    Самый длинный взвешенный путь в графе блокеров (он ацикличен, см. create_link).
+
+    Для каждой вершины один раз считается лучшая цепочка, которая в нее
+    приходит, - (часы, длина); обход итеративный, ребра на вершины в стеке
+    (цикл в старых данных) пропускаются.
+    """
+    best: Dict[uuid.UUID, Tuple[int, int]] = {}
+    previous: Dict[uuid.UUID, Optional[uuid.UUID]] = {}
+    visiting: Set[uuid.UUID] = set()
+    stack = [(issue_id, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            visiting.discard(node)
+            top = max((u for u in blocked_by.get(node, ()) if u in best), key=best.__getitem__, default=None)
+            total, length = best[top] if top is not None else (0, 0)
+            best[node] = (total + hours.get(node, 0), length + 1)
+            previous[node] = top
+        elif node not in best and node not in visiting:
+            visiting.add(node)
+            stack.append((node, True))
+            stack.extend((u, False) for u in blocked_by.get(node, ()) if u not in best and u not in visiting)
+    path = [issue_id]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return path[::-1], best[issue_id][0]
+
+
+async def critical_path(session: AsyncSession, issue_id: uuid.UUID) -> Tuple[List[uuid.UUID], int]:
+    """
+    Самая тяжелая цепочка незакрытых блокеров: (путь от корневого блокера
+    до самой задачи, сумма оставшихся часов). Пустой путь - блокеров нет.
+
+    Запрос возвращает подграф блокеров (каждую вершину один раз), путь
+    считается динамическим программированием - без перебора всех путей.
+    """
+    stmt = text(_OPEN_BLOCKERS.format(edges=_EDGES))
+    rows = (await session.execute(stmt, _params(BLOCKS, issue_id=issue_id))).all()
+    if not rows:
+        return [], 0
+    hours = {row.id: row.hours for row in rows}
+    blocked_by: Dict[uuid.UUID, List[uuid.UUID]] = {}
+    for row in rows:
+        for blocked in row.blocks:
+            if blocked == issue_id or blocked in hours:
+                blocked_by.setdefault(blocked, []).append(row.id)
+    return _heaviest_chain(issue_id, hours, blocked_by)
+
+
+async def would_create_cycle(
+    session: AsyncSession, link_type: IssueLinkType, source_id: uuid.UUID, target_id: uuid.UUID
+) -> bool:
+    normalized = normalize_link(link_type.name, source_id, target_id)
+    if normalized is None:
+        return False
+    kind, from_id, to_id = normalized
+    if from_id == to_id:
+        return True
+    # цикл появится, если from уже достижима из to
+    stmt = text(_REACHES.format(edges=_EDGES))
+    found = await session.execute(stmt, _params(kind, start=to_id, goal=from_id))
+    return found.first() is not None
+
+
+async def create_link(
+    session: AsyncSession,
+    source_issue_id: uuid.UUID,
+    source_project_id: uuid.UUID,
+    target_issue_id: uuid.UUID,
+    target_project_id: uuid.UUID,
+    link_type: IssueLinkType,
+    created_by: uuid.UUID,
+) -> IssueLink:
+    normalized = normalize_link(link_type.name, source_issue_id, target_issue_id)
+    if normalized is not None:
+        # Две параллельные связи по отдельности допустимы, а вместе могут
+        # замкнуть цикл - проверка и вставка сериализуются по типу отношения
+        await session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"issue_graph:{normalized[0]}"})
+        if await would_create_cycle(session, link_type, source_issue_id, target_issue_id):
+            await session.rollback()
+            raise LinkCycleError(f'Link {link_type.value} would create a dependency cycle')
+        kind, parent_id, child_id = normalized
+        if kind == HIERARCHY and await ancestors_direct(session, child_id):
+            # иерархия - дерево: суммы по поддереву считаются без двойного учета
+            await session.rollback()
+            raise ValueError('Issue already has a parent')
+    link = IssueLink(
+        source_issue_id=source_issue_id,
+        source_project_id=source_project_id,
+        target_issue_id=target_issue_id,
+        target_project_id=target_project_id,
+        link_type=link_type,
+        created_by=created_by,
+    )
+    session.add(link)
+    await session.commit()
+    return link
+
+
+async def delete_link(session: AsyncSession, link: IssueLink) -> None:
+    await session.delete(link)
+    await session.commit()
+
+
+async def project_graph(session: AsyncSession, project_id: uuid.UUID) -> ProjectGraph:
+    """
+    Граф связей проекта с кэшируемым замыканием (для страниц эпиков и досок).
+
+    Загружается одним запросом; связи с задачами других проектов входят
+    как ребра, но их собственные связи не подгружаются.
+    """
+    graph = graph_cache.get(project_id)
+    if graph is not None:
+        return graph
+    rows = await session.execute(
+        select(IssueLink.link_type, IssueLink.source_issue_id, IssueLink.target_issue_id).where(
+            or_(IssueLink.source_project_id == project_id, IssueLink.target_project_id == project_id)
+        )
+    )
+    edges = filter(None, (normalize_link(t.name, s, d) for t, s, d in rows.all()))
+    return graph_cache.put(project_id, ProjectGraph(edges))
@@ -0,0 +1,150 @@
+# backend/app/services/exporter.py
+import csv
+import enum
+import io
+import json
+import uuid
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from app.core.database import AsyncSessionLocal
+from app.models.issue import Issue, IssueTag, Tag
+from app.models.user import User
+from app.schemas.issue import IssueFilter
+from app.services.issue_query import apply_issue_filter
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+YIELD_PER = 1000
+FLUSH_BYTES = 64 * 1024
+
+EXPORT_COLUMNS = (
+    "key", "title", "type", "status", "priority", "is_closed", "assignee", "reporter",
+    "tags", "estimate_hours", "spent_hours", "due_date", "created_at", "updated_at",
+    "closed_at", "description", "custom_fields", "id",
+)
+
+
+def _export_statement(project_id: uuid.UUID, issue_filter: Optional[IssueFilter]):
+    """Плоские столбцы вместо ORM-объектов - строки не копятся в identity map"""
+    assignee = aliased(User)
+    reporter = aliased(User)
+    tags = (
+        select(func.string_agg(Tag.name, ","))
+        .join(IssueTag, IssueTag.tag_id == Tag.id)
+        .where(IssueTag.issue_id == Issue.id)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(
+            Issue.key, Issue.title, Issue.type, Issue.status, Issue.priority, Issue.is_closed,
+            assignee.username.label("assignee"), reporter.username.label("reporter"),
+            tags.label("tags"), Issue.estimate_hours, Issue.spent_hours, Issue.due_date,
+            Issue.created_at, Issue.updated_at, Issue.closed_at, Issue.description,
+            Issue.custom_fields, Issue.id,
+        )
+        .outerjoin(assignee, assignee.id == Issue.assignee_id)
+        .join(reporter, reporter.id == Issue.reporter_id)
+        .where(Issue.project_id == project_id)
+        .order_by(Issue.created_at, Issue.id)
+    )
+    if issue_filter is not None:
+        stmt = apply_issue_filter(stmt, issue_filter)
+    return stmt.execution_options(yield_per=YIELD_PER)
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _rows(project_id: uuid.UUID, issue_filter: Optional[IssueFilter]) -> AsyncIterator[dict]:
+    # Своя сессия: генератор живет дольше, чем зависимость запроса
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(_export_statement(project_id, issue_filter))
+        async for partition in result.partitions():
+            for row in partition:
+                yield {column: _plain(value) for column, value in zip(EXPORT_COLUMNS, row)}
+
+
+async def _serialize(rows: AsyncIterator[dict], export_format: str) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    if export_format == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        async for row in rows:
+            row["custom_fields"] = json.dumps(row["custom_fields"] or {}, ensure_ascii=False)
+            writer.writerow([row[c] for c in EXPORT_COLUMNS])
+            if buffer.tell() >= FLUSH_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    else:
+        async for row in rows:
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write("\n")
+            if buffer.tell() >= FLUSH_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def export_issues(
+    project_id: uuid.UUID,
+    issue_filter: Optional[IssueFilter] = None,
+    export_format: str = "csv",
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """
+    Потоковая выгрузка задач проекта в CSV/NDJSON.
+
+    Строки читаются серверным курсором порциями по YIELD_PER и отдаются
+    кусками по ~FLUSH_BYTES, поэтому память не зависит от размера проекта.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 - формат gzip
+    async for chunk in _serialize(_rows(project_id, issue_filter), export_format):
+        data = chunk.encode("utf-8")
+        if compressor is None:
+            yield data
+        else:
+            compressed = compressor.compress(data)
+            if compressed:
+                yield compressed
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def export_issues_response(
+    project_id: uuid.UUID,
+    project_key: str,
+    issue_filter: Optional[IssueFilter] = None,
+    export_format: str = "csv",
+    compress: bool = False,
+) -> StreamingResponse:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+    filename = f"{project_key.lower()}-issues.{export_format}"
+    headers = {}
+    media_type = EXPORT_FORMATS[export_format]
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(
+        export_issues(project_id, issue_filter, export_format, compress),
+        media_type=media_type,
+        headers=headers,
+    )
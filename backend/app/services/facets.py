@@ -0,0 +1,105 @@
+# backend/app/services/facets.py
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy import String, case, cast, func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.issue import Issue, IssuePriority, IssueTag, IssueType, Tag
+from app.schemas.issue import IssueFilter
+from app.services.issue_query import apply_issue_filter, enum_label
+
+FACETS = ("status", "type", "priority", "assignee", "tags")
+DEFAULT_FACET_LIMITS = {
+    "status": 50,
+    "type": 20,
+    "priority": 20,
+    "assignee": 25,
+    "tags": 25,
+}
+NO_VALUE = "none"  # бакет для пустых значений (например, задачи без исполнителя)
+
+
+async def compute_facets(
+    session: AsyncSession,
+    project_id: uuid.UUID,
+    issue_filter: IssueFilter,
+    limits: Optional[Dict[str, int]] = None,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Все фасеты IssueSearchResult.facets за один запрос.
+
+    Отфильтрованные задачи материализуются один раз в CTE, по ней считаются
+    GROUPING SETS (status, type, priority, assignee) и отдельная группировка
+    по тегам; ROW_NUMBER отрезает каждый фасет по его лимиту.
+    """
+    limits = {**DEFAULT_FACET_LIMITS, **(limits or {})}
+
+    filtered = (
+        apply_issue_filter(
+            select(Issue.id, Issue.status, Issue.type, Issue.priority, Issue.assignee_id)
+            .where(Issue.project_id == project_id),
+            issue_filter,
+        )
+        .cte("filtered")
+        .prefix_with("MATERIALIZED")
+    )
+
+    c = filtered.c
+    facet = case(
+        (func.grouping(c.status) == 0, literal("status")),
+        (func.grouping(c.type) == 0, literal("type")),
+        (func.grouping(c.priority) == 0, literal("priority")),
+        else_=literal("assignee"),
+    )
+    bucket = case(
+        (func.grouping(c.status) == 0, c.status),
+        (func.grouping(c.type) == 0, cast(c.type, String)),
+        (func.grouping(c.priority) == 0, cast(c.priority, String)),
+        else_=cast(c.assignee_id, String),
+    )
+    scalar_facets = select(
+        facet.label("facet"),
+        func.coalesce(bucket, NO_VALUE).label("bucket"),
+        func.count().label("cnt"),
+    ).group_by(func.grouping_sets(c.status, c.type, c.priority, c.assignee_id))
+
+    tag_facet = (
+        select(
+            literal("tags").label("facet"),
+            Tag.name.label("bucket"),
+            func.count().label("cnt"),
+        )
+        .select_from(filtered)
+        .join(IssueTag, IssueTag.issue_id == c.id)
+        .join(Tag, Tag.id == IssueTag.tag_id)
+        .group_by(Tag.name)
+    )
+
+    buckets = union_all(scalar_facets, tag_facet).subquery("buckets")
+    ranked = select(
+        buckets,
+        func.row_number().over(
+            partition_by=buckets.c.facet,
+            order_by=(buckets.c.cnt.desc(), buckets.c.bucket),
+        ).label("rn"),
+    ).subquery("ranked")
+    facet_limit = case(
+        *[(ranked.c.facet == name, limit) for name, limit in limits.items()],
+        else_=0,
+    )
+    stmt = (
+        select(ranked.c.facet, ranked.c.bucket, ranked.c.cnt)
+        .where(ranked.c.rn <= facet_limit)
+        .order_by(ranked.c.facet, ranked.c.rn)
+    )
+
+    result: Dict[str, Dict[str, int]] = {name: {} for name in FACETS}
+    for row in (await session.execute(stmt)).all():
+        label = row.bucket
+        if row.facet == "type":
+            label = enum_label(IssueType, label)
+        elif row.facet == "priority":
+            label = enum_label(IssuePriority, label)
+        result[row.facet][label] = row.cnt
+    return result
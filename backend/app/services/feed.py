@@ -0,0 +1,203 @@
+# backend/app/services/feed.py
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis.asyncio as aioredis
+from sqlalchemy import and_, or_, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.models.comment import Activity, Comment
+from app.models.issue import Issue
+from app.schemas.comment import Activity as ActivitySchema
+from app.services.realtime import event_message, project_channel
+
+FEED_MAX_LEN = 500  # сколько последних событий держим в каждой ленте
+USER_FEED_TTL = 30 * 24 * 3600  # ленты неактивных пользователей вытесняются
+
+
+def project_feed_key(project_id) -> str:
+    return f"feed:project:{project_id}"
+
+
+def user_feed_key(user_id) -> str:
+    return f"feed:user:{user_id}"
+
+
+def _data(activity: Activity) -> Dict[str, Any]:
+    return ActivitySchema.model_validate(activity).model_dump(mode="json")
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    # тот же компактный формат, что у model_dump_json: члены ZSET должны совпадать
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _serialize(activity: Activity) -> str:
+    return _dumps(_data(activity))
+
+
+def _score(activity: Activity) -> float:
+    return activity.created_at.timestamp()
+
+
+def _member_id(payload: str) -> uuid.UUID:
+    return uuid.UUID(json.loads(payload)["id"])
+
+
+async def issue_watchers(session: AsyncSession, issue_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, Set[uuid.UUID]]:
+    """Наблюдатели задач (автор, исполнитель, комментаторы) одним запросом"""
+    issue_ids = list(set(issue_ids))
+    watchers: Dict[uuid.UUID, Set[uuid.UUID]] = {issue_id: set() for issue_id in issue_ids}
+    if not issue_ids:
+        return watchers
+    participants = union(
+        select(Issue.id, Issue.reporter_id).where(Issue.id.in_(issue_ids)),
+        select(Issue.id, Issue.assignee_id).where(Issue.id.in_(issue_ids), Issue.assignee_id.is_not(None)),
+        select(Comment.issue_id, Comment.author_id).where(Comment.issue_id.in_(issue_ids)),
+    )
+    for issue_id, user_id in await session.execute(participants):
+        watchers[issue_id].add(user_id)
+    return watchers
+
+
+async def fan_out(session: AsyncSession, redis: aioredis.Redis, activities: List[Activity]) -> None:
+    """
+    Разложить новые события по лентам проекта и наблюдателей (fan-out on write).
+
+    Вызывается после commit; у событий должны быть загружены user и issue.
+    Все ZADD/обрезки выполняются одним pipeline - один round trip на пачку событий;
+    в том же pipeline события публикуются в push-канал проекта.
+    """
+    if not activities:
+        return
+    watchers = await issue_watchers(session, [a.issue_id for a in activities if a.issue_id])
+    pipe = redis.pipeline(transaction=False)
+    touched_users = set()
+    for activity in activities:
+        data = _data(activity)
+        entry = {_dumps(data): _score(activity)}
+        project_key = project_feed_key(activity.project_id)
+        pipe.zadd(project_key, entry)
+        pipe.publish(project_channel(activity.project_id), event_message("activity", data, activity.project_id))
+        pipe.zremrangebyrank(project_key, 0, -FEED_MAX_LEN - 1)
+        for user_id in watchers.get(activity.issue_id, ()):
+            if user_id == activity.user_id:
+                continue
+            user_key = user_feed_key(user_id)
+            pipe.zadd(user_key, entry)
+            pipe.zremrangebyrank(user_key, 0, -FEED_MAX_LEN - 1)
+            touched_users.add(user_key)
+    for user_key in touched_users:
+        pipe.expire(user_key, USER_FEED_TTL)
+    await pipe.execute()
+
+
+async def _read(redis: aioredis.Redis, key: str, limit: int, before: Optional[float], before_id: Optional[uuid.UUID]):
+    """
+    Страница после курсора (before, before_id) в порядке (score, id) по убыванию - как в БД.
+
+    Члены ZSET начинаются с {"id":"...", поэтому при равном score Redis
+    упорядочивает их по id. События с тем же score, что у курсора, читаются
+    отдельно и отбираются по id - иначе одновременные события терялись бы.
+    """
+    pipe = redis.pipeline(transaction=False)
+    pipe.exists(key)
+    pipe.zcard(key)
+    pipe.zrevrangebyscore(key, f"({before}" if before is not None else "+inf", "-inf", start=0, num=limit)
+    if before is not None and before_id is not None:
+        pipe.zrevrangebyscore(key, before, before)
+    exists, size, payloads, *ties = await pipe.execute()
+    if ties:
+        payloads = ([p for p in ties[0] if _member_id(p) < before_id] + payloads)[:limit]
+    return bool(exists), size, payloads
+
+
+async def _load_activities(session: AsyncSession, stmt, limit: int) -> List[Activity]:
+    stmt = (
+        stmt.options(selectinload(Activity.user), selectinload(Activity.issue))
+        .order_by(Activity.created_at.desc(), Activity.id.desc())
+        .limit(limit)
+    )
+    return list((await session.execute(stmt)).scalars().all())
+
+
+async def _store(redis: aioredis.Redis, key: str, activities: List[Activity], ttl: Optional[int] = None) -> None:
+    if not activities:
+        return
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.zadd(key, {_serialize(a): _score(a) for a in activities})
+    if ttl:
+        pipe.expire(key, ttl)
+    await pipe.execute()
+
+
+async def _feed(
+    session: AsyncSession,
+    redis: aioredis.Redis,
+    key: str,
+    source_stmt,
+    limit: int,
+    before: Optional[float],
+    before_id: Optional[uuid.UUID],
+    ttl: Optional[int] = None,
+) -> List[str]:
+    exists, size, payloads = await _read(redis, key, limit, before, before_id)
+    if exists and (len(payloads) == limit or size < FEED_MAX_LEN):
+        return payloads  # ответ целиком из кэша; size < FEED_MAX_LEN - лента не обрезана, старше ничего нет
+
+    if not exists and before is None:
+        # Промах кэша: восстановить ленту по индексу (parent_id, created_at DESC)
+        activities = await _load_activities(session, source_stmt, FEED_MAX_LEN)
+        await _store(redis, key, activities, ttl)
+        return [_serialize(a) for a in activities[:limit]]
+
+    # Страница глубже кэшированного окна - читаем из БД
+    stmt = source_stmt
+    if before is not None:
+        created_at = datetime.fromtimestamp(before, tz=timezone.utc)
+        if before_id is not None:
+            stmt = stmt.where(or_(
+                Activity.created_at < created_at,
+                and_(Activity.created_at == created_at, Activity.id < before_id),
+            ))
+        else:
+            stmt = stmt.where(Activity.created_at < created_at)
+    return [_serialize(a) for a in await _load_activities(session, stmt, limit)]
+
+
+async def get_project_feed(
+    session: AsyncSession,
+    redis: aioredis.Redis,
+    project_id: uuid.UUID,
+    limit: int = 50,
+    before: Optional[float] = None,
+    before_id: Optional[uuid.UUID] = None,
+) -> List[str]:
+    """
+    Готовые JSON-строки схемы Activity, новые сверху.
+
+    Курсор следующей страницы - score (created_at.timestamp()) и id последнего
+    элемента; без before_id события с тем же score, что у курсора, пропускаются.
+    """
+    source = select(Activity).where(Activity.project_id == project_id)
+    return await _feed(session, redis, project_feed_key(project_id), source, limit, before, before_id)
+
+
+async def get_user_feed(
+    session: AsyncSession,
+    redis: aioredis.Redis,
+    user_id: uuid.UUID,
+    limit: int = 50,
+    before: Optional[float] = None,
+    before_id: Optional[uuid.UUID] = None,
+) -> List[str]:
+    watched = union(
+        select(Issue.id).where(or_(Issue.reporter_id == user_id, Issue.assignee_id == user_id)),
+        select(Comment.issue_id).where(Comment.author_id == user_id),
+    )
+    source = select(Activity).where(Activity.issue_id.in_(watched), Activity.user_id != user_id)
+    return await _feed(session, redis, user_feed_key(user_id), source, limit, before, before_id, USER_FEED_TTL)
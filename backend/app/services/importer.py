@@ -0,0 +1,308 @@
+# backend/app/services/importer.py
+import csv
+import itertools
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.markdown import RENDERER_VERSION
+from app.core.partitioning import ensure_range_partitions
+from app.models.import_job import ImportJob, ImportStatus
+from app.models.issue import IssuePriority, IssueType, Tag
+from app.models.project import Project
+from app.schemas.issue import IssueImportRecord
+from app.services.issue_keys import reserve_issue_keys
+from app.services.rendering import render_many
+from app.services.reports import rebuild_daily_stats
+from app.services.retention import retention_cutoff
+from app.services.workflow import warm_workflow_cache
+
+BATCH_SIZE = 1000
+MAX_STORED_ERRORS = 100
+JSON_CSV_COLUMNS = ("comments", "history", "custom_fields")
+
+ISSUE_COLUMNS = (
+    "id", "project_id", "key", "title", "description", "description_html", "html_version", "type", "status", "priority",
+    "assignee_id", "reporter_id", "estimate_hours", "spent_hours", "due_date", "closed_at",
+    "custom_fields", "created_at", "updated_at",
+)
+COMMENT_COLUMNS = (
+    "id", "issue_id", "project_id", "author_id", "content", "content_html", "html_version",
+    "is_internal", "created_at", "updated_at",
+)
+ISSUE_TAG_COLUMNS = ("issue_id", "project_id", "tag_id", "added_by", "added_at")
+HISTORY_COLUMNS = ("id", "issue_id", "project_id", "changed_by", "changed_field", "old_value", "new_value", "created_at")
+
+
+@dataclass
+class ImportProgress:
+    job_id: uuid.UUID
+    records_done: int
+    issues_imported: int
+    records_failed: int
+
+
+def iter_records(stream: TextIO, source_format: str) -> Iterator[Any]:
+    """
+    Построчное чтение CSV/NDJSON без загрузки файла в память.
+
+    Отдает сырые записи (строку NDJSON, строку CSV как dict): JSON разбирается
+    в decode_record, чтобы битая запись считалась ошибкой записи, а не импорта.
+    """
+    if source_format == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+    elif source_format == "csv":
+        for row in csv.DictReader(stream):
+            yield {k: v for k, v in row.items() if v not in (None, "")}
+    else:
+        raise ValueError(f'Unsupported import format: {source_format}')
+
+
+def decode_record(raw: Any, source_format: str) -> Dict[str, Any]:
+    """Сырая запись из iter_records -> dict; ошибки JSON - ValueError"""
+    if source_format == "ndjson":
+        return json.loads(raw)
+    record = dict(raw)
+    for column in JSON_CSV_COLUMNS:
+        if column in record:
+            record[column] = json.loads(record[column])
+    return record
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _aware(value: Optional[datetime], default: datetime) -> datetime:
+    if value is None:
+        return default
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def _copy(session: AsyncSession, table: str, columns, records: List[tuple]) -> None:
+    if not records:
+        return
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table, records=records, columns=list(columns))
+
+
+async def create_import_job(
+    session: AsyncSession,
+    project_id: uuid.UUID,
+    user_id: uuid.UUID,
+    source_name: str,
+    source_format: str,
+) -> ImportJob:
+    if source_format not in ("csv", "ndjson"):
+        raise ValueError(f'Unsupported import format: {source_format}')
+    job = ImportJob(
+        project_id=project_id,
+        created_by=user_id,
+        source_name=source_name,
+        source_format=source_format,
+    )
+    session.add(job)
+    await session.commit()
+    return job
+
+
+class IssueImporter:
+    """
+    Потоковый импорт задач с комментариями, тегами и историей.
+
+    Записи валидируются IssueImportRecord (расширение IssueCreate) батчами
+    и пишутся через COPY. Каждый батч коммитится вместе с ImportJob.records_done,
+    поэтому повторный запуск продолжает с первой незафиксированной записи.
+    История старше срока хранения (HISTORY_RETENTION_MONTHS) не импортируется:
+    ее партиции были бы сразу выгружены в архив и удалены.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        job: ImportJob,
+        on_progress: Optional[Callable[[ImportProgress], Awaitable[None]]] = None,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.session = session
+        self.job = job
+        self.on_progress = on_progress
+        self.batch_size = batch_size
+        self._project: Optional[Project] = None
+        self._workflow = None
+        self._history_cutoff: Optional[date] = None
+
+    async def run(self, stream: TextIO) -> ImportJob:
+        job = self.job
+        self._project = await self.session.get(Project, job.project_id)
+        self._workflow = (await warm_workflow_cache(self.session, [job.project_id]))[job.project_id]
+        self._history_cutoff = retention_cutoff("issue_history")
+        job.status = ImportStatus.RUNNING
+        await self.session.commit()
+
+        records = itertools.islice(iter_records(stream, job.source_format), job.records_done, None)
+        if job.records_done:
+            logger.info(f"Import {job.id}: resuming after record {job.records_done}")
+        try:
+            for batch in _batched(records, self.batch_size):
+                await self._import_batch(batch)
+                if self.on_progress:
+                    await self.on_progress(ImportProgress(job.id, job.records_done, job.issues_imported, job.records_failed))
+        except Exception as e:
+            await self.session.rollback()
+            await self.session.refresh(job)  # после rollback атрибуты expired, а lazy load в async недоступен
+            job.status = ImportStatus.FAILED
+            job.errors = (job.errors or [])[-MAX_STORED_ERRORS + 1:] + [{"record": job.records_done, "error": str(e)}]
+            await self.session.commit()
+            logger.exception(f"Import {job.id} failed at record {job.records_done}")
+            raise
+
+        job.status = ImportStatus.COMPLETED
+        job.finished_at = datetime.now(timezone.utc)
+        await self.session.commit()
+        # задачи импортируются задним числом - уже агрегированные дни пересчитываются
+        await rebuild_daily_stats(self.session, job.project_id)
+        logger.info(f"Import {job.id} completed: {job.issues_imported} issues, {job.records_failed} failed records")
+        return job
+
+    async def _import_batch(self, batch: List[Any]) -> None:
+        job = self.job
+        first_number = job.records_done
+        valid: List[IssueImportRecord] = []
+        errors = []
+        for offset, raw in enumerate(batch):
+            try:
+                record = IssueImportRecord.model_validate(decode_record(raw, job.source_format))
+                if record.status and not self._workflow.is_valid(record.status):
+                    raise ValueError(f"Invalid status '{record.status}'")
+                valid.append(record)
+            except (ValidationError, ValueError) as e:
+                errors.append({"record": first_number + offset, "error": str(e)})
+
+        if valid:
+            now = datetime.now(timezone.utc)
+            await self._ensure_history_partitions(valid, now)
+            keys = await reserve_issue_keys(self.session, job.project_id, self._project.key, len(valid))
+            tag_ids = await self._resolve_tags({name for r in valid for name in r.tags})
+            skipped = await self._write(valid, keys, tag_ids, now)
+            if skipped:
+                logger.warning(f"Import {job.id}: skipped {skipped} history entries older than {self._history_cutoff}")
+                errors.append({
+                    "record": first_number,
+                    "error": f"{skipped} history entries older than retention period ({self._history_cutoff}) skipped",
+                })
+
+        job.records_done += len(batch)
+        job.issues_imported += len(valid)
+        job.records_failed += len(errors)
+        if errors:
+            job.errors = ((job.errors or []) + errors)[-MAX_STORED_ERRORS:]
+        await self.session.commit()
+        logger.debug(f"Import {job.id}: {job.records_done} records processed")
+
+    def _history_at(self, change, created_at: datetime) -> Optional[datetime]:
+        """Время записи истории; None - старше срока хранения"""
+        changed_at = _aware(change.created_at, created_at)
+        return changed_at if changed_at.astimezone(timezone.utc).date() >= self._history_cutoff else None
+
+    async def _ensure_history_partitions(self, records: List[IssueImportRecord], now: datetime) -> None:
+        """
+        Партиции issue_history для месяцев импортируемой истории.
+
+        Создаются отдельной короткой транзакцией до записи батча: CREATE ... PARTITION OF
+        берет ACCESS EXCLUSIVE на issue_history, и держать его все время COPY нельзя.
+        """
+        dates = [
+            at.astimezone(timezone.utc).date()
+            for record in records
+            for change in record.history
+            if (at := self._history_at(change, _aware(record.created_at, now))) is not None
+        ]
+        if not dates:
+            return
+        connection = await self.session.connection()
+        created = await connection.run_sync(ensure_range_partitions, "issue_history", min(dates), max(dates))
+        await self.session.commit()
+        if created:
+            logger.info(f"Import {self.job.id}: created partitions {', '.join(created)}")
+
+    async def _resolve_tags(self, names: set) -> Dict[str, uuid.UUID]:
+        """Имена тегов -> id одним запросом на батч, недостающие теги создаются"""
+        if not names:
+            return {}
+        project_id = self.job.project_id
+        rows = await self.session.execute(
+            select(Tag.name, Tag.id).where(Tag.project_id == project_id, Tag.name.in_(names))
+        )
+        tag_ids = dict(rows.all())
+        missing = names - tag_ids.keys()
+        if missing:
+            created = await self.session.execute(
+                insert(Tag)
+                .values([{"id": uuid.uuid4(), "project_id": project_id, "name": name} for name in sorted(missing)])
+                .returning(Tag.name, Tag.id)
+            )
+            tag_ids.update(dict(created.all()))
+        return tag_ids
+
+    async def _write(
+        self, records: List[IssueImportRecord], keys: List[str], tag_ids: Dict[str, uuid.UUID], now: datetime
+    ) -> int:
+        """Запись батча; возвращает число пропущенных записей истории старше срока хранения"""
+        job = self.job
+        skipped = 0
+        default_status = self._workflow.initial or "open"
+        issues, comments, issue_tags, history = [], [], [], []
+        # весь Markdown батча рендерится одним вызовом (дубликаты - один раз)
+        html = iter(await render_many(
+            [text for r in records for text in (r.description, *(c.content for c in r.comments))]
+        ))
+
+        for record, key in zip(records, keys):
+            issue_id = uuid.uuid4()
+            reporter_id = record.reporter_id or job.created_by
+            created_at = _aware(record.created_at, now)
+            issues.append((
+                issue_id, job.project_id, key, record.title, record.description, next(html), RENDERER_VERSION,
+                IssueType(record.type.value).name, record.status or default_status,
+                IssuePriority(record.priority.value).name, record.assignee_id, reporter_id,
+                record.estimate_hours, record.spent_hours, record.due_date, record.closed_at,
+                json.dumps(record.custom_fields), created_at, created_at,
+            ))
+            for name in dict.fromkeys(record.tags):
+                issue_tags.append((issue_id, job.project_id, tag_ids[name], reporter_id, created_at))
+            for comment in record.comments:
+                comment_at = _aware(comment.created_at, created_at)
+                comments.append((
+                    uuid.uuid4(), issue_id, job.project_id, comment.author_id, comment.content, next(html),
+                    RENDERER_VERSION, comment.is_internal, comment_at, comment_at,
+                ))
+            for change in record.history:
+                changed_at = self._history_at(change, created_at)
+                if changed_at is None:
+                    skipped += 1
+                    continue
+                history.append((
+                    uuid.uuid4(), issue_id, job.project_id, change.changed_by, change.changed_field,
+                    change.old_value, change.new_value, changed_at,
+                ))
+
+        await _copy(self.session, "issues", ISSUE_COLUMNS, issues)
+        await _copy(self.session, "issue_tags", ISSUE_TAG_COLUMNS, issue_tags)
+        await _copy(self.session, "comments", COMMENT_COLUMNS, comments)
+        await _copy(self.session, "issue_history", HISTORY_COLUMNS, history)
+        return skipped
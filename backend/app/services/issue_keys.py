@@ -0,0 +1,84 @@
+# backend/app/services/issue_keys.py
+import uuid
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, cast, event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.issue import Issue
+from app.models.project import Project, issue_key_sequence_name
+
+# Ключ проекта -> id; переименованные и удаленные ключи сбрасываются после commit
+# (события Project в app/models/project.py), ключ может достаться новому проекту
+_project_ids: Dict[str, uuid.UUID] = {}
+PROJECT_KEY_CHANGES = "project_key_changes"  # session.info: освободившиеся ключи
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_project_keys(session: Session) -> None:
+    for key in session.info.pop(PROJECT_KEY_CHANGES, ()):
+        _project_ids.pop(key, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_project_key_changes(session: Session) -> None:
+    session.info.pop(PROJECT_KEY_CHANGES, None)
+
+
+def parse_issue_key(issue_key: str):
+    project_key, _, number = issue_key.upper().rpartition("-")
+    if not project_key or not number.isdigit():
+        raise ValueError(f'Invalid issue key: {issue_key}')
+    return project_key, int(number)
+
+
+async def reserve_issue_keys(session: AsyncSession, project_id: uuid.UUID, project_key: str, count: int) -> List[str]:
+    """
+    Зарезервировать count ключей одним запросом (для импорта и массового создания).
+
+    Номера уникальны, но при параллельных резервированиях могут идти не подряд;
+    отмененные транзакции оставляют пропуски - как и у обычных sequence.
+    """
+    if count <= 0:
+        return []
+    rows = await session.execute(
+        text(f"SELECT nextval('{issue_key_sequence_name(project_id)}') FROM generate_series(1, :n)"),
+        {"n": count},
+    )
+    return [f"{project_key}-{number}" for (number,) in rows]
+
+
+async def ensure_key_sequence(session: AsyncSession, project_id: uuid.UUID) -> None:
+    """
+    Создать последовательность для проекта, созданного до ее появления,
+    и продвинуть ее за максимальный существующий номер.
+    """
+    name = issue_key_sequence_name(project_id)
+    await session.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {name}"))
+    last_number = await session.scalar(
+        select(func.max(cast(func.substring(Issue.key, r"(\d+)$"), Integer)))
+        .where(Issue.project_id == project_id)
+    )
+    if last_number:
+        await session.execute(text(f"SELECT setval('{name}', GREATEST(:n, (SELECT last_value FROM {name})))"), {"n": last_number})
+
+
+async def _resolve_project_id(session: AsyncSession, project_key: str) -> Optional[uuid.UUID]:
+    project_id = _project_ids.get(project_key)
+    if project_id is None:
+        project_id = await session.scalar(select(Project.id).where(Project.key == project_key))
+        if project_id is not None:
+            _project_ids[project_key] = project_id
+    return project_id
+
+
+async def get_issue_by_key(session: AsyncSession, issue_key: str) -> Optional[Issue]:
+    """BF-123 -> Issue: одна проба уникального индекса (project_id, key) в партиции проекта"""
+    project_key, number = parse_issue_key(issue_key)
+    project_id = await _resolve_project_id(session, project_key)
+    if project_id is None:
+        return None
+    return await session.scalar(
+        select(Issue).where(Issue.project_id == project_id, Issue.key == f"{project_key}-{number}")
+    )
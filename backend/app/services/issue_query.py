@@ -0,0 +1,50 @@
+# backend/app/services/issue_query.py
+from sqlalchemy import Select, cast, exists, func
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from app.models.issue import Issue, IssuePriority, IssueTag, IssueType, Tag
+from app.schemas.issue import IssueFilter
+from app.services.search import SEARCH_CONFIG
+
+
+def apply_issue_filter(stmt: Select, issue_filter: IssueFilter) -> Select:
+    """Добавить к запросу по issues условия из IssueFilter"""
+    f = issue_filter
+    if f.status:
+        stmt = stmt.where(Issue.status.in_(f.status))
+    if f.type:
+        stmt = stmt.where(Issue.type.in_([IssueType(t.value) for t in f.type]))
+    if f.priority:
+        stmt = stmt.where(Issue.priority.in_([IssuePriority(p.value) for p in f.priority]))
+    if f.assignee_id:
+        stmt = stmt.where(Issue.assignee_id.in_(f.assignee_id))
+    if f.reporter_id:
+        stmt = stmt.where(Issue.reporter_id.in_(f.reporter_id))
+    if f.tags:
+        stmt = stmt.where(
+            exists()
+            .where(IssueTag.issue_id == Issue.id)
+            .where(IssueTag.tag_id == Tag.id)
+            .where(Tag.name.in_(f.tags))
+        )
+    if f.is_closed is not None:
+        stmt = stmt.where(Issue.is_closed.is_(f.is_closed))
+    if f.search:
+        tsquery = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), f.search)
+        stmt = stmt.where(Issue.search_vector.op("@@")(tsquery))
+    if f.created_after:
+        stmt = stmt.where(Issue.created_at >= f.created_after)
+    if f.created_before:
+        stmt = stmt.where(Issue.created_at < f.created_before)
+    if f.due_after:
+        stmt = stmt.where(Issue.due_date >= f.due_after)
+    if f.due_before:
+        stmt = stmt.where(Issue.due_date < f.due_before)
+    return stmt
+
+
+def enum_label(enum_cls, value):
+    """Имя enum в БД (SQLAlchemy Enum хранит name) -> значение для API"""
+    if value in enum_cls.__members__:
+        return enum_cls[value].value
+    return value
@@ -0,0 +1,43 @@
+# backend/app/services/listing.py
+import uuid
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import paginate_keyset
+from app.models.comment import Activity, Comment
+from app.models.issue import Issue
+from app.models.notification import Notification, NotificationStatus
+from app.schemas.base import CursorParams, CursorPage
+
+
+async def list_project_issues(session: AsyncSession, project_id: uuid.UUID, params: CursorParams) -> CursorPage:
+    """Задачи проекта, новые сверху (idx_issues_project_created)"""
+    stmt = select(Issue).where(Issue.project_id == project_id)
+    return await paginate_keyset(session, stmt, (Issue.created_at, Issue.id), params)
+
+
+async def list_issue_comments(session: AsyncSession, issue_id: uuid.UUID, params: CursorParams) -> CursorPage:
+    """Комментарии задачи в хронологическом порядке (idx_comments_issue_created)"""
+    stmt = select(Comment).where(Comment.issue_id == issue_id)
+    return await paginate_keyset(session, stmt, (Comment.created_at, Comment.id), params, descending=False)
+
+
+async def list_project_activities(session: AsyncSession, project_id: uuid.UUID, params: CursorParams) -> CursorPage:
+    """Лента активности проекта (idx_activities_project_created)"""
+    stmt = select(Activity).where(Activity.project_id == project_id)
+    return await paginate_keyset(session, stmt, (Activity.created_at, Activity.id), params)
+
+
+async def list_user_notifications(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    params: CursorParams,
+    status: Optional[NotificationStatus] = None,
+) -> CursorPage:
+    """Уведомления пользователя (idx_notifications_user_status)"""
+    stmt = select(Notification).where(Notification.user_id == user_id)
+    if status is not None:
+        stmt = stmt.where(Notification.status == status)
+    return await paginate_keyset(session, stmt, (Notification.created_at, Notification.id), params)
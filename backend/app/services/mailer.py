@@ -0,0 +1,129 @@
+# backend/app/services/mailer.py
+import asyncio
+import smtplib
+import time
+from collections import OrderedDict, defaultdict
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.notifications import EmailItem
+
+
+class SMTPMailer:
+    """
+    Отправка писем через одно переиспользуемое SMTP-соединение.
+
+    smtplib блокирующий, поэтому отправка идет в отдельном потоке; lock
+    сериализует доступ к соединению. Соединение проверяется NOOP и
+    переоткрывается при обрыве.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None):
+        self.host = host or settings.SMTP_HOST
+        self.port = port or settings.SMTP_PORT
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._lock = asyncio.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if settings.SMTP_USE_TLS:
+            smtp.starttls()
+        if settings.SMTP_USER:
+            smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+        return smtp
+
+    def _alive(self) -> bool:
+        if self._smtp is None:
+            return False
+        try:
+            return self._smtp.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+
+    def _send_many(self, messages: List[EmailMessage]) -> None:
+        if not self._alive():
+            self._smtp = self._connect()
+        for message in messages:
+            try:
+                self._smtp.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = self._connect()
+                self._smtp.send_message(message)
+
+    async def send_many(self, messages: List[EmailMessage]) -> None:
+        if not messages:
+            return
+        async with self._lock:
+            await asyncio.to_thread(self._send_many, messages)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._smtp is not None:
+                try:
+                    await asyncio.to_thread(self._smtp.quit)
+                except smtplib.SMTPException:
+                    pass
+                self._smtp = None
+
+
+class DigestBuffer:
+    """
+    Накопление писем по адресату в течение окна и отправка одним дайджестом.
+
+    Серия из 20 status_changed по одной задаче превращается в одну строку
+    "PRJ-1 status changed (x20)" в одном письме.
+    """
+
+    def __init__(self, mailer, window_seconds: Optional[int] = None):
+        self.mailer = mailer
+        self.window = window_seconds if window_seconds is not None else settings.NOTIFICATION_DIGEST_WINDOW_SECONDS
+        self._pending: Dict[str, "OrderedDict[tuple, EmailItem]"] = defaultdict(OrderedDict)
+        self._first_seen: Dict[str, float] = {}
+
+    def add(self, items: List[EmailItem]) -> None:
+        now = time.monotonic()
+        for item in items:
+            pending = self._pending[item.email]
+            self._first_seen.setdefault(item.email, now)
+            key = (item.issue_id, item.type)
+            if key in pending:
+                pending[key].count += item.count
+            else:
+                pending[key] = item
+
+    def _due(self, force: bool) -> List[str]:
+        deadline = time.monotonic() - self.window
+        return [email for email, first in self._first_seen.items() if force or first <= deadline]
+
+    @staticmethod
+    def compose(email: str, items: List[EmailItem]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = settings.EMAIL_FROM
+        message["To"] = email
+        if len(items) == 1:
+            message["Subject"] = f"[{settings.APP_NAME}] {items[0].title}"
+        else:
+            message["Subject"] = f"[{settings.APP_NAME}] {len(items)} updates"
+        lines = []
+        for item in items:
+            suffix = f" (x{item.count})" if item.count > 1 else ""
+            lines.append(f"- {item.title}{suffix}: {item.issue_title}")
+        message.set_content("\n".join(lines))
+        return message
+
+    async def flush(self, force: bool = False) -> int:
+        due = self._due(force)
+        messages = []
+        for email in due:
+            items = list(self._pending.pop(email).values())
+            self._first_seen.pop(email, None)
+            messages.append(self.compose(email, items))
+        if messages:
+            try:
+                await self.mailer.send_many(messages)
+            except Exception:
+                logger.exception(f"Failed to send {len(messages)} digest emails")
+        return len(messages)
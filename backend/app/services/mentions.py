@@ -0,0 +1,160 @@
+# backend/app/services/mentions.py
+"""
+Упоминания @username в задачах и комментариях.
+
+Имена извлекаются из того же разбора Markdown, что строит HTML, разрешаются
+в id одним запросом на пачку (с кэшем процесса), отфильтровываются по
+участникам проекта и уходят в очередь одним событием на задачу или комментарий.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.broker import publish_issue_event
+from app.core.markdown import extract_mentions
+from app.models.project import ProjectMember
+from app.models.user import User
+from app.schemas.notification import IssueEvent, NotificationType
+
+MAX_MENTIONS = 50  # защита от рассылки по всему проекту одним комментарием
+USERNAME_CHANGES = "username_changes"  # session.info: переименованные, удаленные и отключенные имена
+
+
+class UsernameCache:
+    """
+    username -> id (None - такого пользователя нет).
+
+    Имена пользователей меняются редко; отрицательные ответы живут меньше,
+    чтобы только что зарегистрированного пользователя можно было упомянуть.
+    """
+
+    def __init__(self, ttl: float = 600.0, negative_ttl: float = 60.0, max_size: int = 50000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Optional[uuid.UUID], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, username: str, user_id: Optional[uuid.UUID]) -> None:
+        ttl = self.ttl if user_id is not None else self.negative_ttl
+        with self._lock:
+            self._entries[username] = (user_id, time.monotonic() + ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def resolve(self, session: AsyncSession, usernames: Iterable[str]) -> Dict[str, uuid.UUID]:
+        result, missing = {}, set()
+        now = time.monotonic()
+        for username in set(usernames):
+            entry = self._entries.get(username)
+            if entry is None or entry[1] < now:
+                missing.add(username)
+            elif entry[0] is not None:
+                result[username] = entry[0]
+        if missing:
+            # usernames хранятся в нижнем регистре - запрос идет по индексу users.username
+            rows = dict((await session.execute(
+                select(User.username, User.id).where(User.username.in_(missing), User.is_active.is_(True))
+            )).all())
+            for username in missing:
+                self._put(username, rows.get(username))
+            result.update(rows)
+        return result
+
+    def invalidate(self, username: str) -> None:
+        with self._lock:
+            self._entries.pop(username.lower(), None)
+
+
+username_cache = UsernameCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_usernames(session: Session) -> None:
+    # Имена отмечают события User (app/models/user.py)
+    for username in session.info.pop(USERNAME_CHANGES, ()):
+        username_cache.invalidate(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_username_changes(session: Session) -> None:
+    session.info.pop(USERNAME_CHANGES, None)
+
+
+@dataclass
+class MentionSource:
+    """Текст с упоминаниями: описание задачи (comment_id=None) или комментарий"""
+    project_id: uuid.UUID
+    issue_id: uuid.UUID
+    actor_id: uuid.UUID
+    text: Optional[str]
+    comment_id: Optional[uuid.UUID] = None
+    previous_text: Optional[str] = None  # при редактировании уведомляются только новые упоминания
+
+
+async def mention_events(session: AsyncSession, sources: List[MentionSource]) -> List[IssueEvent]:
+    """
+    События ISSUE_MENTIONED для пачки текстов.
+
+    Независимо от числа текстов и упоминаний - один запрос к users (только
+    промахи кэша) и один к project_members. Тексты одного объекта (задачи
+    или комментария) дают одно событие с объединенными адресатами.
+    """
+    wanted: List[Tuple[MentionSource, List[str]]] = []
+    for source in sources:
+        names = extract_mentions(source.text)
+        if source.previous_text:
+            old = set(extract_mentions(source.previous_text))
+            names = [n for n in names if n not in old]
+        if names:
+            wanted.append((source, names[:MAX_MENTIONS]))
+    if not wanted:
+        return []
+
+    ids = await username_cache.resolve(session, {n for _, names in wanted for n in names})
+    pairs = {(s.project_id, ids[n]) for s, names in wanted for n in names if n in ids}
+    members: Set[Tuple[uuid.UUID, uuid.UUID]] = set()
+    if pairs:
+        members = set((await session.execute(
+            select(ProjectMember.project_id, ProjectMember.user_id)
+            .where(tuple_(ProjectMember.project_id, ProjectMember.user_id).in_(pairs))
+        )).all())
+
+    grouped: "OrderedDict[tuple, Dict[uuid.UUID, None]]" = OrderedDict()
+    for source, names in wanted:
+        recipients = grouped.setdefault((source.project_id, source.issue_id, source.comment_id, source.actor_id), {})
+        for n in names:
+            if n in ids and (source.project_id, ids[n]) in members and ids[n] != source.actor_id:
+                recipients[ids[n]] = None  # dict - порядок упоминаний без повторов
+
+    now = datetime.now(timezone.utc)
+    return [
+        IssueEvent(
+            type=NotificationType.ISSUE_MENTIONED,
+            issue_id=issue_id,
+            project_id=project_id,
+            actor_id=actor_id,
+            comment_id=comment_id,
+            recipients=list(recipients),
+            occurred_at=now,
+        )
+        for (project_id, issue_id, comment_id, actor_id), recipients in grouped.items()
+        if recipients
+    ]
+
+
+async def notify_mentions(session: AsyncSession, sources: List[MentionSource]) -> int:
+    """Разрешить упоминания и поставить уведомления в очередь (вызывается после commit)"""
+    events = await mention_events(session, sources)
+    await asyncio.gather(*(publish_issue_event(event) for event in events))
+    return sum(len(e.recipients) for e in events)
@@ -0,0 +1,362 @@
+# backend/app/services/notifications.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import func, insert, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.comment import Comment
+from app.models.issue import Issue
+from app.models.notification import (
+    Notification, NotificationCounter, NotificationSetting, NotificationStatus, NotificationType,
+)
+from app.models.user import User
+from app.schemas.notification import IssueEvent
+from app.services.realtime import publish_user_events
+
+INSERT_CHUNK = 1000  # ~12 параметров на строку, лимит протокола - 32767
+# Повторяющиеся события по одной задаче сворачиваются в одно уведомление
+COALESCED_TYPES = {NotificationType.STATUS_CHANGED, NotificationType.COMMENT_ADDED}
+DEFAULT_TYPE_SETTINGS = NotificationSetting.__table__.c.settings.default.arg
+
+EVENT_TITLES = {
+    NotificationType.ISSUE_ASSIGNED: "{key} assigned to you",
+    NotificationType.ISSUE_MENTIONED: "You were mentioned in {key}",
+    NotificationType.COMMENT_ADDED: "New comment in {key}",
+    NotificationType.STATUS_CHANGED: "{key} status changed",
+    NotificationType.DUE_DATE_APPROACHING: "{key} is due soon",
+    NotificationType.PROJECT_INVITATION: "Project invitation",
+    NotificationType.ISSUE_CREATED: "{key} created",
+}
+
+
+@dataclass(frozen=True)
+class Preferences:
+    email_enabled: bool = True
+    push_enabled: bool = True
+    in_app_enabled: bool = True
+    per_type: Mapping[str, Mapping[str, bool]] = field(default_factory=lambda: DEFAULT_TYPE_SETTINGS)
+
+    def allows(self, notification_type: NotificationType, channel: str) -> bool:
+        if not getattr(self, f"{channel}_enabled"):
+            return False
+        return self.per_type.get(notification_type.value, {}).get(channel, True)
+
+    @classmethod
+    def from_setting(cls, setting: NotificationSetting) -> "Preferences":
+        return cls(
+            email_enabled=setting.email_enabled is not False,
+            push_enabled=setting.push_enabled is not False,
+            in_app_enabled=setting.in_app_enabled is not False,
+            per_type=setting.settings or DEFAULT_TYPE_SETTINGS,
+        )
+
+
+class PreferenceCache:
+    """
+    Кэш эффективных настроек уведомлений (user_id, project_id) -> Preferences.
+
+    Недостающие пары загружаются одним запросом на пачку событий;
+    настройки проекта перекрывают глобальные (project_id IS NULL).
+    """
+
+    def __init__(self, ttl: float = 300.0, max_size: int = 50000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[uuid.UUID, uuid.UUID], Tuple[Preferences, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key) -> Optional[Preferences]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def _put(self, key, preferences: Preferences) -> None:
+        with self._lock:
+            self._entries[key] = (preferences, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def get_many(
+        self, session: AsyncSession, pairs: Iterable[Tuple[uuid.UUID, uuid.UUID]]
+    ) -> Dict[Tuple[uuid.UUID, uuid.UUID], Preferences]:
+        result, missing = {}, set()
+        for pair in set(pairs):
+            preferences = self._get(pair)
+            if preferences is None:
+                missing.add(pair)
+            else:
+                result[pair] = preferences
+        if not missing:
+            return result
+
+        user_ids = {u for u, _ in missing}
+        project_ids = {p for _, p in missing}
+        rows = (await session.execute(
+            select(NotificationSetting).where(
+                NotificationSetting.user_id.in_(user_ids),
+                or_(NotificationSetting.project_id.is_(None), NotificationSetting.project_id.in_(project_ids)),
+            )
+        )).scalars().all()
+        global_settings = {s.user_id: s for s in rows if s.project_id is None}
+        project_settings = {(s.user_id, s.project_id): s for s in rows if s.project_id is not None}
+
+        for pair in missing:
+            setting = project_settings.get(pair) or global_settings.get(pair[0])
+            preferences = Preferences.from_setting(setting) if setting else Preferences()
+            self._put(pair, preferences)
+            result[pair] = preferences
+        return result
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+
+
+preference_cache = PreferenceCache()
+
+
+@dataclass
+class EmailItem:
+    """Письмо-кандидат для дайджеста"""
+    user_id: uuid.UUID
+    email: str
+    issue_id: uuid.UUID
+    issue_key: str
+    issue_title: str
+    type: NotificationType
+    title: str
+    count: int = 1
+
+
+def _recipients(event: IssueEvent, issue) -> Set[uuid.UUID]:
+    notification_type = NotificationType(event.type.value)
+    recipients = set(event.recipients)
+    if notification_type == NotificationType.ISSUE_ASSIGNED:
+        if issue.assignee_id:
+            recipients.add(issue.assignee_id)
+    elif notification_type != NotificationType.ISSUE_MENTIONED:
+        recipients.add(issue.reporter_id)
+        if issue.assignee_id:
+            recipients.add(issue.assignee_id)
+    recipients.discard(event.actor_id)
+    return recipients
+
+
+def _coalesce(events: List[IssueEvent], issues) -> "OrderedDict[tuple, Tuple[IssueEvent, int]]":
+    """(user, issue, type) -> (последнее событие, количество) для сворачиваемых типов"""
+    groups: "OrderedDict[tuple, Tuple[IssueEvent, int]]" = OrderedDict()
+    for index, event in enumerate(sorted(events, key=lambda e: e.occurred_at)):
+        issue = issues.get(event.issue_id)
+        if issue is None:
+            continue  # задача удалена, пока событие было в очереди
+        notification_type = NotificationType(event.type.value)
+        for user_id in _recipients(event, issue):
+            if notification_type in COALESCED_TYPES:
+                key = (user_id, event.issue_id, notification_type)
+            else:
+                key = (user_id, event.issue_id, notification_type, index)
+            _, count = groups.pop(key, (None, 0))
+            groups[key] = (event, count + 1)
+    return groups
+
+
+async def process_events(session: AsyncSession, events: List[IssueEvent]) -> List[EmailItem]:
+    """
+    Обработать пачку событий: адресаты, настройки, уведомления in-app.
+
+    Задачи, настройки и адреса загружаются по одному запросу на пачку,
+    уведомления вставляются многострочным INSERT. Возвращает письма для дайджеста.
+    """
+    if not events:
+        return []
+    issues = {
+        row.id: row
+        for row in await session.execute(
+            select(Issue.id, Issue.project_id, Issue.key, Issue.title, Issue.reporter_id, Issue.assignee_id)
+            .where(Issue.id.in_({e.issue_id for e in events}))
+        )
+    }
+    comment_ids = {e.comment_id for e in events if e.comment_id}
+    if comment_ids:
+        # комментарий удален, пока событие было в очереди - иначе FK-ошибка на всю пачку
+        existing = set((await session.execute(select(Comment.id).where(Comment.id.in_(comment_ids)))).scalars())
+        events = [e for e in events if e.comment_id is None or e.comment_id in existing]
+    groups = _coalesce(events, issues)
+    if not groups:
+        return []
+
+    preferences = await preference_cache.get_many(
+        session, {(key[0], event.project_id) for key, (event, _) in groups.items()}
+    )
+
+    rows, emails = [], []
+    for key, (event, count) in groups.items():
+        user_id, notification_type = key[0], key[2]
+        issue = issues[event.issue_id]
+        prefs = preferences[(user_id, event.project_id)]
+        title = EVENT_TITLES[notification_type].format(key=issue.key)
+        if prefs.allows(notification_type, "in_app"):
+            rows.append({
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "type": notification_type,
+                "issue_id": event.issue_id,
+                "comment_id": event.comment_id,
+                "project_id": event.project_id,
+                "title": title,
+                "message": issue.title,
+                "data": {**event.data, "count": count} if count > 1 else event.data,
+                "sender_id": event.actor_id,
+                "created_at": event.occurred_at,
+            })
+        if prefs.allows(notification_type, "email"):
+            emails.append(EmailItem(user_id, "", event.issue_id, issue.key, issue.title, notification_type, title, count))
+
+    for start in range(0, len(rows), INSERT_CHUNK):
+        await session.execute(insert(Notification).values(rows[start:start + INSERT_CHUNK]))
+
+    if emails:
+        addresses = dict((await session.execute(
+            select(User.id, User.email).where(User.id.in_({e.user_id for e in emails}), User.is_active.is_(True))
+        )).all())
+        emails = [e for e in emails if e.user_id in addresses]
+        for item in emails:
+            item.email = addresses[item.user_id]
+
+    await session.commit()
+    await _push_unread({row["user_id"] for row in rows}, session)
+    return emails
+
+
+async def _push_unread(user_ids: Set[uuid.UUID], session: AsyncSession) -> None:
+    """Отправить открытым вкладкам новые значения бейджа (best effort, после commit)"""
+    if not user_ids:
+        return
+    try:
+        counts = await unread_counts(session, user_ids)
+        await publish_user_events(
+            (user_id, "notifications", {"unread": unread}) for user_id, unread in counts.items()
+        )
+    except Exception:
+        logger.exception(f"Failed to push unread counts to {len(user_ids)} users")
+
+
+async def unread_count(session: AsyncSession, user_id: uuid.UUID) -> int:
+    """Счетчик для бейджа - чтение одной строки по первичному ключу"""
+    value = await session.scalar(select(NotificationCounter.unread).where(NotificationCounter.user_id == user_id))
+    return value or 0
+
+
+async def unread_counts(session: AsyncSession, user_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, int]:
+    user_ids = set(user_ids)
+    counts = dict.fromkeys(user_ids, 0)
+    if user_ids:
+        rows = await session.execute(
+            select(NotificationCounter.user_id, NotificationCounter.unread)
+            .where(NotificationCounter.user_id.in_(user_ids))
+        )
+        counts.update(rows.all())
+    return counts
+
+
+async def set_status(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    status: NotificationStatus,
+    ids: Optional[Iterable[uuid.UUID]] = None,
+    before: Optional[datetime] = None,
+) -> int:
+    """
+    Массово перевести уведомления пользователя в status одним UPDATE.
+
+    ids - конкретные уведомления, before - все созданные раньше указанного
+    момента; без обоих условий меняются все уведомления пользователя.
+    Строки, уже находящиеся в нужном статусе, не трогаются. Счетчик
+    непрочитанных обновляется триггером один раз на оператор.
+    Возвращает количество измененных уведомлений.
+    """
+    stmt = update(Notification).where(
+        Notification.user_id == user_id,
+        Notification.status.is_distinct_from(status),
+    )
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return 0
+        stmt = stmt.where(Notification.id.in_(ids))
+    if before is not None:
+        stmt = stmt.where(Notification.created_at < before)
+
+    values = {"status": status}
+    if status == NotificationStatus.UNREAD:
+        values["read_at"] = None
+    else:
+        # архивация непрочитанного тоже считается прочтением
+        values["read_at"] = func.coalesce(Notification.read_at, datetime.now(timezone.utc))
+    result = await session.execute(stmt.values(**values).execution_options(synchronize_session=False))
+    await session.commit()
+    if result.rowcount:
+        await _push_unread({user_id}, session)
+    return result.rowcount
+
+
+async def mark_all_read(session: AsyncSession, user_id: uuid.UUID, before: Optional[datetime] = None) -> int:
+    """Прочитать все уведомления; архивные остаются архивными"""
+    stmt = (
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.status == NotificationStatus.UNREAD)
+        .values(status=NotificationStatus.READ, read_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    if before is not None:
+        stmt = stmt.where(Notification.created_at < before)
+    result = await session.execute(stmt)
+    await session.commit()
+    if result.rowcount:
+        await _push_unread({user_id}, session)
+    return result.rowcount
+
+
+async def archive_older_than(session: AsyncSession, user_id: uuid.UUID, cutoff: datetime) -> int:
+    return await set_status(session, user_id, NotificationStatus.ARCHIVED, before=cutoff)
+
+
+async def reconcile_unread_counts(session: AsyncSession) -> int:
+    """
+    Пересчитать счетчики непрочитанных по фактическим данным.
+
+    Триггеры пишущих транзакций ждут блокировку notification_counters,
+    поэтому параллельные изменения не теряются. Возвращает число исправленных строк.
+    """
+    await session.execute(text("LOCK TABLE notification_counters IN SHARE ROW EXCLUSIVE MODE"))
+    expected = dict((await session.execute(
+        select(Notification.user_id, func.count())
+        .where(Notification.status == NotificationStatus.UNREAD)
+        .group_by(Notification.user_id)
+    )).all())
+    actual = dict((await session.execute(select(NotificationCounter.user_id, NotificationCounter.unread))).all())
+
+    fixes = [
+        {"user_id": user_id, "unread": expected.get(user_id, 0)}
+        for user_id in expected.keys() | actual.keys()
+        if expected.get(user_id, 0) != actual.get(user_id, 0)
+    ]
+    if fixes:
+        stmt = pg_insert(NotificationCounter).values(fixes)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[NotificationCounter.user_id],
+            set_={"unread": stmt.excluded.unread},
+        ))
+    await session.commit()
+    return len(fixes)
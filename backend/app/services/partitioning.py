@@ -0,0 +1,91 @@
+# backend/app/services/partitioning.py
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import AddConstraint
+
+from app.core.config import settings
+from app.core.database import TABLE_TRIGGERS, Base
+from app.core.partitioning import create_project_partition
+from app.models import project, report  # noqa: F401 - регистрируют триггеры на issues
+from app.models.issue import Issue
+
+# Таблицы, получившие project_id для составного внешнего ключа на issues
+CHILD_PROJECT_COLUMNS = {
+    "comments": [("project_id", "issue_id")],
+    "issue_history": [("project_id", "issue_id")],
+    "issue_tags": [("project_id", "issue_id")],
+    "issue_links": [("source_project_id", "source_issue_id"), ("target_project_id", "target_issue_id")],
+}
+
+
+def _issue_columns(connection: Connection, table: str) -> list:
+    """Столбцы без GENERATED - их нельзя перечислять в INSERT"""
+    rows = connection.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = :table AND is_generated = 'NEVER' ORDER BY ordinal_position"
+    ), {"table": table})
+    return [r[0] for r in rows]
+
+
+def convert_issues_to_partitioned(connection: Connection, min_issues_for_own_partition: int = 0) -> None:
+    """
+    Однократный перевод существующей непартиционированной issues на партиции.
+
+    Выполняется в одной транзакции в окно обслуживания (берет эксклюзивные
+    блокировки на issues и дочерние таблицы):
+    1. снимает внешние ключи на issues и заполняет project_id в дочерних таблицах;
+    2. переименовывает старую таблицу и ее индексы;
+    3. создает партиционированную issues из метаданных модели (с партицией
+       по умолчанию или hash-партициями) и партиции проектов с числом задач
+       не меньше min_issues_for_own_partition (LIST);
+    4. переносит строки, восстанавливает составные внешние ключи и все
+       триггеры на issues (TABLE_TRIGGERS: счетчики, свертки, дневная статистика).
+    """
+    old_table = "issues_unpartitioned"
+
+    foreign_keys = connection.execute(text(
+        "SELECT conname, conrelid::regclass::text FROM pg_constraint "
+        "WHERE confrelid = 'issues'::regclass AND contype = 'f'"
+    )).all()
+    for name, table in foreign_keys:
+        connection.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"'))
+
+    for table, columns in CHILD_PROJECT_COLUMNS.items():
+        for project_column, issue_column in columns:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {project_column} uuid"))
+            connection.execute(text(
+                f"UPDATE {table} t SET {project_column} = i.project_id FROM issues i "
+                f"WHERE i.id = t.{issue_column} AND t.{project_column} IS NULL"
+            ))
+            connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {project_column} SET NOT NULL"))
+
+    connection.execute(text(f"ALTER TABLE issues RENAME TO {old_table}"))
+    indexes = connection.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+    ), {"table": old_table}).scalars().all()
+    for index in indexes:
+        connection.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_old"'))
+
+    Issue.__table__.create(connection, checkfirst=True)  # типы ENUM остались от старой таблицы
+
+    if settings.ISSUES_PARTITIONING == "list":
+        project_ids = connection.execute(text(
+            f"SELECT project_id FROM {old_table} GROUP BY project_id HAVING count(*) >= :n"
+        ), {"n": max(min_issues_for_own_partition, 1)}).scalars().all()
+        for project_id in project_ids:
+            create_project_partition(connection, project_id)
+        logger.info(f"Created {len(project_ids)} project partitions")
+
+    columns = ", ".join(_issue_columns(connection, old_table))
+    moved = connection.execute(text(f"INSERT INTO issues ({columns}) SELECT {columns} FROM {old_table}")).rowcount
+    logger.info(f"Moved {moved} issues into partitioned table")
+
+    for table in Base.metadata.sorted_tables:
+        for constraint in table.foreign_key_constraints:
+            if constraint.referred_table is Issue.__table__:
+                connection.execute(AddConstraint(constraint))
+
+    connection.execute(text(f"DROP TABLE {old_table}"))
+    for statement in TABLE_TRIGGERS["issues"]:
+        connection.execute(text(statement))
@@ -0,0 +1,175 @@
+# backend/app/services/permissions.py
+"""
+Проверка прав по скомпилированным маскам (app/core/permissions.py).
+
+Порядок поиска маски: кэш процесса -> Redis (один HMGET на пользователя) ->
+БД (один запрос на все недостающие проекты). Пакетная проверка для списков
+(can_edit/can_delete комментариев) не делает запросов на каждый элемент.
+"""
+import asyncio
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from redis.exceptions import WatchError
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.permissions import (
+    GENERATION_KEY, INVALIDATION_CHANNEL, Permission, allows, compile_permissions, parse_invalidation,
+    permission_cache, project_key, user_key,
+)
+from app.core.redis import get_redis
+from app.models.project import Project, ProjectMember
+from app.models.user import User
+
+REDIS_TTL = 600  # секунд; страховка на случай потерянного сброса
+
+_listener: Optional[asyncio.Task] = None
+
+
+async def _listen_invalidations() -> None:
+    """Сброс кэша процесса по сообщениям других процессов"""
+    while True:
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    permission_cache.invalidate(*parse_invalidation(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # пока подписки нет, сообщения теряются - кэш процесса сбрасывается целиком
+            permission_cache.clear()
+            logger.exception("Permission invalidation subscription lost, reconnecting")
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen_invalidations())
+
+
+async def _compile_from_db(
+    session: AsyncSession, user_id: uuid.UUID, project_ids: List[uuid.UUID]
+) -> Dict[uuid.UUID, int]:
+    user_role = select(User.role).where(User.id == user_id).scalar_subquery()
+    rows = await session.execute(
+        select(
+            Project.id, Project.owner_id, Project.is_public, user_role.label("user_role"),
+            ProjectMember.id.label("member_id"), ProjectMember.role, ProjectMember.permissions,
+        )
+        .outerjoin(ProjectMember, and_(ProjectMember.project_id == Project.id, ProjectMember.user_id == user_id))
+        .where(Project.id.in_(project_ids))
+    )
+    masks = dict.fromkeys(project_ids, 0)  # несуществующий проект - нет прав
+    for row in rows.all():
+        masks[row.id] = compile_permissions(
+            row.user_role.name if row.user_role is not None else None,
+            row.role.name if row.role is not None else None,
+            row.permissions,
+            is_member=row.member_id is not None,
+            is_owner=row.owner_id == user_id,
+            is_public=bool(row.is_public),
+        )
+    return masks
+
+
+async def get_masks(session: AsyncSession, user_id: uuid.UUID, project_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, int]:
+    """Маски прав пользователя в нескольких проектах"""
+    _ensure_listener()
+    masks: Dict[uuid.UUID, int] = {}
+    missing = []
+    for project_id in set(project_ids):
+        mask = permission_cache.get(user_id, project_id)
+        if mask is None:
+            missing.append(project_id)
+        else:
+            masks[project_id] = mask
+    if not missing:
+        return masks
+
+    redis = get_redis()
+    try:
+        pipe = redis.pipeline(transaction=False)
+        pipe.get(GENERATION_KEY)
+        pipe.hmget(user_key(user_id), [str(p) for p in missing])
+        generation, cached = await pipe.execute()
+    except Exception:
+        logger.exception("Permission cache unavailable, compiling from database")
+        generation, cached, redis = None, [None] * len(missing), None
+    to_compile = []
+    for project_id, value in zip(missing, cached):
+        if value is None:
+            to_compile.append(project_id)
+        else:
+            masks[project_id] = permission_cache.put(user_id, project_id, int(value))
+    if not to_compile:
+        return masks
+
+    compiled = await _compile_from_db(session, user_id, to_compile)
+    for project_id, mask in compiled.items():
+        masks[project_id] = permission_cache.put(user_id, project_id, mask)
+    if redis is not None:
+        await _store(redis, user_id, compiled, generation)
+    return masks
+
+
+async def _store(redis, user_id: uuid.UUID, compiled: Dict[uuid.UUID, int], generation: Optional[str]) -> None:
+    """Записать маски, только если с момента чтения не было сброса (иначе они могли устареть)"""
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            await pipe.watch(GENERATION_KEY)
+            if await pipe.get(GENERATION_KEY) != generation:
+                return
+            pipe.multi()
+            pipe.hset(user_key(user_id), mapping={str(p): m for p, m in compiled.items()})
+            pipe.expire(user_key(user_id), REDIS_TTL)
+            for project_id in compiled:
+                pipe.sadd(project_key(project_id), str(user_id))
+                pipe.expire(project_key(project_id), REDIS_TTL)
+            await pipe.execute()
+    except WatchError:
+        pass  # сброс пришел во время записи - маски остаются только в кэше процесса
+
+
+async def get_mask(session: AsyncSession, user_id: uuid.UUID, project_id: uuid.UUID) -> int:
+    return (await get_masks(session, user_id, [project_id]))[project_id]
+
+
+async def has_permission(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    project_id: uuid.UUID,
+    permission: Permission,
+    owner_id: Optional[uuid.UUID] = None,
+) -> bool:
+    """owner_id - автор объекта: свои задачи и комментарии правятся с правом создания"""
+    return allows(await get_mask(session, user_id, project_id), permission, own=owner_id == user_id)
+
+
+async def check_many(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    items: Sequence[Tuple[uuid.UUID, Optional[uuid.UUID]]],
+    permission: Permission,
+) -> List[bool]:
+    """Пакетная проверка: items - (project_id, owner_id); результат в том же порядке"""
+    masks = await get_masks(session, user_id, {project_id for project_id, _ in items})
+    return [allows(masks[project_id], permission, own=owner_id == user_id) for project_id, owner_id in items]
+
+
+async def comment_flags(session: AsyncSession, user_id: uuid.UUID, comments: Sequence) -> List[Dict[str, bool]]:
+    """can_edit/can_delete для списка комментариев (схема Comment) без запросов на элемент"""
+    masks = await get_masks(session, user_id, {c.project_id for c in comments})
+    return [
+        {
+            "can_edit": allows(masks[c.project_id], Permission.EDIT, own=c.author_id == user_id),
+            "can_delete": allows(masks[c.project_id], Permission.DELETE, own=c.author_id == user_id),
+        }
+        for c in comments
+    ]
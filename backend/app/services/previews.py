@@ -0,0 +1,200 @@
+# backend/app/services/previews.py
+"""
+Превью изображений.
+
+Декодирование и масштабирование (CPU) выполняются в пуле процессов, чтобы
+не блокировать event loop и обойти GIL. Все размеры строятся из одного
+декодирования: JPEG открывается в draft-режиме сразу с уменьшением в 2-8 раз,
+дальше reduce() (целочисленное сжатие) и финальный thumbnail с LANCZOS.
+"""
+import asyncio
+import io
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.storage import get_s3, iter_object, s3_call
+from app.models.attachment import Attachment, FileType, ImagePreview
+
+PREVIEW_FORMAT = "JPEG"
+LOCK_TTL = 60  # секунд; больше времени генерации одного изображения
+LOCK_POLL = 0.2
+MAX_PIXELS = 80_000_000  # защита от "декомпрессионных бомб"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_inflight: Dict[Tuple[uuid.UUID, int], asyncio.Future] = {}
+
+
+def _render(data: bytes, boxes: Sequence[int], quality: int) -> List[Tuple[int, int, int, bytes]]:
+    """Выполняется в дочернем процессе: (box, width, height, jpeg) для каждого размера"""
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    image = Image.open(io.BytesIO(data))
+    largest = max(boxes)
+    if image.format == "JPEG":
+        image.draft("RGB", (largest, largest))  # DCT-масштабирование при декодировании
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+
+    results = []
+    for box in sorted(boxes, reverse=True):
+        factor = min(image.width, image.height) // (box * 2)
+        if factor >= 2:
+            image = image.reduce(factor)  # каждый следующий размер строится из предыдущего
+        variant = image.copy()
+        variant.thumbnail((box, box), Image.LANCZOS)
+        buffer = io.BytesIO()
+        variant.save(buffer, PREVIEW_FORMAT, quality=quality, optimize=True, progressive=True)
+        results.append((box, variant.width, variant.height, buffer.getvalue()))
+    return results
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PREVIEW_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def preview_path(attachment: Attachment, box: int) -> str:
+    return f"previews/{attachment.id}/{box}.jpg"
+
+
+def _box_of(preview: ImagePreview) -> int:
+    return int(preview.storage_path.rsplit("/", 1)[1].split(".")[0])
+
+
+async def _download(attachment: Attachment) -> bytes:
+    chunks = [chunk async for chunk in iter_object(attachment.storage_bucket, attachment.storage_path)]
+    return b"".join(chunks)
+
+
+async def generate_previews(
+    session: AsyncSession, attachment: Attachment, boxes: Optional[Iterable[int]] = None
+) -> List[ImagePreview]:
+    """Построить недостающие размеры, сохранить в MinIO и записать ImagePreview"""
+    if attachment.file_type != FileType.IMAGE:
+        return []
+    existing = (await session.execute(
+        select(ImagePreview).where(ImagePreview.attachment_id == attachment.id)
+    )).scalars().all()
+    have = {_box_of(p) for p in existing}
+    missing = sorted(set(boxes or settings.IMAGE_PREVIEW_SIZES) - have)
+    if not missing:
+        return list(existing)
+
+    data = await _download(attachment)
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(
+        get_executor(), _render, data, missing, settings.IMAGE_PREVIEW_QUALITY
+    )
+    del data
+
+    rows = []
+    for box, width, height, jpeg in rendered:
+        path = preview_path(attachment, box)
+        await s3_call(
+            "put_object", Bucket=attachment.storage_bucket, Key=path, Body=jpeg,
+            ContentType="image/jpeg", CacheControl="public, max-age=31536000, immutable",
+        )
+        rows.append({"id": uuid.uuid4(), "attachment_id": attachment.id, "width": width, "height": height, "storage_path": path})
+    # фоновый воркер и ленивая генерация могут построить один вариант одновременно - объект в S3 тот же
+    await session.execute(insert(ImagePreview).values(rows).on_conflict_do_nothing(index_elements=["storage_path"]))
+    await session.commit()
+    return list((await session.execute(
+        select(ImagePreview).where(ImagePreview.attachment_id == attachment.id)
+    )).scalars().all())
+
+
+async def _single_flight(session: AsyncSession, attachment: Attachment, box: int) -> Optional[ImagePreview]:
+    """
+    Сгенерировать вариант ровно один раз на кластер.
+
+    Внутри процесса параллельные запросы ждут один Future, между процессами
+    генерацию сериализует Redis-lock (SET NX); ожидающие перечитывают БД.
+    """
+    redis = get_redis()
+    lock_key = f"lock:preview:{attachment.id}:{box}"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LOCK_TTL
+    while loop.time() < deadline:
+        if await redis.set(lock_key, "1", nx=True, ex=LOCK_TTL):
+            try:
+                previews = await generate_previews(session, attachment, [box])
+            finally:
+                await redis.delete(lock_key)
+            return next((p for p in previews if _box_of(p) == box), None)
+        await asyncio.sleep(LOCK_POLL)
+        preview = await session.scalar(
+            select(ImagePreview).where(ImagePreview.storage_path == preview_path(attachment, box))
+        )
+        if preview is not None:
+            return preview
+    logger.warning(f"Timed out waiting for preview {attachment.id}/{box}")
+    return None
+
+
+async def get_preview(session: AsyncSession, attachment: Attachment, box: int) -> Optional[ImagePreview]:
+    """Вариант заданного размера; отсутствующий создается при первом запросе"""
+    if box not in settings.IMAGE_PREVIEW_SIZES:
+        raise ValueError(f'Unsupported preview size: {box}')
+    preview = await session.scalar(
+        select(ImagePreview).where(ImagePreview.storage_path == preview_path(attachment, box))
+    )
+    if preview is not None or attachment.file_type != FileType.IMAGE:
+        return preview
+
+    key = (attachment.id, box)
+    future = _inflight.get(key)
+    if future is not None:
+        preview_id = await asyncio.shield(future)
+        return await session.get(ImagePreview, preview_id) if preview_id else None
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        preview = await _single_flight(session, attachment, box)
+        future.set_result(preview.id if preview else None)
+        return preview
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # не логировать "exception was never retrieved", если ждущих нет
+        raise
+    finally:
+        if not future.done():
+            future.cancel()
+        _inflight.pop(key, None)
+
+
+def presigned_url(bucket: str, key: str, expires: int = 3600) -> str:
+    return get_s3().generate_presigned_url("get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires)
+
+
+def preview_urls(attachment: Attachment, previews: Iterable[ImagePreview]) -> Dict[str, Optional[str]]:
+    """thumbnail_url/preview_url для схемы Attachment: наименьший и наибольший варианты"""
+    previews = sorted(previews, key=_box_of)
+    if not previews:
+        return {"thumbnail_url": None, "preview_url": None}
+    return {
+        "thumbnail_url": presigned_url(attachment.storage_bucket, previews[0].storage_path),
+        "preview_url": presigned_url(attachment.storage_bucket, previews[-1].storage_path),
+    }
@@ -0,0 +1,301 @@
+# backend/app/services/realtime.py
+"""
+Push-канал: события задач, комментариев и уведомлений по WebSocket/SSE.
+
+Любой процесс публикует событие в Redis pub/sub (publish_*), каждый
+веб-воркер держит одну подписку на rt:* и раздает полученные сообщения
+своим соединениям. Сообщение пересылается как есть (готовая JSON-строка),
+поэтому сериализация выполняется один раз на событие, а не на соединение.
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Set
+
+import redis.asyncio as aioredis
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models.project import ProjectMember
+
+CHANNEL_PREFIX = "rt:"
+MEMBERSHIP_CHANGED = "membership_changed"  # служебное событие: перечитать проекты соединения
+MEMBERSHIP_CHANGES = "membership_changes"  # session.info: пользователи, чей состав проектов изменился
+
+
+def project_channel(project_id) -> str:
+    return f"{CHANNEL_PREFIX}project:{project_id}"
+
+
+def user_channel(user_id) -> str:
+    return f"{CHANNEL_PREFIX}user:{user_id}"
+
+
+def event_message(event_type: str, data: Dict[str, Any], project_id=None) -> str:
+    return json.dumps({
+        "type": event_type,
+        "project_id": str(project_id) if project_id else None,
+        "data": data,
+        "ts": datetime.now(timezone.utc).isoformat(),
+    }, default=str)
+
+
+async def publish_project_event(
+    project_id: uuid.UUID, event_type: str, data: Dict[str, Any], redis: Optional[aioredis.Redis] = None
+) -> None:
+    """Событие задачи/комментария для всех участников проекта (вызывается после commit)"""
+    redis = redis or get_redis()
+    await redis.publish(project_channel(project_id), event_message(event_type, data, project_id))
+
+
+async def publish_user_events(
+    events: Iterable[tuple], redis: Optional[aioredis.Redis] = None
+) -> None:
+    """Пачка персональных событий (user_id, event_type, data) одним pipeline"""
+    redis = redis or get_redis()
+    pipe = redis.pipeline(transaction=False)
+    count = 0
+    for user_id, event_type, data in events:
+        pipe.publish(user_channel(user_id), event_message(event_type, data))
+        count += 1
+    if count:
+        await pipe.execute()
+
+
+async def publish_membership_changed(user_ids: Iterable[uuid.UUID], redis: Optional[aioredis.Redis] = None) -> None:
+    """Соединения пользователей перечитают свои проекты (вызывается после commit)"""
+    await publish_user_events([(user_id, MEMBERSHIP_CHANGED, {}) for user_id in user_ids], redis)
+
+
+def _log_failure(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.opt(exception=task.exception()).error("Membership change publish failed")
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_membership_changes(session: Session) -> None:
+    # Пользователей отмечают события ProjectMember (app/models/project.py)
+    user_ids = session.info.pop(MEMBERSHIP_CHANGES, None)
+    if not user_ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning("Membership changes committed outside event loop, realtime subscriptions update on reconnect")
+        return
+    loop.create_task(publish_membership_changed(user_ids)).add_done_callback(_log_failure)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_membership_changes(session: Session) -> None:
+    session.info.pop(MEMBERSHIP_CHANGES, None)
+
+
+async def member_project_ids(user_id: uuid.UUID) -> Set[uuid.UUID]:
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(select(ProjectMember.project_id).where(ProjectMember.user_id == user_id))
+        return set(rows.scalars().all())
+
+
+class Connection:
+    """
+    Клиентское соединение с собственной очередью отправки.
+
+    Хаб только кладет сообщения в очередь (put_nowait) и никогда не ждет
+    клиента. Если очередь переполнена, клиент не успевает читать - соединение
+    закрывается, клиент переподключается и перечитывает состояние через API.
+    """
+
+    def __init__(
+        self,
+        user_id: uuid.UUID,
+        project_ids: Set[uuid.UUID],
+        queue_size: Optional[int] = None,
+        requested: Optional[Set[uuid.UUID]] = None,
+    ):
+        self.user_id = user_id
+        self.project_ids = project_ids
+        self.requested = requested  # проекты, запрошенные клиентом; None - все проекты пользователя
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(queue_size or settings.REALTIME_SEND_QUEUE_SIZE)
+        self.overflowed = False
+
+    def channels(self) -> Set[str]:
+        return {user_channel(self.user_id)} | {project_channel(p) for p in self.project_ids}
+
+    def offer(self, payload: str) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+            return False
+
+    def close(self) -> None:
+        # None - сигнал писателю завершиться; место под него освобождаем принудительно
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+
+    async def messages(self) -> AsyncIterator[str]:
+        """Сообщения для отправки; пустая строка - пора отправить heartbeat"""
+        while True:
+            try:
+                payload = await asyncio.wait_for(self.queue.get(), settings.REALTIME_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ""
+                continue
+            if payload is None:
+                return
+            yield payload
+
+
+class RealtimeHub:
+    """Одна подписка Redis на процесс и раздача сообщений локальным соединениям"""
+
+    def __init__(self):
+        self._by_channel: Dict[str, Set[Connection]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, connection: Connection) -> None:
+        for channel in connection.channels():
+            self._by_channel.setdefault(channel, set()).add(connection)
+        self._ensure_started()
+
+    def unregister(self, connection: Connection) -> None:
+        for channel in connection.channels():
+            subscribers = self._by_channel.get(channel)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self._by_channel[channel]
+
+    async def refresh(self, connection: Connection) -> None:
+        """Перечитать членство в проектах после изменения состава участников"""
+        project_ids = await member_project_ids(connection.user_id)
+        if connection.requested is not None:
+            project_ids &= connection.requested
+        self.unregister(connection)
+        connection.project_ids = project_ids
+        self.register(connection)
+
+    def dispatch(self, channel: str, payload: str) -> None:
+        subscribers = self._by_channel.get(channel)
+        if not subscribers:
+            return
+        if channel.startswith(f"{CHANNEL_PREFIX}user:") and f'"type": "{MEMBERSHIP_CHANGED}"' in payload:
+            for connection in list(subscribers):
+                asyncio.create_task(self.refresh(connection))
+            return
+        for connection in list(subscribers):
+            if not connection.offer(payload):
+                logger.warning(f"Realtime send queue overflow, dropping connection of user {connection.user_id}")
+                self.unregister(connection)
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Realtime subscription lost, reconnecting")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for subscribers in list(self._by_channel.values()):
+            for connection in subscribers:
+                connection.close()
+        self._by_channel.clear()
+
+
+hub = RealtimeHub()
+
+
+async def _open(user_id: uuid.UUID, project_ids: Optional[Iterable[uuid.UUID]]) -> Connection:
+    requested = set(project_ids) if project_ids is not None else None
+    allowed = await member_project_ids(user_id)
+    if requested is not None:
+        allowed &= requested
+    connection = Connection(user_id, allowed, requested=requested)
+    hub.register(connection)
+    return connection
+
+
+async def serve_websocket(
+    websocket: WebSocket, user_id: uuid.UUID, project_ids: Optional[Iterable[uuid.UUID]] = None
+) -> None:
+    """
+    Обработчик WebSocket; user_id - уже аутентифицированный пользователь.
+
+    project_ids сужает подписку, но не расширяет ее за пределы членства.
+    Отправка каждого сообщения ограничена таймаутом, зависший клиент отключается.
+    """
+    await websocket.accept()
+    connection = await _open(user_id, project_ids)
+
+    async def drain_incoming() -> None:
+        # входящие сообщения не нужны, но их чтение обнаруживает закрытие соединения
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            connection.close()
+
+    reader = asyncio.create_task(drain_incoming())
+    try:
+        async for payload in connection.messages():
+            await asyncio.wait_for(
+                websocket.send_text(payload or '{"type": "ping"}'), settings.REALTIME_SEND_TIMEOUT_SECONDS
+            )
+    except (asyncio.TimeoutError, WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader.cancel()
+        hub.unregister(connection)
+        if connection.overflowed:
+            await websocket.close(code=1013)  # try again later: клиент должен переподключиться
+
+
+def sse_response(user_id: uuid.UUID, project_ids: Optional[Iterable[uuid.UUID]] = None) -> StreamingResponse:
+    """Тот же поток событий в формате Server-Sent Events для клиентов без WebSocket"""
+
+    async def stream() -> AsyncIterator[str]:
+        connection = await _open(user_id, project_ids)
+        try:
+            yield f"retry: {settings.REALTIME_HEARTBEAT_SECONDS * 1000}\n\n"
+            async for payload in connection.messages():
+                yield f"data: {payload}\n\n" if payload else ": ping\n\n"
+        finally:
+            hub.unregister(connection)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,115 @@
+# backend/app/services/rendering.py
+"""
+Пакетный рендеринг Markdown: импорт и фоновый перерендер при смене версии.
+
+Кэш двухуровневый: LRU процесса и Redis (общий для воркеров), ключ -
+sha256 от версии рендерера и текста. Одинаковые тексты в пачке
+рендерятся один раз.
+"""
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+import redis.asyncio as aioredis
+from loguru import logger
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.markdown import RENDERER_VERSION, cache_get, cache_put, content_digest, render_uncached
+from app.core.redis import get_redis
+from app.models.comment import Comment
+from app.models.issue import Issue
+
+REDIS_TTL = 7 * 24 * 3600
+RERENDER_BATCH = 500
+
+
+def _redis_key(digest: str) -> str:
+    return f"md:{digest}"
+
+
+async def render_many(
+    texts: Sequence[Optional[str]], redis: Optional[aioredis.Redis] = None
+) -> List[Optional[str]]:
+    """HTML для каждого текста в исходном порядке; один MGET и один pipeline на пачку"""
+    digests = {text: content_digest(text) for text in set(texts) if text}
+    html: Dict[str, str] = {}
+    missing = []
+    for text, digest in digests.items():
+        cached = cache_get(digest)
+        if cached is None:
+            missing.append(text)
+        else:
+            html[text] = cached[0]
+
+    if missing:
+        redis = redis or get_redis()
+        try:
+            cached = await redis.mget([_redis_key(digests[t]) for t in missing])
+        except Exception:
+            logger.exception("Markdown cache unavailable, rendering without it")
+            cached, redis = [None] * len(missing), None
+        rendered = {}
+        for text, value in zip(missing, cached):
+            mentions = None
+            if value is None:
+                value, mentions = render_uncached(text)
+                rendered[_redis_key(digests[text])] = value
+            cache_put(digests[text], value, mentions)
+            html[text] = value
+        if rendered and redis is not None:
+            pipe = redis.pipeline(transaction=False)
+            for key, value in rendered.items():
+                pipe.set(key, value, ex=REDIS_TTL)
+            await pipe.execute()
+
+    return [html.get(text) if text else None for text in texts]
+
+
+async def _rerender_batch(session: AsyncSession, model, source, target, after: Optional[uuid.UUID]):
+    primary_key = list(model.__table__.primary_key.columns)
+    stmt = (
+        select(*primary_key, source, model.updated_at)
+        .where(model.html_version.is_distinct_from(RENDERER_VERSION))
+        .order_by(model.id)
+        .limit(RERENDER_BATCH)
+    )
+    if after is not None:
+        stmt = stmt.where(model.id > after)
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return None, 0
+    htmls = await render_many([row[-2] for row in rows])
+    values = []
+    for row, html in zip(rows, htmls):
+        value = {column.key: row[i] for i, column in enumerate(primary_key)}
+        # updated_at передается явно: перерендер не должен менять время изменения
+        value.update({target.key: html, "html_version": RENDERER_VERSION, "updated_at": row[-1]})
+        values.append(value)
+    await session.execute(update(model), values)  # bulk UPDATE по первичному ключу
+    await session.commit()
+    return rows[-1].id, len(rows)
+
+
+async def rerender_stale() -> Dict[str, int]:
+    """
+    Перерендерить описания и комментарии, отрендеренные старой версией.
+
+    Точка входа для фоновой задачи после деплоя с новой RENDERER_VERSION.
+    Идет батчами по id с commit после каждого, поэтому прерывание безопасно.
+    """
+    done = {}
+    for model, source, target in (
+        (Issue, Issue.description, Issue.description_html),
+        (Comment, Comment.content, Comment.content_html),
+    ):
+        count, after = 0, None
+        async with AsyncSessionLocal() as session:
+            while True:
+                after, rendered = await _rerender_batch(session, model, source, target, after)
+                if after is None:
+                    break
+                count += rendered
+        done[model.__tablename__] = count
+        logger.info(f"Markdown re-render of {model.__tablename__}: {count} rows")
+    return done
@@ -0,0 +1,325 @@
+# backend/app/services/reports.py
+"""
+Отчеты по задачам (ReportQuery) из дневных агрегатов.
+
+Завершившиеся дни читаются из issue_daily_stats: неделя и месяц - сумма
+дней, число задач в статусе - накопленная сумма net. Дни после отметки
+агрегации (обычно только сегодняшний) считаются по issues/issue_history
+тем же запросом, которым строятся агрегаты, поэтому результаты совпадают.
+"""
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from loguru import logger
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.issue import CLOSED_STATUSES, IssuePriority, IssueType
+from app.models.report import StatsWatermark
+from app.models.user import User
+from app.schemas.search import ReportDataPoint, ReportQuery, ReportResponse
+from app.services.issue_query import enum_label
+
+WATERMARK = "issue_daily_stats"
+TIME_GROUPS = ("day", "week", "month")
+BUCKET_GROUPS = ("status", "type", "priority", "assignee")
+METRICS = ("created", "closed", "open")
+DEFAULT_RANGE_DAYS = 30
+
+_DIMENSIONS = """
+        CROSS JOIN LATERAL (VALUES
+            ('total', ''),
+            ('type', coalesce(i.type::text, '')),
+            ('priority', coalesce(i.priority::text, '')),
+            ('assignee', coalesce(i.assignee_id::text, ''))
+        ) AS v(dimension, bucket)"""
+
+# События по дням: создание и закрытие задач, входы и выходы из статусов.
+# Начальный статус - old_value первой смены статуса, если она была.
+_EVENTS = f"""
+WITH events(project_id, happened_at, dimension, bucket, created, closed, net) AS (
+    SELECT i.project_id, i.created_at, v.dimension, v.bucket, 1, 0, 0
+    FROM issues i {_DIMENSIONS}
+    WHERE {{created_in}} {{scope_i}}
+    UNION ALL
+    SELECT i.project_id, i.closed_at, v.dimension, v.bucket, 0, 1, 0
+    FROM issues i {_DIMENSIONS}
+    WHERE i.is_closed AND {{closed_in}} {{scope_i}}
+    UNION ALL
+    SELECT i.project_id, i.created_at, 'status', coalesce(f.old_value, i.status), 0, 0, 1
+    FROM issues i
+    LEFT JOIN LATERAL (
+        SELECT h.old_value FROM issue_history h
+        WHERE h.issue_id = i.id AND h.changed_field = 'status'
+        ORDER BY h.created_at LIMIT 1
+    ) f ON true
+    WHERE {{created_in}} {{scope_i}}
+    UNION ALL
+    SELECT h.project_id, h.created_at, 'status', s.bucket, 0, 0, s.net
+    FROM issue_history h
+    CROSS JOIN LATERAL (VALUES (h.old_value, -1), (h.new_value, 1)) AS s(bucket, net)
+    WHERE h.changed_field = 'status' AND s.bucket IS NOT NULL AND {{history_in}} {{scope_h}}
+)
+SELECT project_id, (happened_at AT TIME ZONE :tz)::date AS day, dimension, bucket,
+       sum(created)::int AS created, sum(closed)::int AS closed, sum(net)::int AS net
+FROM events
+GROUP BY 1, 2, 3, 4
+HAVING sum(created) <> 0 OR sum(closed) <> 0 OR sum(net) <> 0
+"""
+
+_ROLL_UP = """
+INSERT INTO issue_daily_stats (project_id, day, dimension, bucket, created, closed, net)
+{events}
+ORDER BY 1, 2, 3, 4
+ON CONFLICT (project_id, day, dimension, bucket)
+DO UPDATE SET created = issue_daily_stats.created + EXCLUDED.created,
+              closed = issue_daily_stats.closed + EXCLUDED.closed,
+              net = issue_daily_stats.net + EXCLUDED.net
+"""
+
+# Отметка и агрегаты читаются одним оператором - из одного снимка
+_STORED = """
+SELECT w.day AS watermark, s.day, s.dimension, s.bucket, s.created, s.closed, s.net
+FROM (SELECT max(day) AS day FROM stats_watermarks WHERE name = :name) w
+LEFT JOIN issue_daily_stats s
+    ON s.dimension = ANY(:dimensions) AND s.day <= :end_day {start} {scope}
+"""
+
+
+def _window(column: str, bounded: bool) -> str:
+    upper = f"{column} < (CAST(:end_day AS date)::timestamp AT TIME ZONE :tz)"
+    if not bounded:
+        return upper
+    return f"{column} >= (CAST(:start_day AS date)::timestamp AT TIME ZONE :tz) AND {upper}"
+
+
+def _events_sql(bounded: bool, scoped: bool) -> str:
+    return _EVENTS.format(
+        created_in=_window("i.created_at", bounded),
+        closed_in=_window("i.closed_at", bounded),
+        history_in=_window("h.created_at", bounded),
+        scope_i="AND i.project_id = :project_id" if scoped else "",
+        scope_h="AND h.project_id = :project_id" if scoped else "",
+    )
+
+
+def _tz() -> ZoneInfo:
+    return ZoneInfo(settings.REPORTS_TIMEZONE)
+
+
+def _today() -> date:
+    return datetime.now(_tz()).date()
+
+
+async def _lock_watermark(session: AsyncSession) -> Optional[date]:
+    """Отметка агрегации под FOR UPDATE: агрегация и пересчет не идут параллельно"""
+    await session.execute(insert(StatsWatermark).values(name=WATERMARK, day=None).on_conflict_do_nothing())
+    return await session.scalar(
+        select(StatsWatermark.day).where(StatsWatermark.name == WATERMARK).with_for_update()
+    )
+
+
+async def roll_up_daily_stats(session: AsyncSession, until: Optional[date] = None) -> Optional[date]:
+    """
+    Агрегировать завершившиеся дни после отметки (периодическая задача).
+
+    Первый запуск строит агрегаты за всю историю. Каждый день агрегируется
+    один раз: отметка сдвигается в той же транзакции. Возвращает новую отметку.
+    """
+    until = until or _today() - timedelta(days=1)
+    watermark = await _lock_watermark(session)
+    if watermark is not None and watermark >= until:
+        await session.rollback()
+        return watermark
+    params = {"tz": settings.REPORTS_TIMEZONE, "end_day": until + timedelta(days=1)}
+    if watermark is not None:
+        params["start_day"] = watermark + timedelta(days=1)
+    events = _events_sql(bounded=watermark is not None, scoped=False)
+    await session.execute(text(_ROLL_UP.format(events=events)), params)
+    await session.execute(
+        update(StatsWatermark).where(StatsWatermark.name == WATERMARK).values(day=until)
+    )
+    await session.commit()
+    logger.info(f"Daily report stats rolled up to {until}")
+    return until
+
+
+async def rebuild_daily_stats(session: AsyncSession, project_id: uuid.UUID) -> None:
+    """
+    Пересчитать агрегаты проекта с нуля (после импорта задач задним числом).
+
+    Для дней, история которых уже удалена политикой хранения, статусы
+    восстанавливаются по текущему статусу задачи.
+    """
+    watermark = await _lock_watermark(session)
+    await session.execute(text("DELETE FROM issue_daily_stats WHERE project_id = :project_id"), {"project_id": project_id})
+    if watermark is not None:
+        params = {"tz": settings.REPORTS_TIMEZONE, "end_day": watermark + timedelta(days=1), "project_id": project_id}
+        await session.execute(text(_ROLL_UP.format(events=_events_sql(bounded=False, scoped=True))), params)
+    await session.commit()
+
+
+async def load_daily_stats(
+    session: AsyncSession,
+    project_id: Optional[uuid.UUID],
+    dimensions: List[str],
+    start_day: Optional[date],
+    end_day: date,
+) -> List[Tuple[date, str, str, int, int, int]]:
+    """(day, dimension, bucket, created, closed, net): агрегаты + сырые данные после отметки"""
+    params = {"name": WATERMARK, "dimensions": dimensions, "end_day": end_day}
+    stmt = _STORED.format(
+        start="AND s.day >= :start_day" if start_day is not None else "",
+        scope="AND s.project_id = :project_id" if project_id is not None else "",
+    )
+    if start_day is not None:
+        params["start_day"] = start_day
+    if project_id is not None:
+        params["project_id"] = project_id
+    stored = (await session.execute(text(stmt), params)).all()
+    watermark = stored[0].watermark
+    rows = [(r.day, r.dimension, r.bucket, r.created, r.closed, r.net) for r in stored if r.day is not None]
+
+    if watermark is None or watermark < end_day:
+        raw_start = watermark + timedelta(days=1) if watermark is not None else None
+        if start_day is not None and (raw_start is None or raw_start < start_day):
+            raw_start = start_day
+        params = {"tz": settings.REPORTS_TIMEZONE, "end_day": end_day + timedelta(days=1)}
+        if raw_start is not None:
+            params["start_day"] = raw_start
+        if project_id is not None:
+            params["project_id"] = project_id
+        raw = await session.execute(text(_events_sql(raw_start is not None, project_id is not None)), params)
+        rows += [
+            (r.day, r.dimension, r.bucket, r.created, r.closed, r.net)
+            for r in raw.all() if r.dimension in dimensions
+        ]
+    return rows
+
+
+def _local_day(value: datetime) -> date:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(_tz()).date()
+
+
+def _date_range(query: ReportQuery) -> Tuple[date, date]:
+    end_day = _local_day(query.end_date) if query.end_date else _today()
+    start_day = _local_day(query.start_date) if query.start_date else end_day - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start_day > end_day:
+        raise ValueError('start_date must not be after end_date')
+    return start_day, end_day
+
+
+def _period(day: date, group_by: str) -> date:
+    if group_by == "week":
+        return day - timedelta(days=day.weekday())
+    if group_by == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _period_label(period: date, group_by: str) -> str:
+    return period.strftime("%Y-%m") if group_by == "month" else period.isoformat()
+
+
+def _days(start_day: date, end_day: date) -> Iterable[date]:
+    day = start_day
+    while day <= end_day:
+        yield day
+        day += timedelta(days=1)
+
+
+async def _flow_series(session, project_id, metric, group_by, start_day, end_day) -> List[ReportDataPoint]:
+    """Созданные/закрытые задачи по дням, неделям или месяцам"""
+    values: Dict[date, int] = defaultdict(int)
+    for day, _, _, created, closed, _ in await load_daily_stats(session, project_id, ["total"], start_day, end_day):
+        values[_period(day, group_by)] += created if metric == "created" else closed
+    periods = dict.fromkeys(_period(day, group_by) for day in _days(start_day, end_day))
+    return [ReportDataPoint(label=_period_label(p, group_by), value=values.get(p, 0)) for p in periods]
+
+
+async def _open_series(session, project_id, group_by, start_day, end_day) -> List[ReportDataPoint]:
+    """Число открытых задач на конец каждого периода"""
+    deltas: Dict[date, int] = defaultdict(int)
+    baseline = 0
+    for day, _, bucket, _, _, net in await load_daily_stats(session, project_id, ["status"], None, end_day):
+        if bucket in CLOSED_STATUSES:
+            continue
+        if day < start_day:
+            baseline += net
+        else:
+            deltas[day] += net
+    points: Dict[date, int] = {}
+    current = baseline
+    for day in _days(start_day, end_day):
+        current += deltas.get(day, 0)
+        points[_period(day, group_by)] = current  # значение на последний день периода
+    return [ReportDataPoint(label=_period_label(p, group_by), value=v) for p, v in points.items()]
+
+
+async def _status_snapshot(session, project_id, metric, end_day) -> List[ReportDataPoint]:
+    """Число задач в каждом статусе на end_date; для metric=open - без закрытых статусов"""
+    counts: Dict[str, int] = defaultdict(int)
+    for _, _, bucket, _, _, net in await load_daily_stats(session, project_id, ["status"], None, end_day):
+        counts[bucket] += net
+    return [
+        ReportDataPoint(label=status, value=value)
+        for status, value in sorted(counts.items(), key=lambda kv: -kv[1])
+        if value > 0 and not (metric == "open" and status in CLOSED_STATUSES)
+    ]
+
+
+async def _distribution(session, project_id, metric, group_by, start_day, end_day) -> List[ReportDataPoint]:
+    """Созданные/закрытые за период задачи по типу, приоритету или исполнителю"""
+    counts: Dict[str, int] = defaultdict(int)
+    for _, _, bucket, created, closed, _ in await load_daily_stats(session, project_id, [group_by], start_day, end_day):
+        counts[bucket] += created if metric == "created" else closed
+    labels: Dict[str, str] = {}
+    if group_by == "assignee":
+        ids = [uuid.UUID(b) for b in counts if b]
+        if ids:
+            rows = await session.execute(select(User.id, User.username).where(User.id.in_(ids)))
+            labels = {str(user_id): username for user_id, username in rows.all()}
+        labels[""] = "unassigned"
+    elif group_by == "type":
+        labels = {b: enum_label(IssueType, b) for b in counts}
+    else:
+        labels = {b: enum_label(IssuePriority, b) for b in counts}
+    return [
+        ReportDataPoint(label=labels.get(bucket) or bucket, value=value)
+        for bucket, value in sorted(counts.items(), key=lambda kv: -kv[1])
+        if value
+    ]
+
+
+async def build_report(session: AsyncSession, query: ReportQuery) -> ReportResponse:
+    """Ответ на ReportQuery из дневных агрегатов"""
+    group_by, metric = query.group_by, query.metric
+    if group_by not in TIME_GROUPS + BUCKET_GROUPS:
+        raise ValueError(f'Unsupported group_by: {group_by}')
+    if metric not in METRICS:
+        raise ValueError(f'Unsupported metric: {metric}')
+    if metric == "open" and group_by not in TIME_GROUPS + ("status",):
+        raise ValueError('Open issues can be grouped only by period or status')
+    project_id = uuid.UUID(query.project_id) if query.project_id else None
+    start_day, end_day = _date_range(query)
+
+    if group_by in TIME_GROUPS and metric == "open":
+        data = await _open_series(session, project_id, group_by, start_day, end_day)
+        total = data[-1].value if data else 0
+    elif group_by in TIME_GROUPS:
+        data = await _flow_series(session, project_id, metric, group_by, start_day, end_day)
+        total = sum(point.value for point in data)
+    elif group_by == "status":
+        data = await _status_snapshot(session, project_id, metric, end_day)
+        total = sum(point.value for point in data)
+    else:
+        data = await _distribution(session, project_id, metric, group_by, start_day, end_day)
+        total = sum(point.value for point in data)
+    return ReportResponse(type=metric, title=f"{metric.capitalize()} issues by {group_by}", data=data, total=total)
@@ -0,0 +1,133 @@
+# backend/app/services/retention.py
+import gzip
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import engine as default_engine
+from app.core.partitioning import add_months, ensure_monthly_partitions, existing_partitions, month_partition_name
+
+PARTITION_MONTH = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def retention_policy() -> Dict[str, int]:
+    """Таблица -> сколько месяцев хранить в БД"""
+    return {
+        "issue_history": settings.HISTORY_RETENTION_MONTHS,
+        "activities": settings.ACTIVITY_RETENTION_MONTHS,
+    }
+
+
+def retention_cutoff(table: str) -> date:
+    """Первый месяц, который хранится в БД: партиции раньше него архивируются"""
+    return add_months(date.today().replace(day=1), -retention_policy()[table])
+
+
+def create_future_partitions(db_engine: Optional[Engine] = None) -> List[str]:
+    """Периодическая задача: партиции на PARTITIONS_AHEAD_MONTHS вперед"""
+    created = []
+    with (db_engine or default_engine).begin() as connection:
+        for table in retention_policy():
+            created += ensure_monthly_partitions(connection, table, settings.PARTITIONS_AHEAD_MONTHS)
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+def _partition_month(name: str) -> Optional[date]:
+    match = PARTITION_MONTH.search(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _archive_partition(db_engine: Engine, partition: str, archive_dir: str) -> str:
+    """COPY партиции в gzip-файл потоком (партиция еще подключена, запись в нее уже не идет)"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{partition}.csv.gz")
+    tmp_path = path + ".part"
+    raw = db_engine.raw_connection()
+    try:
+        with gzip.open(tmp_path, "wb", compresslevel=6) as archive, raw.cursor() as cursor:
+            cursor.copy_expert(f"COPY {partition} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+        raw.commit()
+    finally:
+        raw.close()
+    os.replace(tmp_path, path)  # архив появляется только целиком
+    return path
+
+
+def _pending_detaches(connection, table: str) -> List[str]:
+    """Партиции, DETACH CONCURRENTLY которых прерван: до FINALIZE их нельзя отсоединить заново"""
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass) AND i.inhdetachpending ORDER BY c.relname"
+    ), {"table": table})
+    return [r[0] for r in rows]
+
+
+def _detached_partitions(connection, table: str) -> List[str]:
+    """Отсоединенные, но не удаленные партиции ({table}_yYYYYmMM вне pg_inherits)"""
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_class c "
+        "WHERE c.relkind = 'r' AND c.relnamespace = CAST(current_schema() AS regnamespace) "
+        "AND starts_with(c.relname, :prefix) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid) ORDER BY c.relname"
+    ), {"prefix": f"{table}_y"})
+    names = [r[0] for r in rows]
+    return [n for n in names if _partition_month(n) and month_partition_name(table, _partition_month(n)) == n]
+
+
+def _drop_partition(db_engine: Engine, table: str, partition: str, detached: bool, archive_dir: str) -> str:
+    path = _archive_partition(db_engine, partition, archive_dir)
+    with db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if not detached:
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition} CONCURRENTLY"))
+        connection.execute(text(f"DROP TABLE {partition}"))
+    logger.info(f"Archived {partition} to {path}")
+    return path
+
+
+def archive_old_partitions(db_engine: Optional[Engine] = None, archive_dir: Optional[str] = None) -> List[str]:
+    """
+    Выгрузить в архив и удалить партиции старше срока хранения.
+
+    Порядок не требует долгих блокировок: COPY читает подключенную партицию,
+    DETACH PARTITION ... CONCURRENTLY (вне транзакции) не блокирует родителя,
+    затем DROP TABLE отсоединенной таблицы. Запуск сначала доводит до конца
+    прерванный предыдущий: завершает DETACH (FINALIZE) и заново архивирует
+    и удаляет отсоединенные таблицы, которые сбой оставил до DROP.
+    """
+    db_engine = db_engine or default_engine
+    archive_dir = archive_dir or settings.ARCHIVE_PATH
+    archived = []
+
+    for table in retention_policy():
+        cutoff = retention_cutoff(table)
+        with db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for partition in _pending_detaches(connection, table):
+                connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition} FINALIZE"))
+                logger.warning(f"Finalized interrupted detach of {partition}")
+            detached = _detached_partitions(connection, table)
+            partitions = existing_partitions(connection, table)
+        for partition in detached:
+            if _partition_month(partition) < cutoff:
+                _drop_partition(db_engine, table, partition, True, archive_dir)
+                archived.append(partition)
+        for partition in partitions:
+            month = _partition_month(partition)
+            if month is None or month >= cutoff:
+                continue
+            _drop_partition(db_engine, table, partition, False, archive_dir)
+            archived.append(partition)
+    return archived
+
+
+def run_partition_maintenance(db_engine: Optional[Engine] = None) -> None:
+    """Точка входа для планировщика (раз в сутки)"""
+    create_future_partitions(db_engine)
+    archive_old_partitions(db_engine)
@@ -0,0 +1,90 @@
+# backend/app/services/rollups.py
+"""
+Чтение накопительных сумм по иерархии задач (эпики, дорожная карта).
+
+Суммы поддерживаются триггерами (см. IssueRollup в app/models/issue.py),
+поэтому чтение - выборка по первичному ключу без обхода поддерева.
+"""
+import uuid
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.issue import Issue, IssueRollup, HIERARCHY_EDGES_SQL, REMAINING_SQL
+
+
+async def get_rollups(session: AsyncSession, issue_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, IssueRollup]:
+    """Суммы для пачки задач одним запросом; у задач вне иерархии строки нет"""
+    issue_ids = list(set(issue_ids))
+    if not issue_ids:
+        return {}
+    rows = await session.execute(select(IssueRollup).where(IssueRollup.issue_id.in_(issue_ids)))
+    return {rollup.issue_id: rollup for rollup in rows.scalars().all()}
+
+
+def time_stats(issue: Issue, rollup: Optional[IssueRollup] = None) -> Dict[str, Optional[int]]:
+    """Поля IssueWithStats: по поддереву, если задача - родитель, иначе собственные"""
+    if rollup is not None and (rollup.desc_estimate or rollup.desc_spent or rollup.open_descendants):
+        return {
+            "time_estimate": rollup.total_estimate,
+            "time_spent": rollup.total_spent,
+            "time_remaining": rollup.total_remaining,
+            "open_children": rollup.open_descendants,
+        }
+    spent = issue.spent_hours or 0
+    return {
+        "time_estimate": issue.estimate_hours,
+        "time_spent": spent,
+        "time_remaining": max(issue.estimate_hours - spent, 0) if issue.estimate_hours is not None else None,
+        "open_children": 0,
+    }
+
+
+_REBUILD = f"""
+WITH RECURSIVE {HIERARCHY_EDGES_SQL},
+closure(ancestor_id, descendant_id) AS (
+    SELECT parent_id, child_id FROM edges
+    WHERE parent_id IN (SELECT issue_id FROM issue_rollups WHERE project_id = :project_id)
+    UNION
+    SELECT c.ancestor_id, e.child_id FROM closure c JOIN edges e ON e.parent_id = c.descendant_id
+)
+UPDATE issue_rollups r
+SET desc_estimate = s.est, desc_spent = s.spent, desc_remaining = s.rem, open_descendants = s.open_cnt
+FROM (
+    SELECT c.ancestor_id, sum(d.self_estimate) AS est, sum(d.self_spent) AS spent,
+           sum(d.self_remaining) AS rem, sum(d.self_open) AS open_cnt
+    FROM closure c JOIN issue_rollups d ON d.issue_id = c.descendant_id
+    GROUP BY c.ancestor_id
+) s
+WHERE r.issue_id = s.ancestor_id
+"""
+
+_REBUILD_SELF = f"""
+INSERT INTO issue_rollups (issue_id, project_id, self_estimate, self_spent, self_remaining, self_open,
+                           desc_estimate, desc_spent, desc_remaining, open_descendants)
+SELECT i.id, i.project_id, coalesce(i.estimate_hours, 0), coalesce(i.spent_hours, 0),
+       {REMAINING_SQL.format(t="i")}, (NOT i.is_closed)::int, 0, 0, 0, 0
+FROM issues i
+WHERE i.project_id = :project_id AND EXISTS (
+    SELECT 1 FROM issue_links l
+    WHERE l.link_type IN ('PARENT', 'CHILD') AND (
+        (l.source_issue_id = i.id AND l.source_project_id = i.project_id)
+        OR (l.target_issue_id = i.id AND l.target_project_id = i.project_id)
+    )
+)
+"""
+
+
+async def rebuild_rollups(session: AsyncSession, project_id: uuid.UUID) -> None:
+    """
+    Пересчитать суммы проекта с нуля (после ручных правок БД или сбоя).
+
+    На время пересчета триггеры пишущих транзакций ждут блокировку
+    issue_rollups, поэтому параллельные изменения не теряются.
+    """
+    await session.execute(text("LOCK TABLE issue_rollups IN SHARE ROW EXCLUSIVE MODE"))
+    await session.execute(text("DELETE FROM issue_rollups WHERE project_id = :project_id"), {"project_id": project_id})
+    await session.execute(text(_REBUILD_SELF), {"project_id": project_id})
+    await session.execute(text(_REBUILD), {"project_id": project_id})
+    await session.commit()
@@ -0,0 +1,161 @@
+# backend/app/services/search.py
+import html
+import time
+import uuid
+
+from sqlalchemy import and_, case, cast, func, literal, or_, select, union_all
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.permissions import GLOBAL_ADMIN_ROLES
+from app.models.comment import Comment
+from app.models.issue import Issue
+from app.models.project import Project, ProjectMember
+from app.models.user import User
+from app.schemas.search import SearchQuery, SearchResponse, SearchResultItem
+
+SEARCH_CONFIG = "russian"  # для латиницы словарь russian использует english_stem
+HEADLINE_DELIMITER = " … "
+# ts_headline возвращает исходный текст: маркеры - символы из Private Use Area,
+# текст экранируется, и только потом маркеры заменяются на <mark>
+MARK_START, MARK_STOP = "\ue000", "\ue001"
+HEADLINE_OPTIONS = (
+    f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxWords=25, MinWords=8, "
+    f'MaxFragments=3, FragmentDelimiter="{HEADLINE_DELIMITER}"'
+)
+HEADLINE_MAX_CHARS = 20000  # ts_headline перечитывает весь текст - длинные описания обрезаем
+SNIPPET_LENGTH = 300
+
+
+def _headline(text_column, tsquery):
+    config = cast(SEARCH_CONFIG, REGCONFIG)
+    return func.ts_headline(config, func.left(func.coalesce(text_column, ""), HEADLINE_MAX_CHARS), tsquery, HEADLINE_OPTIONS)
+
+
+def _fragments(value):
+    if not value or MARK_START not in value:
+        return []
+    return [
+        html.escape(f.strip()).replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+        for f in value.split(HEADLINE_DELIMITER.strip()) if f.strip()
+    ]
+
+
+async def _visibility(session: AsyncSession, user_id: uuid.UUID):
+    """
+    (видимые проекты, проекты с внутренними комментариями) как подзапросы
+    или (None, None) для глобального администратора - правила как в compile_permissions
+    """
+    role = await session.scalar(select(User.role).where(User.id == user_id))
+    if role is not None and role.name in GLOBAL_ADMIN_ROLES:
+        return None, None
+    member_of = select(ProjectMember.project_id).where(ProjectMember.user_id == user_id)
+    full = select(Project.id).where(or_(Project.owner_id == user_id, Project.id.in_(member_of)))
+    visible = select(Project.id).where(or_(Project.is_public.is_(True), Project.owner_id == user_id, Project.id.in_(member_of)))
+    return visible, full
+
+
+async def search(session: AsyncSession, query: SearchQuery, user_id: uuid.UUID) -> SearchResponse:
+    """
+    Ранжированный полнотекстовый поиск по задачам и комментариям.
+
+    Совпадения ищутся по GIN-индексам search_vector, ранжируются ts_rank_cd,
+    а дорогой ts_headline считается только для строк текущей страницы.
+    Выдача ограничена проектами, доступными user_id, а внутренние
+    комментарии видны только участникам.
+    """
+    started = time.perf_counter()
+    tsquery = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), query.q)
+
+    issue_hits = select(
+        Issue.id.label("id"),
+        literal("issue").label("type"),
+        Issue.id.label("issue_id"),
+        Issue.project_id.label("project_id"),
+        func.ts_rank_cd(Issue.search_vector, tsquery, 32).label("score"),
+    ).where(Issue.search_vector.op("@@")(tsquery))
+
+    comment_hits = (
+        select(
+            Comment.id.label("id"),
+            literal("comment").label("type"),
+            Comment.issue_id.label("issue_id"),
+            Comment.project_id.label("project_id"),
+            func.ts_rank_cd(Comment.search_vector, tsquery, 32).label("score"),
+        )
+        .where(Comment.search_vector.op("@@")(tsquery))
+    )
+
+    if query.project_id:
+        project_id = uuid.UUID(str(query.project_id))
+        issue_hits = issue_hits.where(Issue.project_id == project_id)
+        comment_hits = comment_hits.where(Comment.project_id == project_id)
+
+    visible, full = await _visibility(session, user_id)
+    if visible is not None:
+        issue_hits = issue_hits.where(Issue.project_id.in_(visible))
+        comment_hits = comment_hits.where(
+            Comment.project_id.in_(visible),
+            or_(Comment.is_internal.isnot(True), Comment.project_id.in_(full)),
+        )
+
+    hits = union_all(issue_hits, comment_hits).subquery("hits")
+    page = (
+        select(hits, func.count().over().label("total"))
+        .order_by(hits.c.score.desc(), hits.c.id)
+        .limit(query.limit)
+        .offset(query.offset)
+        .subquery("page")
+    )
+
+    is_issue = page.c.type == "issue"
+    stmt = (
+        select(
+            page.c.id,
+            page.c.type,
+            page.c.score,
+            page.c.total,
+            Issue.key.label("issue_key"),
+            Issue.title.label("title"),
+            Project.key.label("project_key"),
+            func.left(case((is_issue, Issue.description), else_=Comment.content), SNIPPET_LENGTH).label("snippet"),
+            case((is_issue, _headline(Issue.title, tsquery))).label("title_hl"),
+            case(
+                (is_issue, _headline(Issue.description, tsquery)),
+                else_=_headline(Comment.content, tsquery),
+            ).label("body_hl"),
+        )
+        .select_from(page)
+        .join(Issue, and_(Issue.id == page.c.issue_id, Issue.project_id == page.c.project_id))
+        .join(Project, Project.id == Issue.project_id)
+        .outerjoin(Comment, and_(page.c.type == "comment", Comment.id == page.c.id))
+        .order_by(page.c.score.desc(), page.c.id)
+    )
+
+    rows = (await session.execute(stmt)).all()
+
+    results = []
+    for row in rows:
+        highlight = {}
+        title_fragments = _fragments(row.title_hl)
+        if title_fragments:
+            highlight["title"] = title_fragments
+        body_fragments = _fragments(row.body_hl)
+        if body_fragments:
+            highlight["description" if row.type == "issue" else "content"] = body_fragments
+        results.append(SearchResultItem(
+            id=str(row.id),
+            type=row.type,
+            title=row.title,
+            description=row.snippet,
+            project_key=row.project_key,
+            issue_key=row.issue_key,
+            highlight=highlight,
+            score=float(row.score),
+        ))
+
+    return SearchResponse(
+        results=results,
+        total=rows[0].total if rows else 0,
+        took_ms=int((time.perf_counter() - started) * 1000),
+    )
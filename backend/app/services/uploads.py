@@ -0,0 +1,375 @@
+# backend/app/services/uploads.py
+"""
+Потоковая загрузка вложений в S3/MinIO через multipart upload.
+
+В памяти воркера на загрузку держится не больше одной части
+(UPLOAD_PART_SIZE_MB), независимо от размера файла. Каждая принятая S3
+часть фиксируется в UploadSession, поэтому оборванную загрузку клиент
+продолжает с bytes_received.
+"""
+import fnmatch
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import magic
+from loguru import logger
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.broker import publish_preview_request
+from app.core.config import settings
+from app.core.permissions import Permission, allows
+from app.core.storage import iter_object, s3_call
+from app.models.attachment import Attachment, AttachmentBlob, FileType, UploadSession, UploadStatus
+from app.services.permissions import get_masks
+
+SNIFF_BYTES = 8192
+ARCHIVE_TYPES = {"application/zip", "application/gzip", "application/x-gzip", "application/x-tar", "application/x-7z-compressed"}
+LOG_EXTENSIONS = {".log", ".out", ".err"}
+
+# Состояние sha256 нельзя сохранить в БД, поэтому оно живет в процессе:
+# upload id -> (хэшер, сколько байт через него прошло)
+_hashers: Dict[uuid.UUID, Tuple["hashlib._Hash", int]] = {}
+
+
+class UploadRejected(ValueError):
+    """Загрузка отклонена (размер, тип файла, неверный offset); S3 upload уже отменен, если нужно"""
+
+
+def max_size_bytes() -> int:
+    return settings.MAX_FILE_SIZE_MB * 1024 * 1024
+
+
+def part_size_bytes() -> int:
+    return settings.UPLOAD_PART_SIZE_MB * 1024 * 1024
+
+
+def is_allowed_type(mime_type: str) -> bool:
+    patterns = [p.strip() for p in settings.ALLOWED_FILE_TYPES.split(",") if p.strip()]
+    return any(fnmatch.fnmatch(mime_type, pattern) for pattern in patterns)
+
+
+def detect_file_type(mime_type: str, filename: str) -> FileType:
+    if mime_type.startswith("image/"):
+        return FileType.IMAGE
+    if mime_type in ARCHIVE_TYPES:
+        return FileType.ARCHIVE
+    if os.path.splitext(filename)[1].lower() in LOG_EXTENSIONS:
+        return FileType.LOG
+    if mime_type.startswith("text/") or mime_type in ("application/pdf", "application/msword"):
+        return FileType.DOCUMENT
+    return FileType.OTHER
+
+
+def _safe_name(name: str) -> str:
+    name = re.sub(r"[^\w.\-]+", "_", os.path.basename(name)).strip("._")
+    return name[:200] or "file"
+
+
+def _attachment(blob: AttachmentBlob, original_name: str, **fields) -> Attachment:
+    return Attachment(
+        filename=_safe_name(original_name),
+        original_name=original_name,
+        mime_type=blob.mime_type,
+        file_type=detect_file_type(blob.mime_type, original_name),
+        size_bytes=blob.size_bytes,
+        storage_path=blob.storage_path,
+        storage_bucket=blob.storage_bucket,
+        sha256=blob.sha256,
+        **fields,
+    )
+
+
+async def _after_attach(attachment: Attachment) -> None:
+    if attachment.file_type == FileType.IMAGE:
+        try:
+            await publish_preview_request(attachment.id)
+        except Exception:
+            # не страшно: недостающие превью создаются при первом запросе
+            logger.exception(f"Failed to enqueue previews for attachment {attachment.id}")
+
+
+async def attach_by_hash(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    project_id: uuid.UUID,
+    original_name: str,
+    sha256: str,
+    issue_id: Optional[uuid.UUID] = None,
+    comment_id: Optional[uuid.UUID] = None,
+    description: Optional[str] = None,
+) -> Optional[Attachment]:
+    """
+    Предварительная проверка по хэшу, посчитанному клиентом.
+
+    Если такое содержимое уже хранится и на него ссылаются вложения
+    в доступном пользователю проекте, вложение создается ссылкой на blob
+    без передачи байт; None - файл нужно загрузить (start_upload).
+    Иначе знание хэша давало бы доступ к чужим файлам.
+    """
+    if (issue_id is None) == (comment_id is None):
+        raise ValueError('Attachment must reference exactly one of issue_id or comment_id')
+    blob = await session.get(AttachmentBlob, sha256)
+    if blob is None:
+        return None
+    project_ids = (await session.execute(
+        select(Attachment.project_id).where(Attachment.sha256 == sha256).distinct()
+    )).scalars().all()
+    masks = await get_masks(session, user_id, project_ids)
+    if not any(allows(mask, Permission.VIEW) for mask in masks.values()):
+        return None
+    attachment = _attachment(
+        blob, original_name, issue_id=issue_id, comment_id=comment_id, project_id=project_id,
+        uploaded_by=user_id, description=description,
+    )
+    session.add(attachment)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        if await session.scalar(select(AttachmentBlob.sha256).where(AttachmentBlob.sha256 == sha256)) is None:
+            return None  # blob удален сборщиком после проверки - обычная загрузка
+        raise
+    await _after_attach(attachment)
+    return attachment
+
+
+async def start_upload(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    project_id: uuid.UUID,
+    original_name: str,
+    issue_id: Optional[uuid.UUID] = None,
+    comment_id: Optional[uuid.UUID] = None,
+    size_bytes: Optional[int] = None,
+    description: Optional[str] = None,
+) -> UploadSession:
+    if (issue_id is None) == (comment_id is None):
+        raise ValueError('Upload must reference exactly one of issue_id or comment_id')
+    if size_bytes is not None and size_bytes > max_size_bytes():
+        raise UploadRejected(f'File size exceeds maximum of {max_size_bytes()} bytes')
+
+    upload_id = uuid.uuid4()
+    key = f"{project_id}/{upload_id}/{_safe_name(original_name)}"
+    response = await s3_call("create_multipart_upload", Bucket=settings.STORAGE_BUCKET, Key=key)
+    upload = UploadSession(
+        id=upload_id,
+        project_id=project_id,
+        issue_id=issue_id,
+        comment_id=comment_id,
+        uploaded_by=user_id,
+        original_name=original_name,
+        description=description,
+        storage_path=key,
+        storage_bucket=settings.STORAGE_BUCKET,
+        s3_upload_id=response["UploadId"],
+        expected_size=size_bytes,
+        parts=[],
+    )
+    session.add(upload)
+    await session.commit()
+    _hashers[upload.id] = (hashlib.sha256(), 0)
+    return upload
+
+
+async def _upload_part(session: AsyncSession, upload: UploadSession, data: bytes) -> None:
+    """Отправить часть в S3 и зафиксировать ее - после commit часть переживает обрыв"""
+    number = len(upload.parts) + 1
+    response = await s3_call(
+        "upload_part",
+        Bucket=upload.storage_bucket,
+        Key=upload.storage_path,
+        UploadId=upload.s3_upload_id,
+        PartNumber=number,
+        Body=data,
+    )
+    # хэш считается по тем же байтам, что ушли в S3, и всегда соответствует bytes_received
+    hasher, hashed = _hashers.pop(upload.id, (None, -1))
+    if hashed == upload.bytes_received:
+        hasher.update(data)
+        _hashers[upload.id] = (hasher, hashed + len(data))
+    upload.parts = [*upload.parts, {"PartNumber": number, "ETag": response["ETag"]}]
+    upload.bytes_received += len(data)
+    await session.commit()
+
+
+async def abort_upload(session: AsyncSession, upload: UploadSession) -> None:
+    _hashers.pop(upload.id, None)
+    if upload.status != UploadStatus.ACTIVE:
+        return
+    try:
+        await s3_call(
+            "abort_multipart_upload",
+            Bucket=upload.storage_bucket, Key=upload.storage_path, UploadId=upload.s3_upload_id,
+        )
+    except Exception:
+        logger.exception(f"Failed to abort multipart upload {upload.s3_upload_id}")
+    upload.status = UploadStatus.ABORTED
+    await session.commit()
+
+
+async def _sniff(session: AsyncSession, upload: UploadSession, head: bytes) -> None:
+    mime_type = magic.from_buffer(head, mime=True) or "application/octet-stream"
+    if not is_allowed_type(mime_type):
+        await abort_upload(session, upload)
+        raise UploadRejected(f'File type {mime_type} is not allowed')
+    upload.mime_type = mime_type
+
+
+async def receive(
+    session: AsyncSession,
+    upload: UploadSession,
+    chunks: AsyncIterator[bytes],
+    offset: int = 0,
+    final: bool = True,
+) -> UploadSession:
+    """
+    Принять поток байт, начиная с offset (должен совпадать с bytes_received).
+
+    MIME определяется по первым байтам файла до отправки чего-либо в S3;
+    лимит размера проверяется по мере чтения, превышение отменяет загрузку.
+    final=False - продолжение придет отдельным запросом: хвост меньше части
+    не отправляется и не учитывается в bytes_received. При обрыве потока
+    принятые части сохраняются, клиент продолжает с bytes_received.
+    """
+    if upload.status != UploadStatus.ACTIVE:
+        raise UploadRejected(f'Upload is {upload.status.value}')
+    if offset != upload.bytes_received:
+        raise UploadRejected(f'Upload must resume at offset {upload.bytes_received}')
+
+    limit = min(upload.expected_size or max_size_bytes(), max_size_bytes())
+    part_size = part_size_bytes()
+    buffer = bytearray()
+    received = upload.bytes_received
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > limit:
+            await abort_upload(session, upload)
+            raise UploadRejected(f'File size exceeds maximum of {limit} bytes')
+        buffer.extend(chunk)
+        if upload.mime_type is None:
+            if len(buffer) < SNIFF_BYTES:
+                continue
+            await _sniff(session, upload, bytes(buffer[:SNIFF_BYTES]))
+        while len(buffer) >= part_size:
+            data = bytes(buffer[:part_size])
+            del buffer[:part_size]
+            await _upload_part(session, upload, data)
+
+    if final and buffer:
+        if upload.mime_type is None:
+            await _sniff(session, upload, bytes(buffer))
+        await _upload_part(session, upload, bytes(buffer))
+    return upload
+
+
+async def _sha256_from_storage(upload: UploadSession) -> str:
+    hasher = hashlib.sha256()
+    async for chunk in iter_object(upload.storage_bucket, upload.storage_path):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def complete_upload(session: AsyncSession, upload: UploadSession) -> Attachment:
+    """Собрать объект из частей и создать Attachment"""
+    if upload.status != UploadStatus.ACTIVE:
+        raise UploadRejected(f'Upload is {upload.status.value}')
+    if not upload.parts:
+        raise UploadRejected('Upload has no data')
+    if upload.expected_size is not None and upload.bytes_received != upload.expected_size:
+        raise UploadRejected(f'Upload is incomplete: {upload.bytes_received} of {upload.expected_size} bytes')
+
+    await s3_call(
+        "complete_multipart_upload",
+        Bucket=upload.storage_bucket,
+        Key=upload.storage_path,
+        UploadId=upload.s3_upload_id,
+        MultipartUpload={"Parts": upload.parts},
+    )
+    hasher, hashed = _hashers.pop(upload.id, (None, -1))
+    if hashed == upload.bytes_received:
+        upload.sha256 = hasher.hexdigest()
+    else:
+        # части принимались разными процессами - дочитываем объект потоком
+        upload.sha256 = await _sha256_from_storage(upload)
+
+    # Регистрируем blob; если такое содержимое уже есть (параллельная или
+    # более ранняя загрузка без хэша), свой объект удаляем и ссылаемся на имеющийся
+    await session.execute(insert(AttachmentBlob).values(
+        sha256=upload.sha256,
+        size_bytes=upload.bytes_received,
+        mime_type=upload.mime_type,
+        storage_bucket=upload.storage_bucket,
+        storage_path=upload.storage_path,
+        ref_count=0,
+        unreferenced_since=datetime.now(timezone.utc),
+    ).on_conflict_do_nothing(index_elements=["sha256"]))
+    blob = await session.get(AttachmentBlob, upload.sha256, populate_existing=True)
+    if blob.storage_path != upload.storage_path:
+        await s3_call("delete_object", Bucket=upload.storage_bucket, Key=upload.storage_path)
+
+    attachment = _attachment(
+        blob, upload.original_name, issue_id=upload.issue_id, comment_id=upload.comment_id,
+        project_id=upload.project_id, uploaded_by=upload.uploaded_by, description=upload.description,
+    )
+    session.add(attachment)
+    await session.flush()
+    upload.status = UploadStatus.COMPLETED
+    upload.attachment_id = attachment.id
+    await session.commit()
+    await _after_attach(attachment)
+    return attachment
+
+
+async def get_upload(session: AsyncSession, upload_id: uuid.UUID, user_id: uuid.UUID) -> Optional[UploadSession]:
+    return await session.scalar(
+        select(UploadSession).where(UploadSession.id == upload_id, UploadSession.uploaded_by == user_id)
+    )
+
+
+async def abort_stale_uploads(session: AsyncSession) -> int:
+    """Отменить брошенные загрузки (незавершенные части S3 занимают место до abort)"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    stale = (await session.execute(
+        select(UploadSession).where(UploadSession.status == UploadStatus.ACTIVE, UploadSession.updated_at < cutoff)
+    )).scalars().all()
+    for upload in stale:
+        await abort_upload(session, upload)
+    return len(stale)
+
+
+async def collect_garbage(session: AsyncSession, grace_hours: int = 24, limit: int = 1000) -> int:
+    """
+    Удалить blob без ссылок дольше grace_hours.
+
+    Строки удаляются первыми и с повторной проверкой ref_count = 0: вложение,
+    успевшее сослаться на blob, либо увеличило счетчик раньше, либо получит
+    ошибку внешнего ключа. Объекты S3 удаляются после commit.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+    candidates = (
+        select(AttachmentBlob.sha256)
+        .where(AttachmentBlob.ref_count == 0, AttachmentBlob.unreferenced_since < cutoff)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    removed = (await session.execute(
+        delete(AttachmentBlob)
+        .where(AttachmentBlob.sha256.in_(candidates), AttachmentBlob.ref_count == 0)
+        .returning(AttachmentBlob.storage_bucket, AttachmentBlob.storage_path)
+    )).all()
+    await session.commit()
+
+    by_bucket: Dict[str, list] = {}
+    for bucket, path in removed:
+        by_bucket.setdefault(bucket, []).append({"Key": path})
+    for bucket, keys in by_bucket.items():
+        for start in range(0, len(keys), 1000):  # лимит DeleteObjects
+            await s3_call("delete_objects", Bucket=bucket, Delete={"Objects": keys[start:start + 1000], "Quiet": True})
+    return len(removed)
@@ -0,0 +1,31 @@
+# backend/app/services/workflow.py
+import uuid
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.workflow import CompiledWorkflow, workflow_cache
+from app.models.project import Project
+
+
+async def warm_workflow_cache(session: AsyncSession, project_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, CompiledWorkflow]:
+    """
+    Скомпилировать workflow нескольких проектов одним запросом.
+
+    Вызывается перед массовой сменой статусов (и в async-коде, где ленивая
+    загрузка Issue.project в валидаторе недоступна).
+    """
+    workflows = {}
+    missing = []
+    for project_id in set(project_ids):
+        workflow = workflow_cache.get(project_id)
+        if workflow is None:
+            missing.append(project_id)
+        else:
+            workflows[project_id] = workflow
+    if missing:
+        rows = await session.execute(select(Project.id, Project.settings).where(Project.id.in_(missing)))
+        for project_id, settings in rows:
+            workflows[project_id] = workflow_cache.put(project_id, settings)
+    return workflows
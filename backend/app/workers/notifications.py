@@ -0,0 +1,142 @@
+# backend/app/workers/notifications.py
+"""
+Воркер уведомлений: faststream run app.workers.notifications:app
+
+В тестах используется TestRabbitBroker(broker) (брокер в памяти),
+а pipeline.digest.mailer подменяется заглушкой.
+"""
+import asyncio
+from typing import List, Optional, Tuple
+
+from faststream import AckPolicy, FastStream
+from faststream.rabbit import Channel
+from faststream.rabbit.annotations import RabbitMessage
+from loguru import logger
+
+from app.core.broker import ISSUE_EVENTS_DEAD_QUEUE, ISSUE_EVENTS_QUEUE, broker
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.schemas.notification import IssueEvent
+from app.services.mailer import DigestBuffer, SMTPMailer
+from app.services.notifications import process_events
+
+DIGEST_TICK_SECONDS = 5
+ATTEMPTS_HEADER = "x-attempts"
+
+
+class NotificationPipeline:
+    """
+    Микро-батчинг событий из очереди.
+
+    Сообщения подтверждаются вручную только после commit пачки.
+    Если пачка упала, события обрабатываются по одному, чтобы одно
+    "ядовитое" событие не блокировало остальные; упавшее событие
+    публикуется заново со счетчиком попыток, после max_attempts - в DLQ.
+    prefetch_count = размер пачки, чтобы брокер отдавал достаточно сообщений.
+    """
+
+    def __init__(self, mailer, batch_size: int, batch_wait: float, max_attempts: int):
+        self.digest = DigestBuffer(mailer)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self._pending: List[Tuple[IssueEvent, RabbitMessage]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def add(self, event: IssueEvent, message: RabbitMessage) -> None:
+        self._pending.append((event, message))
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_wait)
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                emails = await self._process([event for event, _ in batch])
+            except Exception:
+                logger.exception(f"Notification batch of {len(batch)} events failed, retrying one by one")
+                for event, message in batch:
+                    await self._process_one(event, message)
+                return
+            for _, message in batch:
+                await message.ack()
+            self.digest.add(emails)
+
+    async def _process(self, events: List[IssueEvent]):
+        async with AsyncSessionLocal() as session:
+            return await process_events(session, events)
+
+    async def _process_one(self, event: IssueEvent, message: RabbitMessage) -> None:
+        try:
+            emails = await self._process([event])
+        except Exception:
+            await self._retry_or_dead_letter(event, message)
+            return
+        await message.ack()
+        self.digest.add(emails)
+
+    async def _retry_or_dead_letter(self, event: IssueEvent, message: RabbitMessage) -> None:
+        """Повторная публикация в конец очереди со счетчиком попыток (nack с requeue вернул бы его в голову)"""
+        attempts = int((message.headers or {}).get(ATTEMPTS_HEADER, 0)) + 1
+        if attempts >= self.max_attempts:
+            logger.exception(f"Notification event for issue {event.issue_id} failed {attempts} times, dead-lettering")
+            queue = ISSUE_EVENTS_DEAD_QUEUE
+        else:
+            logger.exception(f"Notification event for issue {event.issue_id} failed (attempt {attempts})")
+            queue = ISSUE_EVENTS_QUEUE
+        try:
+            await broker.publish(event, queue=queue, persist=True, headers={ATTEMPTS_HEADER: attempts})
+        except Exception:
+            logger.exception("Failed to republish notification event, requeueing")
+            await message.nack(requeue=True)
+            return
+        await message.ack()
+
+    async def run_digests(self) -> None:
+        while True:
+            await asyncio.sleep(DIGEST_TICK_SECONDS)
+            await self.digest.flush()
+
+
+pipeline = NotificationPipeline(
+    SMTPMailer(),
+    batch_size=settings.NOTIFICATION_BATCH_SIZE,
+    batch_wait=settings.NOTIFICATION_BATCH_WAIT_MS / 1000,
+    max_attempts=settings.NOTIFICATION_MAX_ATTEMPTS,
+)
+app = FastStream(broker)
+_digest_task: Optional[asyncio.Task] = None
+
+
+@broker.subscriber(
+    ISSUE_EVENTS_QUEUE,
+    ack_policy=AckPolicy.MANUAL,
+    channel=Channel(prefetch_count=settings.NOTIFICATION_BATCH_SIZE),
+)
+async def on_issue_event(event: IssueEvent, message: RabbitMessage) -> None:
+    await pipeline.add(event, message)
+
+
+@app.after_startup
+async def start_digests() -> None:
+    global _digest_task
+    await broker.declare_queue(ISSUE_EVENTS_DEAD_QUEUE)  # без объявления публикация в DLQ теряется
+    _digest_task = asyncio.create_task(pipeline.run_digests())
+
+
+@app.on_shutdown
+async def drain() -> None:
+    await pipeline.flush()
+    if _digest_task is not None:
+        _digest_task.cancel()
+    await pipeline.digest.flush(force=True)
+    await pipeline.digest.mailer.close()
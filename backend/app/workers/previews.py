@@ -0,0 +1,40 @@
+# backend/app/workers/previews.py
+"""
+Воркер превью изображений: faststream run app.workers.previews:app
+
+Обработчик только ждет результат пула процессов, поэтому один воркер
+параллельно ведет до IMAGE_PREVIEW_WORKERS изображений.
+"""
+import uuid
+
+from faststream import FastStream
+from faststream.rabbit import Channel
+from loguru import logger
+
+from app.core.broker import IMAGE_PREVIEWS_QUEUE, broker
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.attachment import Attachment
+from app.services.previews import generate_previews, shutdown_executor
+
+app = FastStream(broker)
+
+
+@broker.subscriber(
+    IMAGE_PREVIEWS_QUEUE,
+    # параллелизм ограничивает prefetch: aio-pika обрабатывает каждое
+    # неподтвержденное сообщение в отдельной задаче
+    channel=Channel(prefetch_count=settings.IMAGE_PREVIEW_WORKERS),
+)
+async def on_preview_request(attachment_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as session:
+        attachment = await session.get(Attachment, attachment_id)
+        if attachment is None:
+            return  # вложение удалено, пока запрос был в очереди
+        previews = await generate_previews(session, attachment)
+        logger.debug(f"Attachment {attachment_id}: {len(previews)} previews")
+
+
+@app.on_shutdown
+async def stop_pool() -> None:
+    shutdown_executor()
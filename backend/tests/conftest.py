@@ -0,0 +1,87 @@
+# backend/tests/conftest.py
+"""
+Тесты с базой данных.
+
+Нужен отдельный пустой PostgreSQL в DATABASE_TEST_URL (см. .env.example):
+схема public пересоздается в начале сессии. Без DATABASE_TEST_URL тесты,
+использующие db/async_db, пропускаются.
+"""
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.core.redis import close_redis
+from app.models import analytics, attachment, comment, import_job, notification, report  # noqa: F401
+from app.models.issue import Issue
+from app.models.project import Project
+from app.models.user import User
+
+
+def _async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if not settings.DATABASE_TEST_URL:
+        pytest.skip("DATABASE_TEST_URL is not set")
+    engine = create_engine(settings.DATABASE_TEST_URL)
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+async def redis_per_test():
+    """Общий клиент Redis (get_redis) привязан к event loop, а у каждого теста свой"""
+    yield
+    await close_redis()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.rollback()
+    session.close()
+
+
+@pytest.fixture
+async def async_db(engine):
+    async_engine = create_async_engine(_async_url(settings.DATABASE_TEST_URL))
+    async with async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await async_engine.dispose()
+
+
+def make_user(db, **values) -> User:
+    name = uuid.uuid4().hex[:12]
+    user = User(id=uuid.uuid4(), email=f"{name}@example.com", username=name, hashed_password="x", **values)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_project(db, owner: User, **values) -> Project:
+    project = Project(id=uuid.uuid4(), name="Project", key=values.pop("key", uuid.uuid4().hex[:8].upper()), owner_id=owner.id, **values)
+    db.add(project)
+    db.commit()
+    return project
+
+
+def make_issue(db, project: Project, reporter: User, **values) -> Issue:
+    issue = Issue(id=uuid.uuid4(), project_id=project.id, reporter_id=reporter.id, title=values.pop("title", "Issue"), **values)
+    db.add(issue)
+    db.commit()
+    return issue
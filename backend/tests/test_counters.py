@@ -0,0 +1,37 @@
+# backend/tests/test_counters.py
+from sqlalchemy import text
+
+from app.models.project import ProjectMember
+from app.services.counters import load_counters, reconcile_counters
+from conftest import make_issue, make_project, make_user
+
+
+async def test_triggers_keep_counters_in_sync(db, async_db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    first = make_issue(db, project, owner)
+    make_issue(db, project, owner, status="in_progress")
+    db.add(ProjectMember(project_id=project.id, user_id=make_user(db).id))
+    db.commit()
+
+    db.execute(text("UPDATE issues SET status = 'closed' WHERE id = :id"), {"id": first.id})
+    db.commit()
+
+    counters = (await load_counters(async_db, [project.id]))[project.id]
+    assert counters["total"] == {"": 2}
+    assert counters["open"] == {"": 1}
+    assert counters["status"] == {"closed": 1, "in_progress": 1}
+    assert counters["members"] == {"": 1}
+    assert await reconcile_counters(async_db, [project.id]) == 0
+
+
+async def test_reconcile_repairs_drift(db, async_db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    make_issue(db, project, owner)
+    db.execute(text("UPDATE project_counters SET value = 7 WHERE project_id = :id AND dimension = 'total'"),
+               {"id": project.id})
+    db.commit()
+
+    assert await reconcile_counters(async_db, [project.id]) == 1
+    assert (await load_counters(async_db, [project.id]))[project.id]["total"] == {"": 1}
@@ -0,0 +1,43 @@
+# backend/tests/test_dependencies.py
+import uuid
+
+from app.core.graph import ProjectGraph, graph_cache
+from app.models.issue import IssueLink, IssueLinkType
+from app.services.dependencies import critical_path
+from conftest import make_issue, make_project, make_user
+
+
+def _link(db, source, target, link_type=IssueLinkType.BLOCKS):
+    db.add(IssueLink(id=uuid.uuid4(), source_issue_id=source.id, source_project_id=source.project_id,
+                     target_issue_id=target.id, target_project_id=target.project_id,
+                     link_type=link_type, created_by=source.reporter_id))
+
+
+async def test_critical_path_is_the_heaviest_open_chain(db, async_db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    target = make_issue(db, project, owner)
+    a, b, c, e = (make_issue(db, project, owner, estimate_hours=hours) for hours in (5, 1, 2, 4))
+    closed = make_issue(db, project, owner, estimate_hours=20, status="closed")
+    _link(db, a, target)
+    _link(db, target, b, IssueLinkType.IS_BLOCKED_BY)
+    for source, blocked in ((c, a), (c, b), (closed, b), (e, c)):
+        _link(db, source, blocked)
+    db.commit()
+
+    assert await critical_path(async_db, target.id) == ([e.id, c.id, a.id, target.id], 11)
+    assert await critical_path(async_db, e.id) == ([], 0)
+
+
+def test_graph_cache_is_reset_after_commit(db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    first, second = make_issue(db, project, owner), make_issue(db, project, owner)
+    graph = graph_cache.put(project.id, ProjectGraph([]))
+
+    _link(db, first, second)
+    db.flush()
+    assert graph_cache.get(project.id) is graph  # до commit другие запросы видят старые связи
+
+    db.commit()
+    assert graph_cache.get(project.id) is None
@@ -0,0 +1,50 @@
+# backend/tests/test_feed.py
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.models.comment import Activity
+from app.services.feed import get_project_feed, project_feed_key
+from conftest import make_project, make_user
+
+
+@pytest.fixture
+async def redis():
+    client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+async def _pages(async_db, redis, project_id, key_exists: bool):
+    ids, before, before_id = [], None, None
+    while True:
+        if not key_exists:
+            await redis.delete(project_feed_key(project_id))
+        page = await get_project_feed(async_db, redis, project_id, limit=1, before=before, before_id=before_id)
+        if not page:
+            return ids
+        item = json.loads(page[0])
+        ids.append(uuid.UUID(item["id"]))
+        before, before_id = datetime.fromisoformat(item["created_at"]).timestamp(), ids[-1]
+
+
+@pytest.mark.parametrize("cached", [True, False])
+async def test_pages_keep_activities_with_the_same_timestamp(db, async_db, redis, cached):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    created_at = datetime.now(timezone.utc)
+    activities = [
+        Activity(id=uuid.uuid4(), project_id=project.id, user_id=owner.id, activity_type="comment", data={},
+                 created_at=created_at)
+        for _ in range(3)
+    ]
+    db.add_all(activities)
+    db.commit()
+    await redis.delete(project_feed_key(project.id))
+    await get_project_feed(async_db, redis, project.id, limit=1)  # заполнить кэш
+
+    assert await _pages(async_db, redis, project.id, cached) == sorted((a.id for a in activities), reverse=True)
@@ -0,0 +1,20 @@
+# backend/tests/test_issue_keys.py
+import uuid
+
+from app.services.issue_keys import get_issue_by_key
+from conftest import make_issue, make_project, make_user
+
+
+async def test_reused_project_key_resolves_to_the_new_project(db, async_db):
+    owner = make_user(db)
+    key = uuid.uuid4().hex[:8].upper()
+    old = make_project(db, owner, key=key)
+    assert await get_issue_by_key(async_db, f"{key}-1") is None  # id проекта закэширован
+    await async_db.rollback()  # DETACH партиции удаляемого проекта ждет открытые транзакции
+
+    db.delete(old)
+    db.commit()
+    new = make_project(db, owner, key=key)
+    issue = make_issue(db, new, owner, key=f"{key}-1")
+
+    assert (await get_issue_by_key(async_db, f"{key}-1")).id == issue.id
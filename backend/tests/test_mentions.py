@@ -0,0 +1,34 @@
+# backend/tests/test_mentions.py
+import uuid
+
+from app.models.project import ProjectMember
+from app.services.mentions import MentionSource, mention_events, username_cache
+from conftest import make_issue, make_project, make_user
+
+
+async def test_texts_of_one_issue_give_one_event(db, async_db):
+    owner, first, second = make_user(db), make_user(db), make_user(db)
+    project = make_project(db, owner)
+    db.add_all([ProjectMember(id=uuid.uuid4(), project_id=project.id, user_id=u.id) for u in (first, second)])
+    db.commit()
+    issue = make_issue(db, project, owner)
+
+    def source(text):
+        return MentionSource(project_id=project.id, issue_id=issue.id, actor_id=owner.id, text=text)
+
+    events = await mention_events(async_db, [
+        source(f"@{first.username} @{second.username}"), source(f"and @{first.username} again"),
+    ])
+
+    assert [e.recipients for e in events] == [[first.id, second.id]]
+
+
+async def test_renamed_username_is_not_resolved(db, async_db):
+    user = make_user(db)
+    old_name = user.username
+    assert await username_cache.resolve(async_db, [old_name]) == {old_name: user.id}
+
+    user.username = f"{old_name}x"
+    db.commit()
+
+    assert await username_cache.resolve(async_db, [old_name]) == {}
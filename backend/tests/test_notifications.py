@@ -0,0 +1,26 @@
+# backend/tests/test_notifications.py
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.models.notification import Notification
+from app.schemas.notification import IssueEvent, NotificationType
+from app.services.notifications import process_events
+from conftest import make_issue, make_project, make_user
+
+
+async def test_events_for_deleted_comments_are_skipped(db, async_db):
+    reporter, assignee = make_user(db), make_user(db)
+    project = make_project(db, reporter)
+    issue = make_issue(db, project, reporter, assignee_id=assignee.id)
+    common = {"issue_id": issue.id, "project_id": project.id, "actor_id": reporter.id,
+              "occurred_at": datetime.now(timezone.utc)}
+
+    await process_events(async_db, [
+        IssueEvent(type=NotificationType.COMMENT_ADDED, comment_id=uuid.uuid4(), **common),
+        IssueEvent(type=NotificationType.ISSUE_ASSIGNED, **common),
+    ])
+
+    types = (await async_db.execute(select(Notification.type).where(Notification.issue_id == issue.id))).scalars()
+    assert [t.value for t in types] == ["issue_assigned"]
@@ -0,0 +1,67 @@
+# backend/tests/test_partitioning.py
+import uuid
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.core.database import Base
+from app.core.partitioning import project_partition_name
+from app.models.issue import Issue
+from app.models.project import Project
+from app.models.user import User
+from app.services.partitioning import convert_issues_to_partitioned
+from conftest import make_issue, make_project, make_user
+
+
+def _issue_triggers(connection) -> set:
+    return set(connection.execute(text(
+        "SELECT tgname FROM pg_trigger WHERE tgrelid = 'issues'::regclass AND NOT tgisinternal"
+    )).scalars())
+
+
+@pytest.fixture
+def legacy(engine):
+    """Отдельная схема с непартиционированной issues (как до перехода); откатывается целиком"""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        connection.execute(text("CREATE SCHEMA legacy"))
+        connection.execute(text("SET LOCAL search_path TO legacy"))
+        Base.metadata.create_all(connection)
+        triggers = _issue_triggers(connection)
+        connection.execute(text("CREATE TABLE issues_plain (LIKE issues INCLUDING ALL)"))
+        connection.execute(text("DROP TABLE issues CASCADE"))
+        connection.execute(text("ALTER TABLE issues_plain RENAME TO issues"))
+        yield connection, triggers
+        transaction.rollback()
+
+
+def test_conversion_restores_issue_triggers(legacy):
+    connection, triggers = legacy
+    user_id, project_id, issue_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    connection.execute(insert(User).values(id=user_id, email="legacy@example.com", username="legacy", hashed_password="x"))
+    connection.execute(insert(Project).values(id=project_id, name="Legacy", key="LEGACY", owner_id=user_id))
+    connection.execute(insert(Issue).values(id=issue_id, project_id=project_id, key="LEGACY-1", title="Old", reporter_id=user_id))
+
+    convert_issues_to_partitioned(connection, min_issues_for_own_partition=1)
+
+    assert _issue_triggers(connection) == triggers
+    assert connection.execute(text("SELECT tableoid::regclass::text FROM issues WHERE id = :id"), {"id": issue_id}).scalar() \
+        == project_partition_name(project_id)
+
+    connection.execute(insert(Issue).values(id=uuid.uuid4(), project_id=project_id, key="LEGACY-2", title="New", reporter_id=user_id))
+    total = connection.execute(text(
+        "SELECT value FROM project_counters WHERE project_id = :id AND dimension = 'total'"
+    ), {"id": project_id}).scalar()
+    assert total == 1  # строка, перенесенная при переходе, триггером не считается
+
+
+def test_deleting_project_drops_its_partition(db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    make_issue(db, project, owner)
+    name = project_partition_name(project.id)
+
+    db.delete(project)
+    db.commit()
+
+    assert db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None
@@ -0,0 +1,39 @@
+# backend/tests/test_permissions.py
+import asyncio
+import uuid
+
+from app.core.permissions import ALL_PERMISSIONS, Permission
+from app.models.project import ProjectMember
+from app.services.permissions import get_masks
+from conftest import make_project, make_user
+
+
+async def _commit(db) -> None:
+    """commit и ожидание сброса масок в Redis, который after_commit запускает задачей"""
+    before = asyncio.all_tasks()
+    db.commit()
+    await asyncio.gather(*(asyncio.all_tasks() - before))
+
+
+async def test_masks_follow_membership_and_project_changes(db, async_db):
+    owner, member, stranger = make_user(db), make_user(db), make_user(db)
+    project = make_project(db, owner)
+    db.add(ProjectMember(id=uuid.uuid4(), project_id=project.id, user_id=member.id,
+                         permissions={"can_create": True, "can_edit": False, "can_delete": True}))
+    db.commit()
+
+    assert (await get_masks(async_db, owner.id, [project.id]))[project.id] == ALL_PERMISSIONS
+    assert (await get_masks(async_db, member.id, [project.id]))[project.id] == int(
+        Permission.VIEW | Permission.CREATE | Permission.DELETE
+    )
+    assert (await get_masks(async_db, stranger.id, [project.id]))[project.id] == 0
+
+    project.is_public = True
+    await _commit(db)
+    assert (await get_masks(async_db, stranger.id, [project.id]))[project.id] == int(Permission.VIEW)
+    assert (await get_masks(async_db, owner.id, [project.id]))[project.id] == ALL_PERMISSIONS
+
+    await async_db.rollback()  # DETACH партиции удаляемого проекта ждет открытые транзакции
+    db.delete(project)
+    await _commit(db)
+    assert (await get_masks(async_db, owner.id, [project.id]))[project.id] == 0
@@ -0,0 +1,74 @@
+# backend/tests/test_reports.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.models.comment import IssueHistory
+from app.schemas.search import ReportQuery
+from app.services.reports import _today, build_report, rebuild_daily_stats, roll_up_daily_stats
+from conftest import make_issue, make_project, make_user
+
+
+async def _status_counts(async_db, project):
+    report = await build_report(async_db, ReportQuery(project_id=str(project.id), group_by="status"))
+    return {point.label: point.value for point in report.data}
+
+
+async def _roll_up(async_db, project):
+    # агрегаты строятся до вчерашнего дня; задачи, созданные задним числом, - пересчетом проекта
+    await roll_up_daily_stats(async_db, until=_today() - timedelta(days=1))
+    await rebuild_daily_stats(async_db, project.id)
+
+
+def _stored_net(db, project):
+    return db.execute(
+        text("SELECT bucket, sum(net) FROM issue_daily_stats WHERE project_id = :id AND dimension = 'status' GROUP BY 1"),
+        {"id": project.id},
+    ).all()
+
+
+async def test_status_counts_match_after_roll_up(db, async_db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    two_days_ago = datetime.now(timezone.utc) - timedelta(days=2)
+    make_issue(db, project, owner, created_at=two_days_ago)
+    make_issue(db, project, owner)
+
+    assert await _status_counts(async_db, project) == {"open": 2}
+    await _roll_up(async_db, project)
+    assert await _status_counts(async_db, project) == {"open": 2}
+
+
+async def test_issue_created_and_deleted_on_the_same_day(db, async_db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    await _roll_up(async_db, project)
+    issue = make_issue(db, project, owner)
+    db.delete(issue)
+    db.commit()
+
+    assert _stored_net(db, project) == []
+    assert await _status_counts(async_db, project) == {}
+
+
+@pytest.mark.parametrize("orm_delete", [True, False])
+async def test_delete_after_status_change_corrects_status_at_watermark(db, async_db, orm_delete):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    issue = make_issue(db, project, owner, created_at=datetime.now(timezone.utc) - timedelta(days=2))
+    await _roll_up(async_db, project)
+
+    db.execute(text("UPDATE issues SET status = 'in_progress' WHERE id = :id"), {"id": issue.id})
+    db.add(IssueHistory(issue_id=issue.id, project_id=project.id, changed_by=owner.id,
+                        changed_field="status", old_value="open", new_value="in_progress"))
+    db.commit()
+    assert await _status_counts(async_db, project) == {"in_progress": 1}
+
+    if orm_delete:
+        db.delete(issue)  # ORM удаляет историю до задачи
+    else:
+        db.execute(text("DELETE FROM issues WHERE id = :id"), {"id": issue.id})  # каскад в БД - после
+    db.commit()
+    assert {bucket: net for bucket, net in _stored_net(db, project) if net} == {}
+    assert await _status_counts(async_db, project) == {}
@@ -0,0 +1,40 @@
+# backend/tests/test_retention.py
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.partitioning import ensure_range_partitions
+from app.services.retention import archive_old_partitions
+
+
+def _exists(engine, name: str) -> bool:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+
+def test_finishes_partition_left_detached_by_a_crash(engine, tmp_path):
+    with engine.begin() as connection:
+        [partition] = ensure_range_partitions(connection, "issue_history", date(2000, 1, 1), date(2000, 1, 1))
+        connection.execute(text(f"ALTER TABLE issue_history DETACH PARTITION {partition}"))
+
+    assert partition in archive_old_partitions(engine, str(tmp_path))
+    assert not _exists(engine, partition)
+    assert (tmp_path / f"{partition}.csv.gz").exists()
+
+
+def test_finalizes_interrupted_concurrent_detach(engine, tmp_path):
+    with engine.begin() as connection:
+        [partition] = ensure_range_partitions(connection, "issue_history", date(2000, 2, 1), date(2000, 2, 1))
+
+    # открытая транзакция, читавшая родителя, не дает DETACH CONCURRENTLY завершиться
+    with engine.connect() as reader, engine.connect().execution_options(isolation_level="AUTOCOMMIT") as detacher:
+        reader.execute(text("SELECT count(*) FROM issue_history"))
+        detacher.execute(text("SET statement_timeout = '200ms'"))
+        with pytest.raises(OperationalError):
+            detacher.execute(text(f"ALTER TABLE issue_history DETACH PARTITION {partition} CONCURRENTLY"))
+        reader.rollback()
+
+    assert partition in archive_old_partitions(engine, str(tmp_path))
+    assert not _exists(engine, partition)
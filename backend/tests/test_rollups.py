@@ -0,0 +1,53 @@
+# backend/tests/test_rollups.py
+import uuid
+
+from sqlalchemy import select, text
+
+from app.models.issue import IssueLink, IssueLinkType, IssueRollup
+from app.services.rollups import rebuild_rollups
+from conftest import make_issue, make_project, make_user
+
+
+def _parent(db, parent, child):
+    link = IssueLink(id=uuid.uuid4(), source_issue_id=parent.id, source_project_id=parent.project_id,
+                     target_issue_id=child.id, target_project_id=child.project_id,
+                     link_type=IssueLinkType.PARENT, created_by=parent.reporter_id)
+    db.add(link)
+    db.commit()
+    return link
+
+
+def _rollups(db, project):
+    r = IssueRollup
+    rows = db.execute(
+        select(r.issue_id, r.self_estimate, r.self_spent, r.self_remaining, r.self_open,
+               r.desc_estimate, r.desc_spent, r.desc_remaining, r.open_descendants)
+        .where(r.project_id == project.id)
+    )
+    return {issue_id: tuple(values) for issue_id, *values in rows}
+
+
+async def test_triggers_match_rebuild(db, async_db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    epic = make_issue(db, project, owner, estimate_hours=1)
+    story = make_issue(db, project, owner, estimate_hours=5, spent_hours=2)
+    task = make_issue(db, project, owner, estimate_hours=4)
+    other = make_issue(db, project, owner, estimate_hours=3)
+    _parent(db, epic, story)
+    _parent(db, story, task)
+    link = _parent(db, epic, other)
+
+    db.execute(text("UPDATE issues SET spent_hours = 6, status = 'closed' WHERE id = :id"), {"id": task.id})
+    db.delete(link)
+    db.commit()
+
+    by_triggers = _rollups(db, project)
+    # эпик: story (5/2/3, открыта) + task (4/6/0, закрыта)
+    assert by_triggers[epic.id][4:] == (9, 8, 3, 1)
+
+    await rebuild_rollups(async_db, project.id)
+    rebuilt = _rollups(db, project)
+    # строка задачи, вышедшей из иерархии, у триггеров остается (без потомков) - пересчет ее не создает
+    assert rebuilt == {issue_id: by_triggers[issue_id] for issue_id in rebuilt}
+    assert set(rebuilt) == {epic.id, story.id, task.id}
@@ -0,0 +1,40 @@
+# backend/tests/test_search.py
+import uuid
+
+from app.models.comment import Comment
+from app.models.project import ProjectMember
+from app.schemas.search import SearchQuery
+from app.services.search import search
+from conftest import make_issue, make_project, make_user
+
+
+async def test_highlights_are_escaped(db, async_db):
+    owner = make_user(db)
+    project = make_project(db, owner)
+    make_issue(db, project, owner, title="Crash", description="zanzibar <svg/onload=alert(1)> x < y")
+
+    response = await search(async_db, SearchQuery(q="zanzibar"), owner.id)
+
+    [fragment] = response.results[0].highlight["description"]
+    assert fragment.startswith("<mark>zanzibar</mark> &lt;svg/onload=alert")
+    assert "<svg" not in fragment
+
+
+async def test_results_are_limited_to_accessible_projects(db, async_db):
+    owner, member, stranger = make_user(db), make_user(db), make_user(db)
+    private = make_project(db, owner)
+    public = make_project(db, owner, is_public=True)
+    db.add(ProjectMember(project_id=private.id, user_id=member.id))
+    for project in (private, public):
+        issue = make_issue(db, project, owner, title="Quokka")
+        db.add(Comment(id=uuid.uuid4(), issue_id=issue.id, project_id=project.id, author_id=owner.id,
+                       content="quokka internal", is_internal=True))
+    db.commit()
+
+    def found(response):
+        return sorted((r.type, r.project_key) for r in response.results)
+
+    assert found(await search(async_db, SearchQuery(q="quokka"), member.id)) == sorted([
+        ("issue", private.key), ("comment", private.key), ("issue", public.key),
+    ])
+    assert found(await search(async_db, SearchQuery(q="quokka"), stranger.id)) == [("issue", public.key)]
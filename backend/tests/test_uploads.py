@@ -0,0 +1,32 @@
+# backend/tests/test_uploads.py
+import hashlib
+import uuid
+
+from app.models.attachment import Attachment, AttachmentBlob, FileType
+from app.services.uploads import attach_by_hash
+from conftest import make_issue, make_project, make_user
+
+
+def _stored_file(db, issue, uploader) -> str:
+    sha256 = hashlib.sha256(uuid.uuid4().bytes).hexdigest()
+    db.add(AttachmentBlob(sha256=sha256, size_bytes=10, mime_type="text/plain", storage_bucket="attachments",
+                          storage_path=f"blobs/{sha256}"))
+    db.flush()
+    db.add(Attachment(id=uuid.uuid4(), filename="a.txt", original_name="a.txt", mime_type="text/plain",
+                      file_type=FileType.DOCUMENT, size_bytes=10, storage_path=f"blobs/{sha256}", sha256=sha256,
+                      issue_id=issue.id, project_id=issue.project_id, uploaded_by=uploader.id))
+    db.commit()
+    return sha256
+
+
+async def test_attach_by_hash_requires_access_to_a_referencing_project(db, async_db):
+    owner, stranger = make_user(db), make_user(db)
+    private = make_issue(db, make_project(db, owner), owner)
+    sha256 = _stored_file(db, private, owner)
+    own_issue = make_issue(db, make_project(db, stranger), stranger)
+
+    assert await attach_by_hash(async_db, stranger.id, own_issue.project_id, "b.txt", sha256, issue_id=own_issue.id) is None
+
+    second = make_issue(db, private.project, owner)
+    attachment = await attach_by_hash(async_db, owner.id, second.project_id, "b.txt", sha256, issue_id=second.id)
+    assert attachment.sha256 == sha256